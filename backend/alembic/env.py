@@ -21,8 +21,18 @@ from app.models import User, UserPreferences, Process, ProcessDocument, ProcessH
 # access to the values within the .ini file in use.
 config = context.config
 
-# Override sqlalchemy.url with settings from environment
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+# Override sqlalchemy.url with settings from environment.
+# `alembic -x tenant=<id> upgrade head` migrates that tenant's dedicated database instead
+tenant_id = context.get_x_argument(as_dictionary=True).get("tenant")
+if tenant_id:
+    from app.database import TENANT_DATABASE_URL_PREFIX
+    from app.secrets import Secrets
+    database_url = Secrets.get(f"{TENANT_DATABASE_URL_PREFIX}{tenant_id}")
+    if not database_url:
+        raise SystemExit(f"No {TENANT_DATABASE_URL_PREFIX}{tenant_id} secret: tenant '{tenant_id}' has no dedicated database")
+    config.set_main_option("sqlalchemy.url", database_url)
+else:
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -33,6 +43,17 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Tables managed only by raw SQL migrations (no model), ignored by autogenerate
+UNMANAGED_TABLES = {"rate_limit_counters"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip unmanaged tables and the monthly partitions of process_history."""
+    if type_ == "table" and (name in UNMANAGED_TABLES or name.startswith("process_history_")):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -55,6 +76,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +100,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
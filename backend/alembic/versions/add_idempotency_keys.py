@@ -0,0 +1,53 @@
+"""Add idempotency keys
+
+Stored responses are tenant data: like the other tables owned by a user,
+they are only visible to the user's tenant (row-level security, see
+add_tenants).
+
+Revision ID: add_idempotency_keys
+Revises: add_tenants
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_idempotency_keys'
+down_revision: Union[str, None] = 'add_tenants'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TENANT_POLICY = "EXISTS (SELECT 1 FROM users u WHERE u.id = user_id)"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_headers', sa.JSON(), nullable=False),
+        sa.Column('response_body', sa.LargeBinary(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_expires_at'), 'idempotency_keys', ['expires_at'], unique=False)
+    op.execute(text("ALTER TABLE idempotency_keys ENABLE ROW LEVEL SECURITY"))
+    op.execute(text("ALTER TABLE idempotency_keys FORCE ROW LEVEL SECURITY"))
+    op.execute(text(
+        f"CREATE POLICY tenant_isolation ON idempotency_keys USING ({TENANT_POLICY}) WITH CHECK ({TENANT_POLICY})"
+    ))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP POLICY IF EXISTS tenant_isolation ON idempotency_keys"))
+    op.drop_index(op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
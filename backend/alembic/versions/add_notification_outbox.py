@@ -0,0 +1,60 @@
+"""Add notification outbox table
+
+Revision ID: add_notification_outbox
+Revises: act_group_sort_active
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_notification_outbox'
+down_revision: Union[str, None] = 'act_group_sort_active'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('process_id', sa.String(), nullable=True),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['process_id'], ['processes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notification_outbox_id'), 'notification_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_notification_outbox_user_id'), 'notification_outbox', ['user_id'], unique=False)
+    op.create_index(op.f('ix_notification_outbox_process_id'), 'notification_outbox', ['process_id'], unique=False)
+    op.create_index(op.f('ix_notification_outbox_processed_at'), 'notification_outbox', ['processed_at'], unique=False)
+    op.create_index(op.f('ix_notification_outbox_created_at'), 'notification_outbox', ['created_at'], unique=False)
+    # The dispatcher only ever scans rows neither delivered nor failed
+    op.create_index(
+        'ix_notification_outbox_pending',
+        'notification_outbox',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text('processed_at IS NULL AND failed_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_outbox_pending', table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_created_at'), table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_processed_at'), table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_process_id'), table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_user_id'), table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_id'), table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,30 @@
+"""Add processes.version for optimistic concurrency control
+
+Every update of a process bumps the version; PATCH /processes/{id} only
+applies when the version still matches the one the client read (If-Match).
+Existing processes start at version 1.
+
+Revision ID: add_process_version
+Revises: add_idempotency_keys
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_process_version'
+down_revision: Union[str, None] = 'add_idempotency_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('processes', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('processes', 'version')
@@ -0,0 +1,41 @@
+"""Add rate limit counters table
+
+Used by the login rate limiter when RATE_LIMIT_BACKEND=postgres, so all
+workers share the same counters. UNLOGGED: the counters are disposable and
+not worth WAL traffic. Keys are SHA-256 hashes of the limiter name and the
+IP/email; expires_at (end of the window after the counter's own) lets the
+limiter delete every expired counter, not only those of keys seen again.
+
+Revision ID: add_rate_limit_counters
+Revises: add_refresh_tokens
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_rate_limit_counters'
+down_revision: Union[str, None] = 'add_refresh_tokens'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(text("""
+        CREATE UNLOGGED TABLE rate_limit_counters (
+            key VARCHAR NOT NULL,
+            window_index BIGINT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            expires_at TIMESTAMPTZ NOT NULL,
+            CONSTRAINT rate_limit_counters_pkey PRIMARY KEY (key, window_index)
+        );
+        CREATE INDEX ix_rate_limit_counters_expires_at ON rate_limit_counters (expires_at);
+    """))
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_counters')
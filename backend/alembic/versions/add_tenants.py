@@ -0,0 +1,124 @@
+"""Add tenants and tenant isolation (row-level security)
+
+Creates `tenants` with the 'default' tenant, adds tenant_id to users,
+companies and processes (existing rows go to 'default'), makes email/CNPJ
+unique per tenant and enables row-level security: a session that set
+app.tenant_id only sees (and can only write) that tenant's rows, and a
+session that did not set it sees none. Tables without tenant_id follow
+their parent row (a process or a user). Background jobs and scripts that
+work across tenants connect as a role with BYPASSRLS
+(DATABASE_MAINTENANCE_USER).
+
+RLS is FORCEd so it also applies to the table owner; the application role
+must not be a superuser nor have BYPASSRLS. Policies on the partitioned
+process_history apply to queries through it, not to its partitions queried
+directly (only the partition maintenance script does that).
+
+Tables left without policies hold no tenant data: activities, roles and
+permissions are a catalog shared by the tenants of a database, and
+revoked_tokens / rate_limit_counters are keyed by random token IDs and
+hashed IPs/emails and must be checked before the tenant is known.
+
+Revision ID: add_tenants
+Revises: add_rate_limit_counters
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_tenants'
+down_revision: Union[str, None] = 'add_rate_limit_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TENANT_TABLES = ['users', 'companies', 'processes']
+
+TENANT_POLICY = "tenant_id = current_setting('app.tenant_id', true)"
+
+# Tables scoped through their parent row; the subqueries are themselves
+# filtered by the parent's policy
+CHILD_POLICIES = {
+    'process_documents': "EXISTS (SELECT 1 FROM processes p WHERE p.id = process_id)",
+    'process_history': "EXISTS (SELECT 1 FROM processes p WHERE p.id = process_id)",
+    'user_preferences': "EXISTS (SELECT 1 FROM users u WHERE u.id = user_id)",
+    'refresh_tokens': "EXISTS (SELECT 1 FROM users u WHERE u.id = user_id)",
+    'notification_outbox': "EXISTS (SELECT 1 FROM users u WHERE u.id = user_id)",
+}
+
+
+def enable_tenant_isolation(table: str, policy: str) -> None:
+    op.execute(text(f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY"))
+    op.execute(text(f"ALTER TABLE {table} FORCE ROW LEVEL SECURITY"))
+    op.execute(text(f"CREATE POLICY tenant_isolation ON {table} USING ({policy}) WITH CHECK ({policy})"))
+
+
+def disable_tenant_isolation(table: str) -> None:
+    op.execute(text(f"DROP POLICY IF EXISTS tenant_isolation ON {table}"))
+    op.execute(text(f"ALTER TABLE {table} NO FORCE ROW LEVEL SECURITY"))
+    op.execute(text(f"ALTER TABLE {table} DISABLE ROW LEVEL SECURITY"))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tenants',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('hostname', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hostname'),
+    )
+    op.create_index(op.f('ix_tenants_id'), 'tenants', ['id'], unique=False)
+    op.execute(text("INSERT INTO tenants (id, name, is_active) VALUES ('default', 'Prefeitura', true)"))
+
+    for table in TENANT_TABLES:
+        op.add_column(table, sa.Column('tenant_id', sa.String(), nullable=False, server_default='default'))
+        op.alter_column(table, 'tenant_id', server_default=None)
+        op.create_foreign_key(f'fk_{table}_tenant_id', table, 'tenants', ['tenant_id'], ['id'], ondelete='RESTRICT')
+        op.create_index(op.f(f'ix_{table}_tenant_id'), table, ['tenant_id'], unique=False)
+
+    # Email/CNPJ unique per tenant instead of globally
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_cnpj', table_name='users')
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=False)
+    op.create_index(op.f('ix_users_cnpj'), 'users', ['cnpj'], unique=False)
+    op.create_unique_constraint('uq_users_tenant_email', 'users', ['tenant_id', 'email'])
+    op.create_unique_constraint('uq_users_tenant_cnpj', 'users', ['tenant_id', 'cnpj'])
+    op.drop_index('ix_companies_cnpj', table_name='companies')
+    op.create_index(op.f('ix_companies_cnpj'), 'companies', ['cnpj'], unique=False)
+    op.create_unique_constraint('uq_companies_tenant_cnpj', 'companies', ['tenant_id', 'cnpj'])
+
+    for table in TENANT_TABLES:
+        enable_tenant_isolation(table, TENANT_POLICY)
+    for table, policy in CHILD_POLICIES.items():
+        enable_tenant_isolation(table, policy)
+
+
+def downgrade() -> None:
+    for table in list(CHILD_POLICIES) + TENANT_TABLES:
+        disable_tenant_isolation(table)
+
+    op.drop_constraint('uq_companies_tenant_cnpj', 'companies', type_='unique')
+    op.drop_index(op.f('ix_companies_cnpj'), table_name='companies')
+    op.create_index('ix_companies_cnpj', 'companies', ['cnpj'], unique=True)
+    op.drop_constraint('uq_users_tenant_cnpj', 'users', type_='unique')
+    op.drop_constraint('uq_users_tenant_email', 'users', type_='unique')
+    op.drop_index(op.f('ix_users_cnpj'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.create_index('ix_users_cnpj', 'users', ['cnpj'], unique=True)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    for table in TENANT_TABLES:
+        op.drop_index(op.f(f'ix_{table}_tenant_id'), table_name=table)
+        op.drop_constraint(f'fk_{table}_tenant_id', table, type_='foreignkey')
+        op.drop_column(table, 'tenant_id')
+
+    op.drop_index(op.f('ix_tenants_id'), table_name='tenants')
+    op.drop_table('tenants')
@@ -0,0 +1,154 @@
+"""Partition process_history by month
+
+Converts process_history into a table range-partitioned by created_at (one
+partition per month plus a default partition), with a BRIN index on created_at
+and a (process_id, created_at) b-tree on every partition. The table becomes
+append-only: UPDATE is rejected and old data is removed by detaching/dropping
+whole partitions (see execution/maintain_history_partitions.py).
+
+Revision ID: partition_process_history
+Revises: add_notification_outbox
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'partition_process_history'
+down_revision: Union[str, None] = 'add_notification_outbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created ahead of time, so the default partition stays empty
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    # 1. Move the current table out of the way (names are reused below)
+    op.execute(text("""
+        ALTER TABLE process_history RENAME TO process_history_unpartitioned;
+        ALTER TABLE process_history_unpartitioned RENAME CONSTRAINT process_history_pkey TO process_history_unpartitioned_pkey;
+        DROP INDEX IF EXISTS ix_process_history_id;
+        DROP INDEX IF EXISTS ix_process_history_process_id;
+        DROP INDEX IF EXISTS ix_process_history_created_at;
+    """))
+
+    # 2. Partitioned table. The partition key must be part of the primary key.
+    op.execute(text("""
+        CREATE TABLE process_history (
+            id VARCHAR NOT NULL,
+            process_id VARCHAR NOT NULL REFERENCES processes (id),
+            action VARCHAR NOT NULL,
+            "user" VARCHAR NOT NULL,
+            observation TEXT,
+            extra_data JSON,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT process_history_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+
+        CREATE TABLE process_history_default PARTITION OF process_history DEFAULT;
+
+        -- BRIN stays tiny on append-only, time-ordered data
+        CREATE INDEX ix_process_history_created_at_brin ON process_history USING brin (created_at);
+        CREATE INDEX ix_process_history_process_id_created_at ON process_history (process_id, created_at);
+    """))
+
+    # 3. Partition management function, also used by the maintenance script and the importer.
+    #    Rows that already landed in the default partition for that month are moved over.
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION process_history_ensure_partition(month_start date)
+        RETURNS text AS $$
+        DECLARE
+            start_date date := date_trunc('month', month_start)::date;
+            end_date date := (date_trunc('month', month_start) + interval '1 month')::date;
+            partition_name text := 'process_history_' || to_char(start_date, '"y"YYYY"m"MM');
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN partition_name;
+            END IF;
+
+            CREATE TEMP TABLE process_history_moved ON COMMIT DROP AS
+                WITH moved AS (
+                    DELETE FROM process_history_default
+                    WHERE created_at >= start_date AND created_at < end_date
+                    RETURNING *
+                )
+                SELECT * FROM moved;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF process_history FOR VALUES FROM (%L) TO (%L)',
+                partition_name, start_date, end_date
+            );
+
+            INSERT INTO process_history SELECT * FROM process_history_moved;
+            DROP TABLE process_history_moved;
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql;
+    """))
+
+    # 4. Partitions for existing data and the next months, then copy the rows over
+    op.execute(text(f"""
+        SELECT process_history_ensure_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(created_at) FROM process_history_unpartitioned), now())),
+            date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS month;
+
+        INSERT INTO process_history (id, process_id, action, "user", observation, extra_data, created_at)
+        SELECT id, process_id, action, "user", observation, extra_data, COALESCE(created_at, now())
+        FROM process_history_unpartitioned;
+
+        DROP TABLE process_history_unpartitioned;
+    """))
+
+    # 5. Append-only: history rows are never updated
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION process_history_reject_update()
+        RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'process_history is append-only';
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER process_history_append_only
+            BEFORE UPDATE ON process_history
+            FOR EACH STATEMENT EXECUTE PROCEDURE process_history_reject_update();
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("""
+        DROP TRIGGER IF EXISTS process_history_append_only ON process_history;
+        DROP FUNCTION IF EXISTS process_history_reject_update();
+
+        ALTER TABLE process_history RENAME TO process_history_partitioned;
+        ALTER TABLE process_history_partitioned RENAME CONSTRAINT process_history_pkey TO process_history_partitioned_pkey;
+
+        CREATE TABLE process_history (
+            id VARCHAR NOT NULL,
+            process_id VARCHAR NOT NULL REFERENCES processes (id),
+            action VARCHAR NOT NULL,
+            "user" VARCHAR NOT NULL,
+            observation TEXT,
+            extra_data JSON,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT process_history_pkey PRIMARY KEY (id)
+        );
+
+        INSERT INTO process_history (id, process_id, action, "user", observation, extra_data, created_at)
+        SELECT id, process_id, action, "user", observation, extra_data, created_at
+        FROM process_history_partitioned;
+
+        DROP TABLE process_history_partitioned CASCADE;
+        DROP FUNCTION IF EXISTS process_history_ensure_partition(date);
+
+        CREATE INDEX ix_process_history_id ON process_history (id);
+        CREATE INDEX ix_process_history_process_id ON process_history (process_id);
+        CREATE INDEX ix_process_history_created_at ON process_history (created_at);
+    """))
@@ -1,22 +1,259 @@
 """
 Authentication utilities for JWT tokens and password hashing.
 """
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+import hashlib
+import secrets
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models.user import User
+from app.models.token import RefreshToken
+from app.revocation import revocation_list
+from app.secrets import Secrets
+from app.tenancy import check_token_tenant, get_current_tenant_id
+
+def build_password_context(
+    scheme: Optional[str] = None,
+    bcrypt_rounds: Optional[int] = None,
+    argon2_time_cost: Optional[int] = None,
+    argon2_memory_cost: Optional[int] = None,
+    argon2_parallelism: Optional[int] = None,
+) -> CryptContext:
+    """
+    Build the password hashing context from settings (or explicit overrides).
+
+    The configured scheme hashes new passwords; hashes with another scheme or
+    other cost parameters still verify but are reported by `needs_update`.
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    bcrypt_rounds = bcrypt_rounds or settings.BCRYPT_ROUNDS
+    schemes = ["argon2", "bcrypt"] if scheme == "argon2" else ["bcrypt"]
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        # Exact match: both raising and lowering the cost trigger a rehash
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=argon2_time_cost or settings.ARGON2_TIME_COST,
+        argon2__memory_cost=argon2_memory_cost or settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=argon2_parallelism or settings.ARGON2_PARALLELISM,
+    )
+
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context()
+
+
+# JWT signing keys. SECRET_KEY is the "default" key (also used for tokens
+# without a kid header); more keys come from secrets named JWT_KEY_<kid>
+# (HMAC secret, or a PEM private key for RS256/ES256) and JWT_PUBLIC_KEY_<kid>
+# (verification only). JWT_ACTIVE_KID selects the signing key, and
+# JWT_RETIRED_KEYS lists keys taken out of rotation ("<kid> <ISO-8601 time>"
+# per line): they verify tokens for ACCESS_TOKEN_EXPIRE_MINUTES after that
+# time, across restarts, and are ignored afterwards.
+DEFAULT_KID = "default"
+JWT_KEY_PREFIX = "JWT_KEY_"
+JWT_PUBLIC_KEY_PREFIX = "JWT_PUBLIC_KEY_"
+JWT_RETIRED_KEYS = "JWT_RETIRED_KEYS"
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """A key of the ring, with its jose key objects built once."""
+    kid: str
+    algorithm: str
+    material: str
+    verification_key: Key
+    signing_key: Optional[Key] = None  # None for verification-only keys
+    retired_until: Optional[float] = None  # Epoch seconds; set once the key left the configuration
+
+    def public_jwk(self) -> Optional[dict]:
+        """Public JWK for asymmetric keys (HMAC secrets are never published)."""
+        if self.algorithm.startswith("HS"):
+            return None
+        data = self.verification_key.public_key().to_dict()
+        data.update({"kid": self.kid, "use": "sig", "alg": self.algorithm})
+        return data
+
+
+def _algorithm_for(material: str) -> str:
+    """Pick the algorithm from the key material: PEM RSA/EC keys or an HMAC secret."""
+    if "-----BEGIN" not in material:
+        return settings.ALGORITHM
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+
+    data = material.encode("utf-8")
+    key = load_pem_public_key(data) if "PUBLIC KEY" in material else load_pem_private_key(data, password=None)
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return "ES256"
+    raise ValueError("Unsupported JWT key type (use an HMAC secret, RSA or EC P-256 key)")
+
+
+def _build_key(kid: str, material: str, verify_only: bool = False) -> SigningKey:
+    algorithm = _algorithm_for(material)
+    key = jwk.construct(material, algorithm)
+    if algorithm.startswith("HS"):
+        return SigningKey(kid, algorithm, material, verification_key=key, signing_key=None if verify_only else key)
+    if verify_only or "PUBLIC KEY" in material:
+        return SigningKey(kid, algorithm, material, verification_key=key)
+    return SigningKey(kid, algorithm, material, verification_key=key.public_key(), signing_key=key)
+
+
+def _retired_until() -> Dict[str, float]:
+    """Kid -> end of its grace period (epoch seconds), from JWT_RETIRED_KEYS."""
+    grace = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    retired: Dict[str, float] = {}
+    for line in (Secrets.get(JWT_RETIRED_KEYS) or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        kid, _, when = line.partition(" ")
+        try:
+            retired_at = datetime.fromisoformat(when.strip().replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"JWT_RETIRED_KEYS: invalid retire time for '{kid}': {when.strip()!r}")
+        if retired_at.tzinfo is None:
+            retired_at = retired_at.replace(tzinfo=timezone.utc)
+        retired[kid] = retired_at.timestamp() + grace
+    return retired
+
+
+class KeyRing:
+    """
+    Signing key plus every key accepted for verification, indexed by kid.
+
+    Keys listed in JWT_RETIRED_KEYS stay valid for verification for
+    ACCESS_TOKEN_EXPIRE_MINUTES after their retire time. Keys removed from
+    the configuration (or whose value changed) get the same grace period,
+    but only in the running process: a restart forgets them.
+    """
+
+    def __init__(self, active: SigningKey, keys: Dict[str, List[SigningKey]]):
+        self.active = active
+        self._keys = keys
+
+    def verification_keys(self, kid: str) -> List[Key]:
+        """Keys to try for a token with this kid (current first, then retired)."""
+        now = time.time()
+        return [
+            key.verification_key for key in self._keys.get(kid, ())
+            if key.retired_until is None or key.retired_until > now
+        ]
+
+    def algorithms(self, kid: str) -> List[str]:
+        return list({key.algorithm for key in self._keys.get(kid, ())})
+
+    def public_jwks(self) -> dict:
+        """JWK set of the asymmetric keys, for services that verify tokens locally."""
+        now = time.time()
+        jwks = []
+        for keys in self._keys.values():
+            for key in keys:
+                if key.retired_until is None or key.retired_until > now:
+                    public = key.public_jwk()
+                    if public:
+                        jwks.append(public)
+        return {"keys": jwks}
+
+    @classmethod
+    def load(cls, previous: Optional["KeyRing"] = None) -> "KeyRing":
+        """Build the ring from secrets, keeping recently removed keys of `previous` as retired."""
+        configured: Dict[str, SigningKey] = {DEFAULT_KID: _build_key(DEFAULT_KID, settings.SECRET_KEY)}
+        for name, material in Secrets.with_prefix(JWT_KEY_PREFIX).items():
+            kid = name[len(JWT_KEY_PREFIX):]
+            configured[kid] = _build_key(kid, material)
+        for name, material in Secrets.with_prefix(JWT_PUBLIC_KEY_PREFIX).items():
+            kid = name[len(JWT_PUBLIC_KEY_PREFIX):]
+            configured.setdefault(kid, _build_key(kid, material, verify_only=True))
+
+        active_kid = Secrets.get("JWT_ACTIVE_KID") or DEFAULT_KID
+        active = configured.get(active_kid)
+        if active is None or active.signing_key is None:
+            raise ValueError(f"JWT_ACTIVE_KID '{active_kid}' has no private/secret key configured")
+
+        for kid, retired_until in _retired_until().items():
+            if kid == active_kid:
+                raise ValueError(f"JWT_ACTIVE_KID '{kid}' is listed in JWT_RETIRED_KEYS")
+            if kid in configured:
+                configured[kid] = replace(configured[kid], signing_key=None, retired_until=retired_until)
+
+        keys: Dict[str, List[SigningKey]] = {kid: [key] for kid, key in configured.items()}
+        if previous is not None:
+            now = time.time()
+            grace_until = now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for kid, old_keys in previous._keys.items():
+                for old in old_keys:
+                    current = configured.get(kid)
+                    if current is not None and current.material == old.material:
+                        continue
+                    if old.retired_until is None:
+                        old = SigningKey(
+                            old.kid, old.algorithm, old.material, old.verification_key,
+                            retired_until=grace_until,
+                        )
+                    if old.retired_until > now:
+                        keys.setdefault(kid, []).append(old)
+        return cls(active, keys)
+
+
+@dataclass(frozen=True)
+class TokenConfig:
+    """Token settings resolved once, so the request path never reads settings or secrets."""
+    key_ring: KeyRing
+    access_token_expire: timedelta
+
+
+_token_config: Optional[TokenConfig] = None
+
+
+def get_token_config() -> TokenConfig:
+    """Return the current token settings (rebuilt after a secrets reload)."""
+    global _token_config
+    config = _token_config
+    if config is None:
+        config = TokenConfig(
+            key_ring=KeyRing.load(),
+            access_token_expire=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        _token_config = config
+    return config
+
+
+def _reload_key_ring(changed_keys) -> None:
+    """Rotate keys after a secrets reload; removed keys stay valid until their tokens expire."""
+    global _token_config
+    if _token_config is None:
+        return
+    if any(key in ("SECRET_KEY", "JWT_ACTIVE_KID", JWT_RETIRED_KEYS) or key.startswith(("JWT_KEY_", "JWT_PUBLIC_KEY_")) for key in changed_keys):
+        _token_config = TokenConfig(
+            key_ring=KeyRing.load(previous=_token_config.key_ring),
+            access_token_expire=_token_config.access_token_expire,
+        )
+
+
+Secrets.on_reload(_reload_key_ring)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
+# Same scheme without the automatic 401, for endpoints that also accept ?access_token=
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,6 +261,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# Hash verified when the email is unknown, so both cases take the same time
+_dummy_password_hash: Optional[str] = None
+
+
+def verify_dummy_password(plain_password: str) -> None:
+    """Spend the time of a real verification without a real hash (avoids user enumeration)."""
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = pwd_context.hash(secrets.token_urlsafe(16))
+    pwd_context.verify(plain_password, _dummy_password_hash)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash uses an outdated scheme or cost."""
+    return pwd_context.needs_update(hashed_password)
+
+
+def rehash_password(user_id: str, plain_password: str, old_hash: str) -> None:
+    """
+    Store a fresh hash for a password that was just verified (background task).
+
+    The update only applies if the hash is unchanged, so a password changed
+    in the meantime is never overwritten.
+    """
+    new_hash = pwd_context.hash(plain_password)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
@@ -31,17 +306,106 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    config = get_token_config()
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + (expires_delta or config.access_token_expire)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # jti identifies the token in the revocation list
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    active = config.key_ring.active
+    encoded_jwt = jwt.encode(to_encode, active.signing_key, algorithm=active.algorithm, headers={"kid": active.kid})
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+    """Verify an access token and return its claims (raises JWTError)."""
+    key_ring = get_token_config().key_ring
+    # Tokens issued before key rotation support have no kid: they were signed with SECRET_KEY
+    kid = jwt.get_unverified_header(token).get("kid") or DEFAULT_KID
+    keys = key_ring.verification_keys(kid)
+    if not keys:
+        raise JWTError("Unknown signing key")
+    return jwt.decode(token, keys, algorithms=key_ring.algorithms(kid))
+
+
+def hash_token(token: str) -> str:
+    """Hash an opaque token for storage (refresh tokens are random, so SHA-256 is enough)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_refresh_token(db: Session, user_id: str, family_id: Optional[str] = None) -> Tuple[RefreshToken, str]:
+    """
+    Create a refresh token (added to the session, committed by the caller).
+
+    Returns the row and the raw token; only its hash is stored.
+    """
+    token = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        token_hash=hash_token(token),
+        family_id=family_id or str(uuid.uuid4()),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(row)
+    return row, token
+
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> None:
+    """Revoke every still valid token issued from the same login."""
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for a new one (committed by the caller).
+
+    Presenting a token that was already rotated means it leaked: the whole
+    family is revoked and the client has to log in again.
+    """
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    # Token and user (with what UserResponse needs) in one query
+    row = (
+        db.query(RefreshToken)
+        .options(joinedload(RefreshToken.user).joinedload(User.preferences))
+        .filter(RefreshToken.token_hash == hash_token(token))
+        .first()
+    )
+    # A user outside the request's tenant is hidden by row-level security (or has another tid)
+    if row is None or row.user is None or row.user.tenant_id != get_current_tenant_id():
+        raise invalid_exception
+    
+    expires_at = row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
+        raise invalid_exception
+    
+    new_row, new_token = create_refresh_token(db, row.user_id, family_id=row.family_id)
+    # Conditional update: of two concurrent refreshes with the same token only one wins
+    rotated = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc), replaced_by=new_row.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not rotated:
+        db.expunge(new_row)
+        revoke_refresh_token_family(db, row.family_id)
+        db.commit()
+        raise invalid_exception
+    
+    return row.user, new_token
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -54,14 +418,23 @@ def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # In-memory check, no database query
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    
+    # A token from another prefeitura is not valid here
+    check_token_tenant(payload)
+    
+    # Load everything the user endpoints serialize (role_obj is joined by default),
+    # so handlers can use the user as-is instead of reloading it
+    user = db.query(User).options(joinedload(User.preferences)).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
     
@@ -73,3 +446,15 @@ def get_current_active_user(
 ) -> User:
     """Get the current active user (can be extended for account status checks)."""
     return current_user
+
+
+def get_current_user_from_header_or_query(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = None,
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Like get_current_user, but also accepts the token as `?access_token=`.
+    Needed for EventSource, which cannot send an Authorization header.
+    """
+    return get_current_user(token=token or access_token or "", db=db)
@@ -0,0 +1,174 @@
+"""
+Response compression (gzip and brotli).
+
+`CompressionMiddleware` is a pure ASGI layer: it negotiates the encoding from
+Accept-Encoding, leaves small bodies alone and compresses streamed bodies
+chunk by chunk (flushing after each one, so exports and other streams keep
+flowing). Payloads that are served many times unchanged can be compressed once
+with `PrecompressedPayload` and served directly.
+"""
+import gzip
+import zlib
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Streams and already-compressed formats are passed through untouched
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, in order of preference."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best encoding from an Accept-Encoding header (honoring q=0)."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for one response."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+            self._flush = self._impl.flush
+            self._finish = self._impl.finish
+            self._compress = self._impl.process
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+            self._flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._impl.flush
+            self._compress = self._impl.compress
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compress(data)
+        return out + (self._finish() if final else self._flush())
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli compression with a minimum size threshold."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+                    or content_type == XLSX_CONTENT_TYPE
+                )
+                if passthrough:
+                    await send(start_message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                # First body chunk decides: small complete bodies are not worth it
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    compressed = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PrecompressedPayload:
+    """A response body compressed once in every supported encoding."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json", etag: Optional[str] = None):
+        self.media_type = media_type
+        self.etag = etag
+        self.variants: Dict[Optional[str], bytes] = {None: body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def response(self, request: Request, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Serve the best variant for the request's Accept-Encoding."""
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        response_headers = {"Vary": "Accept-Encoding", **(headers or {})}
+        if self.etag:
+            response_headers["ETag"] = self.etag
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=response_headers)
@@ -16,10 +16,55 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "licencas_prefeituras"
     DATABASE_USER: str = "postgres"
     
+    # Multi-tenancy (one tenant per prefeitura). Tenants share this database,
+    # isolated by row-level security on tenant_id, unless a secret
+    # TENANT_DATABASE_URL_<tenant> routes them to a dedicated database
+    DEFAULT_TENANT_ID: str = "default"  # Used when neither host nor token name a tenant ("" = reject)
+    TENANT_RLS_ENABLED: bool = True  # Set app.tenant_id on every transaction for the RLS policies
+    # Role with BYPASSRLS for maintenance scripts and background jobs that work
+    # across tenants (password in secrets/DATABASE_MAINTENANCE_PASSWORD).
+    # Empty = DATABASE_USER, which then sees no tenant rows outside a request
+    # unless it is a superuser or has BYPASSRLS itself
+    DATABASE_MAINTENANCE_USER: str = ""
+    TENANT_REGISTRY_CACHE_SECONDS: float = 60.0
+    
+    # Read replica (streaming standby of the default database). GET/HEAD
+    # requests read from it unless it lags more than REPLICA_MAX_LAG_SECONDS
+    # or has not yet replayed the client's last write (db_lsn cookie)
+    DATABASE_REPLICA_HOST: str = ""  # Empty = every query goes to the primary
+    DATABASE_REPLICA_PORT: int = 5432
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 1.0  # How often the replica's replay position is sampled
+    READ_YOUR_WRITES_COOKIE_SECONDS: int = 300
+    
     # API (non-sensitive config from .env)
     API_V1_PREFIX: str = "/api/v1"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    REVOCATION_SYNC_SECONDS: float = 30.0  # How often each worker reloads revoked tokens
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    PERMISSION_MATRIX_CACHE_SECONDS: float = 60.0  # Role -> permissions map reload interval
+    
+    # Password hashing (existing hashes are upgraded on the next login)
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" or "argon2" (argon2id, needs argon2-cffi)
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    
+    # Login rate limiting (sliding window)
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per worker) or "postgres" (shared)
+    LOGIN_RATE_LIMIT_IP_ATTEMPTS: int = 30  # Attempts per IP
+    LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS: int = 60
+    LOGIN_RATE_LIMIT_EMAIL_ATTEMPTS: int = 5  # Failed attempts per email
+    LOGIN_RATE_LIMIT_EMAIL_WINDOW_SECONDS: int = 300
+    
+    # Idempotency-Key support on mutating endpoints
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24  # How long a stored response is replayed
+    IDEMPOTENCY_CACHE_SIZE: int = 10000  # Responses kept in memory per worker
+    IDEMPOTENCY_LOCK_POOL_SIZE: int = 5  # Connections per worker holding in-flight key locks
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: float = 2.0  # Wait for a lock connection before answering 503
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
@@ -27,6 +72,37 @@ class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = "development"
     
+    # Secrets hot reload (files in secrets/ are polled; SIGHUP reloads at once)
+    SECRETS_WATCH_ENABLED: bool = True
+    SECRETS_WATCH_INTERVAL_SECONDS: float = 5.0
+    
+    # Notifications (outbox dispatcher)
+    NOTIFICATIONS_ENABLED: bool = True
+    NOTIFICATIONS_TRANSPORT: str = "local"  # "smtp" or "local" (stand-in that only logs)
+    NOTIFICATIONS_BATCH_SIZE: int = 100
+    NOTIFICATIONS_POLL_INTERVAL_SECONDS: float = 5.0
+    NOTIFICATIONS_MAX_ATTEMPTS: int = 5
+    
+    # Push events (SSE)
+    EVENTS_BACKEND: str = "memory"  # "memory" (single node) or "postgres" (LISTEN/NOTIFY)
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_QUEUE_SIZE: int = 100
+    
+    # Response compression (gzip/brotli)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes; smaller bodies are sent as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # on-the-fly; pre-compressed payloads use 11
+    ACTIVITY_CATALOG_CACHE_SECONDS: int = 300
+    USER_COMPANIES_CACHE_SECONDS: float = 30.0  # Per-user company IDs used by ownership checks
+    PROCESS_REQUIRE_IF_MATCH: bool = False  # Reject PATCH /processes/{id} without If-Match (428)
+    
+    # SMTP (used when NOTIFICATIONS_TRANSPORT=smtp)
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USER: str = ""
+    SMTP_USE_TLS: bool = False
+    SMTP_FROM: str = "noreply@licenciamento.local"
+    
     @property
     def DATABASE_PASSWORD(self) -> str:
         """Get database password from secrets."""
@@ -37,12 +113,33 @@ class Settings(BaseSettings):
         """Get JWT secret key from secrets."""
         return Secrets.get_required("SECRET_KEY")
     
+    @property
+    def SMTP_PASSWORD(self) -> str:
+        """Get SMTP password from secrets (optional)."""
+        return Secrets.get("SMTP_PASSWORD", "")
+    
     @property
     def DATABASE_URL(self) -> str:
         """Build database URL from components."""
         password = self.DATABASE_PASSWORD
         return f"postgresql://{self.DATABASE_USER}:{password}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
     
+    @property
+    def DATABASE_MAINTENANCE_URL(self) -> str:
+        """URL of the BYPASSRLS maintenance role (DATABASE_URL when not configured)."""
+        if not self.DATABASE_MAINTENANCE_USER:
+            return self.DATABASE_URL
+        password = Secrets.get_required("DATABASE_MAINTENANCE_PASSWORD")
+        return f"postgresql://{self.DATABASE_MAINTENANCE_USER}:{password}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
+    
+    @property
+    def DATABASE_REPLICA_URL(self) -> str:
+        """Replica URL (same name and credentials as the primary), or "" when not configured."""
+        if not self.DATABASE_REPLICA_HOST:
+            return ""
+        password = self.DATABASE_PASSWORD
+        return f"postgresql://{self.DATABASE_USER}:{password}@{self.DATABASE_REPLICA_HOST}:{self.DATABASE_REPLICA_PORT}/{self.DATABASE_NAME}"
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Convert CORS_ORIGINS string to list."""
@@ -51,6 +148,8 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+        # Settings are a snapshot taken at startup; only secrets are reloadable
+        frozen = True
 
 
 settings = Settings()
@@ -1,20 +1,274 @@
 """
 Database connection and session management.
+
+Sessions are tenant-aware (see app.tenancy): each session is bound to the
+tenant current when it was created, is routed to that tenant's dedicated
+database when one is configured (secret TENANT_DATABASE_URL_<tenant>), and
+sets `app.tenant_id` at the start of every transaction so the row-level
+security policies only expose that tenant's rows.
+
+Sessions without a tenant see no tenant rows; background jobs that work
+across tenants use MaintenanceSessionLocal (the BYPASSRLS role
+DATABASE_MAINTENANCE_USER).
+
+When DATABASE_REPLICA_HOST is set, sessions opened by GET/HEAD requests
+read from the replica of the default database (see app.replication); their
+writes, and every later statement of the session, go to the primary.
 """
-from sqlalchemy import create_engine
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import create_engine, event, exc, String, any_, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
+from app.secrets import Secrets
+from app.replication import ReplicaMonitor, parse_lsn, request_consistency
+from app.tenancy import current_tenant
+
+TENANT_DATABASE_URL_PREFIX = "TENANT_DATABASE_URL_"
+TENANT_INFO_KEY = "tenant_id"
+REPLICA_INFO_KEY = "use_replica"
+WROTE_INFO_KEY = "wrote"
+CONSISTENCY_INFO_KEY = "read_consistency"
+PRIMARY_CONNECTION_INFO_KEY = "primary_connection"
+
+
+def _create_engine(url: str) -> Engine:
+    return create_engine(
+        url,
+        pool_pre_ping=True,  # Verify connections before using
+        echo=settings.ENVIRONMENT == "development"  # Log SQL queries in development
+    )
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    echo=settings.ENVIRONMENT == "development"  # Log SQL queries in development
+engine = _create_engine(settings.DATABASE_URL)
+
+# Default database as the BYPASSRLS maintenance role, for background jobs
+# that work across tenants (the same engine when no role is configured)
+maintenance_engine = (
+    _create_engine(settings.DATABASE_MAINTENANCE_URL) if settings.DATABASE_MAINTENANCE_USER else engine
 )
 
+# Read replica of the default database (None = primary only)
+replica_engine = _create_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+replica_monitor = ReplicaMonitor(replica_engine) if replica_engine is not None else None
+
+
+class TenantEngines:
+    """Engines of the tenants that have a dedicated database; the rest use `engine`."""
+
+    def __init__(self, default_engine: Engine):
+        self.default_engine = default_engine
+        self._urls: Dict[str, str] = {}
+        self._engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self, changed_keys=None) -> None:
+        """Re-read the TENANT_DATABASE_URL_* secrets, disposing engines whose URL changed."""
+        urls = {
+            key[len(TENANT_DATABASE_URL_PREFIX):]: url
+            for key, url in Secrets.with_prefix(TENANT_DATABASE_URL_PREFIX).items()
+        }
+        with self._lock:
+            for tenant_id in list(self._engines):
+                if urls.get(tenant_id) != self._urls.get(tenant_id):
+                    self._engines.pop(tenant_id).dispose()
+            self._urls = urls
+
+    def dedicated_tenants(self) -> List[str]:
+        return sorted(self._urls)
+
+    def is_dedicated(self, tenant_id: Optional[str]) -> bool:
+        return tenant_id in self._urls
+
+    def get(self, tenant_id: Optional[str]) -> Engine:
+        url = self._urls.get(tenant_id) if tenant_id else None
+        if url is None:
+            return self.default_engine
+        engine_ = self._engines.get(tenant_id)
+        if engine_ is None:
+            with self._lock:
+                engine_ = self._engines.get(tenant_id)
+                if engine_ is None:
+                    engine_ = self._engines[tenant_id] = _create_engine(url)
+        return engine_
+
+
+tenant_engines = TenantEngines(engine)
+Secrets.on_reload(tenant_engines.reload)
+
+
+class DedicatedDatabaseWorkers:
+    """
+    One background worker (anything with start() and stop()) per tenant with a
+    dedicated database. While running, `sync` starts workers for databases
+    added by a secrets reload and stops those of removed ones.
+    """
+
+    def __init__(self, make_worker: Callable[[str], Any]):
+        self.make_worker = make_worker
+        self.workers: Dict[str, Any] = {}
+        self._running = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self._running = True
+        self.sync()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            workers, self.workers = list(self.workers.values()), {}
+        for worker in workers:
+            worker.stop()
+
+    def sync(self, changed_keys=None) -> None:
+        """Match the workers to tenant_engines (registered with Secrets.on_reload after it)."""
+        with self._lock:
+            if not self._running:
+                return
+            tenants = set(tenant_engines.dedicated_tenants())
+            removed = [self.workers.pop(tenant_id) for tenant_id in list(self.workers) if tenant_id not in tenants]
+            for tenant_id in sorted(tenants - set(self.workers)):
+                worker = self.workers[tenant_id] = self.make_worker(tenant_id)
+                worker.start()
+        for worker in removed:
+            worker.stop()
+
+
+class TenantSession(Session):
+    """Session pinned to the tenant current at creation (or passed as info={"tenant_id": ...})."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.info.setdefault(TENANT_INFO_KEY, current_tenant.get())
+        consistency = request_consistency.get()
+        if consistency is not None:
+            self.info.setdefault(CONSISTENCY_INFO_KEY, consistency)
+            # Decided once, so all reads of the session see the same database
+            self.info.setdefault(
+                REPLICA_INFO_KEY,
+                consistency.read_only
+                and not tenant_engines.is_dedicated(self.tenant_id)
+                and replica_monitor.can_serve(consistency.min_lsn),
+            )
+
+    @property
+    def tenant_id(self) -> Optional[str]:
+        return self.info.get(TENANT_INFO_KEY)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if tenant_engines.is_dedicated(self.tenant_id):
+            return tenant_engines.get(self.tenant_id)
+        if self._flushing or getattr(clause, "is_dml", False):
+            # Writes go to the primary, and so does everything after them
+            self.info[WROTE_INFO_KEY] = True
+            self.info[REPLICA_INFO_KEY] = False
+        if self.info.get(REPLICA_INFO_KEY):
+            return replica_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def check_rls_enforced() -> None:
+    """
+    Refuse to run with TENANT_RLS_ENABLED when DATABASE_USER is a superuser or
+    has BYPASSRLS on any database: the tenant policies would not apply to it.
+    """
+    if not settings.TENANT_RLS_ENABLED:
+        return
+    databases = [("default", engine)] + [
+        (tenant_id, tenant_engines.get(tenant_id)) for tenant_id in tenant_engines.dedicated_tenants()
+    ]
+    for name, engine_ in databases:
+        if engine_.dialect.name != "postgresql":
+            continue
+        try:
+            with engine_.connect() as connection:
+                bypasses = connection.execute(text(
+                    "SELECT rolsuper OR rolbypassrls FROM pg_roles WHERE rolname = current_user"
+                )).scalar()
+        except exc.OperationalError as e:
+            sys.stderr.write(f"\033[93m[TENANCY]\033[0m - could not check the role of the {name} database: {e}\n")
+            sys.stderr.flush()
+            continue
+        if bypasses:
+            raise RuntimeError(
+                f"The database user of the {name} database is a superuser or has BYPASSRLS, so row-level "
+                "security does not isolate tenants. Use a role without them, or set TENANT_RLS_ENABLED=false."
+            )
+
+
+@event.listens_for(TenantSession, "after_begin")
+def _set_tenant_for_rls(session, transaction, connection) -> None:
+    # Transaction-local, so pooled connections never carry another tenant's setting.
+    # Without a tenant ('') the policies match no row: code outside a request
+    # must pick a tenant or use MaintenanceSessionLocal.
+    if settings.TENANT_RLS_ENABLED and connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT set_config('app.tenant_id', :tenant_id, true)"),
+            {"tenant_id": session.info.get(TENANT_INFO_KEY) or ""},
+        )
+
+
+@event.listens_for(TenantSession, "after_begin")
+def _remember_primary_connection(session, transaction, connection) -> None:
+    # Only the default primary: the replica and dedicated databases set no cookie
+    if session.info.get(CONSISTENCY_INFO_KEY) is not None and connection.engine is engine:
+        session.info[PRIMARY_CONNECTION_INFO_KEY] = connection
+
+
+@event.listens_for(TenantSession, "after_commit")
+def _record_commit_lsn(session) -> None:
+    # Read-your-writes: hand the primary's WAL position after this commit to
+    # the request, which returns it in the db_lsn cookie
+    connection = session.info.pop(PRIMARY_CONNECTION_INFO_KEY, None)
+    if not session.info.pop(WROTE_INFO_KEY, False):
+        return
+    consistency = session.info.get(CONSISTENCY_INFO_KEY)
+    if consistency is None or connection is None or connection.dialect.name != "postgresql":
+        return
+    try:
+        # Read after the commit record (before_commit would be too early), on
+        # the session's own connection: it is only returned to the pool, and
+        # the transaction this query begins rolled back, once this hook returns
+        lsn = connection.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+    except Exception as e:
+        # The write is committed; without the cookie the client may briefly read older data
+        sys.stderr.write(f"\033[91m[REPLICA]\033[0m - could not read the commit LSN: {e}\n")
+        sys.stderr.flush()
+        return
+    consistency.committed(parse_lsn(lsn))
+
+
+@event.listens_for(TenantSession, "after_rollback")
+def _forget_rolled_back_writes(session) -> None:
+    session.info.pop(WROTE_INFO_KEY, None)
+
+
+@event.listens_for(TenantSession, "after_transaction_end")
+def _forget_primary_connection(session, transaction) -> None:
+    # Also after close() without commit or rollback; runs after after_commit
+    if transaction.parent is None:
+        session.info.pop(PRIMARY_CONNECTION_INFO_KEY, None)
+
+
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=TenantSession, autocommit=False, autoflush=False, bind=engine)
+
+# Sessions on the default database that see every tenant (background jobs)
+MaintenanceSessionLocal = sessionmaker(
+    class_=TenantSession,
+    autocommit=False,
+    autoflush=False,
+    bind=maintenance_engine,
+    info={TENANT_INFO_KEY: None},
+)
 
 # Base class for models
 Base = declarative_base()
@@ -30,3 +284,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def id_in_array(column, ids):
+    """Match a column against a list of IDs bound as one array parameter (`= ANY(:ids)`)."""
+    return column == any_(bindparam(None, value=list(ids), type_=ARRAY(String)))
@@ -0,0 +1,262 @@
+"""
+Push channel for process events (Server-Sent Events).
+
+Handlers publish events through the database session, so they are only
+delivered once the transaction commits:
+
+- "memory" backend: events are kept on the session and handed to the
+  in-process broker after commit (single node).
+- "postgres" backend: events are sent with pg_notify inside the transaction;
+  every worker LISTENs on the channel of the default database and of each
+  dedicated tenant database, and fans out to its local subscribers.
+
+Subscribers are asyncio queues indexed by process and by owner, so an idle
+connection costs one queue and one suspended task.
+"""
+import asyncio
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.tenancy import get_current_tenant_id
+
+EVENTS_CHANNEL = "process_events"
+PENDING_EVENTS_KEY = "pending_process_events"
+
+
+class Subscription:
+    """A subscriber's queue plus the scope it is allowed to receive."""
+
+    def __init__(
+        self,
+        process_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        everything: bool = False,
+        tenant_id: Optional[str] = None,
+    ):
+        self.process_id = process_id
+        self.owner_id = owner_id
+        self.everything = everything
+        # "everything" means every event of this tenant
+        self.tenant_id = tenant_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def push(self, payload: dict) -> None:
+        # Slow consumers lose the oldest events instead of growing memory
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(payload)
+
+
+class EventBroker:
+    """Fans out published events to the local subscriptions."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_process: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._by_owner: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._everything: Set[Subscription] = set()
+        # LISTEN connection and its URL per database (None = default database)
+        self._listen_conns: Dict[Optional[str], Any] = {}
+        self._listen_urls: Dict[Optional[str], str] = {}
+        self._listening = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return (
+            sum(len(s) for s in self._by_process.values())
+            + sum(len(s) for s in self._by_owner.values())
+            + len(self._everything)
+        )
+
+    async def start(self) -> None:
+        """Bind to the running loop and, for the postgres backend, start listening."""
+        self._loop = asyncio.get_running_loop()
+        if settings.EVENTS_BACKEND == "postgres":
+            self._listening = True
+            self._sync_listeners()
+
+    async def stop(self) -> None:
+        self._listening = False
+        for database in list(self._listen_conns):
+            self._unlisten(database)
+
+    def sync_databases(self, changed_keys=None) -> None:
+        """Follow dedicated databases added, removed or moved by a secrets reload (thread-safe)."""
+        if self._loop is not None and self._listening:
+            self._loop.call_soon_threadsafe(self._sync_listeners)
+
+    def _sync_listeners(self) -> None:
+        if not self._listening:
+            return
+        for database in {None, *self._listen_conns, *self._dedicated_databases()}:
+            url = self._database_url(database)
+            if database in self._listen_conns and self._listen_urls.get(database) != url:
+                self._unlisten(database)
+            if url is not None and database not in self._listen_conns:
+                self._listen(database)
+
+    @staticmethod
+    def _dedicated_databases() -> List[str]:
+        from app.database import tenant_engines
+
+        return tenant_engines.dedicated_tenants()
+
+    @staticmethod
+    def _database_url(database: Optional[str]) -> Optional[str]:
+        """libpq URL of the default database (None) or of a tenant's dedicated one, if still configured."""
+        from app.database import tenant_engines
+
+        if database is None:
+            return settings.DATABASE_URL
+        if not tenant_engines.is_dedicated(database):
+            return None
+        return tenant_engines.get(database).url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        if subscription.everything:
+            self._everything.add(subscription)
+        elif subscription.process_id:
+            self._by_process[subscription.process_id].add(subscription)
+        elif subscription.owner_id:
+            self._by_owner[subscription.owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._everything.discard(subscription)
+        for index, key in ((self._by_process, subscription.process_id), (self._by_owner, subscription.owner_id)):
+            if key and key in index:
+                index[key].discard(subscription)
+                if not index[key]:
+                    del index[key]
+
+    def publish_local(self, events: List[dict]) -> None:
+        """Deliver events to this process's subscribers (thread-safe)."""
+        if self._loop is None or not events:
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, events)
+
+    def _dispatch(self, events: List[dict]) -> None:
+        for payload in events:
+            tenant_id = payload.get("tenant_id")
+            targets = {s for s in self._everything if s.tenant_id is None or s.tenant_id == tenant_id}
+            targets |= self._by_process.get(payload.get("process_id"), set())
+            targets |= self._by_owner.get(payload.get("owner_id"), set())
+            for subscription in targets:
+                subscription.push(payload)
+
+    def _listen(self, database: Optional[str] = None) -> None:
+        """LISTEN on a dedicated connection to `database`; notifications are read by the event loop."""
+        import psycopg2
+
+        url = self._database_url(database)
+        if not self._listening or url is None or database in self._listen_conns:
+            return
+        try:
+            conn = psycopg2.connect(url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {EVENTS_CHANNEL};")
+        except Exception as e:
+            sys.stderr.write(
+                f"\033[91m[EVENTS]\033[0m - could not LISTEN on {database or 'default'} database ({e}), retrying in 5s\n"
+            )
+            self._loop.call_later(5, self._listen, database)
+            return
+
+        self._listen_conns[database] = conn
+        self._listen_urls[database] = url
+        self._loop.add_reader(conn.fileno(), self._on_notify, database)
+
+    def _unlisten(self, database: Optional[str]) -> None:
+        conn = self._listen_conns.pop(database, None)
+        self._listen_urls.pop(database, None)
+        if conn is not None:
+            try:
+                self._loop.remove_reader(conn.fileno())
+                conn.close()
+            except Exception:
+                pass
+
+    def _on_notify(self, database: Optional[str]) -> None:
+        conn = self._listen_conns.get(database)
+        if conn is None:
+            return
+        try:
+            conn.poll()
+        except Exception:
+            # Connection lost: drop it and reconnect
+            self._unlisten(database)
+            self._loop.call_later(5, self._listen, database)
+            return
+
+        events = []
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                events.append(json.loads(notify.payload))
+            except ValueError:
+                continue
+        self._dispatch(events)
+
+
+broker = EventBroker()
+
+
+def process_status_event(
+    process_id: str,
+    company_id: str,
+    owner_id: Optional[str],
+    old_status: str,
+    new_status: str,
+) -> dict:
+    """Build the payload of a status change event."""
+    return {
+        "type": "process_status_changed",
+        "process_id": process_id,
+        "company_id": company_id,
+        "owner_id": owner_id,
+        "old_status": old_status,
+        "new_status": new_status,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def publish_events(db: Session, events: List[dict]) -> None:
+    """Publish events once the current transaction of `db` commits."""
+    if not events:
+        return
+    tenant_id = db.info.get("tenant_id") or get_current_tenant_id()
+    for payload in events:
+        payload.setdefault("tenant_id", tenant_id)
+    if settings.EVENTS_BACKEND == "postgres":
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": EVENTS_CHANNEL, "payloads": [json.dumps(e) for e in events]},
+        )
+    else:
+        db.info.setdefault(PENDING_EVENTS_KEY, []).extend(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session: Session) -> None:
+    events = session.info.pop(PENDING_EVENTS_KEY, None)
+    if events:
+        broker.publish_local(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def format_sse(payload: dict) -> str:
+    """Encode an event in the text/event-stream format."""
+    return f"event: {payload.get('type', 'message')}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
@@ -0,0 +1,152 @@
+"""
+Streaming export of processes (CSV/XLSX) for the municipal reports.
+
+Rows are read with a server-side cursor (`yield_per`) and written out in small
+chunks, so memory stays constant regardless of how many processes are exported.
+"""
+import csv
+import io
+import json
+import tempfile
+from typing import Iterable, Iterator, List, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.activity import Activity
+from app.models.company import Company
+from app.models.process import Process
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_YIELD_PER = 1000
+# Rows buffered before a CSV chunk is sent to the client
+EXPORT_CHUNK_ROWS = 500
+
+BASE_COLUMNS = [
+    "id",
+    "status",
+    "activity_id",
+    "activity_name",
+    "company_razao_social",
+    "company_cnpj",
+    "applicant_name",
+    "deadline_agency",
+    "deadline_applicant",
+    "created_at",
+    "updated_at",
+]
+EXTRA_DATA_COLUMN = "process_data_extra"
+
+
+def get_process_data_keys(db: Session) -> List[str]:
+    """
+    Collect the question IDs of the activity catalog. They become the
+    flattened `process_data` columns, so the header is known before streaming.
+    """
+    keys: List[str] = []
+    seen = set()
+    for (questions,) in db.query(Activity.questions).order_by(Activity.sort_order, Activity.name):
+        for question in questions or []:
+            key = question.get("id")
+            if key and key not in seen:
+                seen.add(key)
+                keys.append(key)
+    return keys
+
+
+def build_export_select():
+    """Select the exported columns (activity and company joined in, no ORM objects)."""
+    return (
+        select(
+            Process.id,
+            Process.status,
+            Process.activity_id,
+            Activity.name.label("activity_name"),
+            Company.razao_social.label("company_razao_social"),
+            Company.cnpj.label("company_cnpj"),
+            Process.applicant_name,
+            Process.deadline_agency,
+            Process.deadline_applicant,
+            Process.created_at,
+            Process.updated_at,
+            Process.process_data,
+        )
+        .join(Activity, Activity.id == Process.activity_id)
+        .join(Company, Company.id == Process.company_id)
+    )
+
+
+def _cell(value):
+    """Convert a value to something a CSV/XLSX cell can hold."""
+    if value is None:
+        return ""
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(db: Session, statement, data_keys: Sequence[str]) -> Iterator[list]:
+    """Yield flat rows (base columns + process_data keys + extra) from a server-side cursor."""
+    data_key_set = set(data_keys)
+    result = db.execute(statement.execution_options(yield_per=EXPORT_YIELD_PER, stream_results=True))
+    for row in result:
+        mapping = row._mapping
+        process_data = mapping["process_data"] or {}
+        extra = {k: v for k, v in process_data.items() if k not in data_key_set}
+        yield (
+            [_cell(mapping[column]) for column in BASE_COLUMNS]
+            + [_cell(process_data.get(key)) for key in data_keys]
+            + [_cell(extra) if extra else ""]
+        )
+
+
+def export_header(data_keys: Sequence[str]) -> List[str]:
+    """Header row for an export."""
+    return BASE_COLUMNS + [f"data.{key}" for key in data_keys] + [EXTRA_DATA_COLUMN]
+
+
+def stream_csv(header: List[str], rows: Iterable[list]) -> Iterator[bytes]:
+    """Encode rows as CSV in chunks. Starts with a BOM so Excel detects UTF-8."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(header: List[str], rows: Iterable[list], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Write rows to an XLSX workbook in write-only mode and stream the file.
+
+    XLSX is a zip archive, so the workbook is spooled to a temporary file
+    first; openpyxl's write-only mode keeps memory constant while doing so.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Processos")
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
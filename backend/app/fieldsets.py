@@ -0,0 +1,34 @@
+"""
+Sparse fieldsets (`?fields=id,status,...`) for list endpoints.
+
+Each endpoint maps the response fields it can project to SQL columns; only the
+requested columns are selected and encoded, so large JSON columns are skipped
+entirely when the client does not ask for them.
+"""
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+
+# Always returned, so clients can address the rows they received
+ALWAYS_INCLUDED_FIELDS = ("id",)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `fields` parameter.
+
+    Returns None when no projection was requested (full representation).
+    """
+    if fields is None:
+        return None
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    allowed = set(allowed)
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}"
+        )
+
+    # Keep the requested order, without duplicates
+    return list(dict.fromkeys([*ALWAYS_INCLUDED_FIELDS, *requested]))
@@ -0,0 +1,62 @@
+"""
+Conditional request helpers (ETag / Last-Modified).
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+from fastapi import Request
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the values that identify a representation."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def if_match_tags(request: Request) -> Optional[List[str]]:
+    """
+    Entity tags listed in If-Match, or None when the header is absent. Weak
+    tags are dropped: If-Match uses strong comparison (RFC 9110).
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return None
+    tags = [tag.strip() for tag in if_match.split(",")]
+    return [tag for tag in tags if tag and not tag.startswith("W/")]
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime for Last-Modified."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since. If-None-Match wins when both are
+    sent, as required by RFC 9110.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" matches "x"
+        bare = etag[2:] if etag.startswith("W/") else etag
+        return "*" in candidates or any(
+            (tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have second precision
+        return last_modified.replace(microsecond=0) <= since
+    return False
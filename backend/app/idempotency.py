@@ -0,0 +1,382 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+A client that may retry a POST/PUT/PATCH/DELETE (e.g. on a flaky mobile
+connection) sends a unique `Idempotency-Key` header. The first successful
+(2xx) response is stored in `idempotency_keys` for IDEMPOTENCY_KEY_TTL_HOURS
+and replayed, with its headers, to retries with the same key without
+running the endpoint again. A retry that arrives while the first request is
+still running gets 409 (the key is claimed with a non-blocking Postgres
+advisory lock) and can retry once it has finished. Reusing a key for a
+different request is rejected with 422.
+
+Routers opt in with `APIRouter(route_class=IdempotentRoute)`.
+"""
+import contextvars
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+from jose import JWTError
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal, tenant_engines
+from app.models.idempotency import IdempotencyKey
+from app.tenancy import current_tenant
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL_SECONDS = 3600.0
+# Recomputed when the response is rebuilt
+UNSTORED_HEADERS = {"content-length"}
+
+CacheKey = Tuple[Optional[str], str, str]
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    expires_at: datetime
+
+    @property
+    def expired(self) -> bool:
+        expires_at = self.expires_at if self.expires_at.tzinfo else self.expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= datetime.now(timezone.utc)
+
+    def to_response(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        # raw_headers keeps repeated headers (Set-Cookie) as they were sent
+        response.raw_headers.extend(
+            (name.encode("latin-1"), value.encode("latin-1")) for name, value in self.headers
+        )
+        response.headers[REPLAYED_HEADER] = "true"
+        return response
+
+
+def _response_headers(response: Response) -> List[Tuple[str, str]]:
+    return [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in response.raw_headers
+        if name.decode("latin-1").lower() not in UNSTORED_HEADERS
+    ]
+
+
+def _lock_id(cache_key: CacheKey) -> int:
+    """Signed 64-bit advisory lock ID for a (tenant, user, key)."""
+    digest = hashlib.sha256("\0".join(part or "" for part in cache_key).encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class IdempotencyStore:
+    """Stored responses: the `idempotency_keys` table behind a per-worker LRU cache."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        ttl_hours: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.ttl = timedelta(hours=ttl_hours if ttl_hours is not None else settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        self.cache_size = cache_size if cache_size is not None else settings.IDEMPOTENCY_CACHE_SIZE
+        self._cache: "OrderedDict[CacheKey, StoredResponse]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._in_flight: Set[int] = set()
+        self._in_flight_lock = threading.Lock()
+        self._lock_engines: Dict[str, Engine] = {}
+        self._next_purge_at: Dict[Optional[str], float] = {}
+
+    def _remember(self, cache_key: CacheKey, stored: StoredResponse) -> None:
+        with self._cache_lock:
+            self._cache[cache_key] = stored
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def cached(self, cache_key: CacheKey) -> Optional[StoredResponse]:
+        with self._cache_lock:
+            stored = self._cache.get(cache_key)
+            if stored is not None and stored.expired:
+                del self._cache[cache_key]
+                return None
+            return stored
+
+    def get(self, cache_key: CacheKey) -> Optional[StoredResponse]:
+        """Stored response for the key (memory first, then the database)."""
+        stored = self.cached(cache_key)
+        if stored is not None:
+            return stored
+        _, user_id, key = cache_key
+        db = self.session_factory()
+        try:
+            row = db.get(IdempotencyKey, (user_id, key))
+            if row is None:
+                return None
+            stored = StoredResponse(
+                request_hash=row.request_hash,
+                status_code=row.status_code,
+                headers=[tuple(header) for header in row.response_headers or []],
+                body=row.response_body,
+                expires_at=row.expires_at,
+            )
+        finally:
+            db.close()
+        if stored.expired:
+            return None
+        self._remember(cache_key, stored)
+        return stored
+
+    def save(self, cache_key: CacheKey, request_hash: str, response: Response) -> StoredResponse:
+        """
+        Store a response for replay. Never raises: the endpoint has already
+        committed, so a failure is logged and the response is still kept in
+        this worker's cache and returned to the client.
+        """
+        tenant_id, user_id, key = cache_key
+        stored = StoredResponse(
+            request_hash=request_hash,
+            status_code=response.status_code,
+            headers=_response_headers(response),
+            body=bytes(response.body),
+            expires_at=datetime.now(timezone.utc) + self.ttl,
+        )
+        db = self.session_factory()
+        try:
+            # merge: an expired row for the same key is overwritten
+            db.merge(IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                request_hash=stored.request_hash,
+                status_code=stored.status_code,
+                response_headers=[list(header) for header in stored.headers],
+                response_body=stored.body,
+                expires_at=stored.expires_at,
+            ))
+            db.commit()
+        except Exception as e:
+            sys.stderr.write(f"\033[91m[IDEMPOTENCY]\033[0m - could not store the response of key {key!r}: {e}\n")
+            sys.stderr.flush()
+        finally:
+            db.close()
+        self._remember(cache_key, stored)
+        self._schedule_purge(tenant_id)
+        return stored
+
+    def _schedule_purge(self, tenant_id: Optional[str]) -> None:
+        """Purge the tenant's expired keys in a background thread, at most every PURGE_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        with self._cache_lock:
+            if now < self._next_purge_at.get(tenant_id, 0.0):
+                return
+            self._next_purge_at[tenant_id] = now + PURGE_INTERVAL_SECONDS
+        # The copied context keeps the tenant, so the session is routed and scoped like the request's
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._purge,), name="idempotency-purge", daemon=True).start()
+
+    def _purge(self) -> None:
+        db = self.session_factory()
+        try:
+            purge_expired_idempotency_keys(db)
+            db.commit()
+        except Exception as e:
+            sys.stderr.write(f"\033[91m[IDEMPOTENCY]\033[0m - purge of expired keys failed: {e}\n")
+            sys.stderr.flush()
+        finally:
+            db.close()
+
+    def _lock_engine(self, engine: Engine) -> Engine:
+        """
+        Small pool of its own for the advisory locks: a lock is held on a
+        connection while the endpoint commits its own transaction(s) on
+        another one, so borrowing from the main pool could exhaust it.
+        """
+        url = engine.url.render_as_string(hide_password=False)
+        with self._in_flight_lock:
+            lock_engine = self._lock_engines.get(url)
+            if lock_engine is None:
+                lock_engine = self._lock_engines[url] = create_engine(
+                    engine.url,
+                    pool_size=settings.IDEMPOTENCY_LOCK_POOL_SIZE,
+                    max_overflow=0,
+                    pool_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS,
+                    pool_pre_ping=True,
+                    isolation_level="AUTOCOMMIT",
+                )
+        return lock_engine
+
+    def _try_lock(self, engine: Engine, lock_id: int) -> Optional[Connection]:
+        """Connection holding the advisory lock, or None if another request holds it."""
+        try:
+            connection = self._lock_engine(engine).connect()
+        except exc.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many idempotent requests in progress",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return None
+        return connection
+
+    def _unlock(self, connection: Connection, lock_id: int) -> None:
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+        except Exception:
+            # Never return a connection that may still hold the lock to the pool
+            connection.invalidate()
+            raise
+        finally:
+            connection.close()
+
+    @asynccontextmanager
+    async def claim(self, cache_key: CacheKey):
+        """
+        Claim the key for the duration of the request (across workers on
+        Postgres). Raises 409 without waiting if another request holds it.
+        """
+        lock_id = _lock_id(cache_key)
+        with self._in_flight_lock:
+            if lock_id in self._in_flight:
+                raise _key_in_flight()
+            self._in_flight.add(lock_id)
+        try:
+            engine = tenant_engines.get(cache_key[0])
+            if engine.dialect.name != "postgresql":
+                yield
+                return
+            connection = await run_in_threadpool(self._try_lock, engine, lock_id)
+            if connection is None:
+                raise _key_in_flight()
+            try:
+                yield
+            finally:
+                await run_in_threadpool(self._unlock, connection, lock_id)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(lock_id)
+
+    def clear(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+
+idempotency_store = IdempotencyStore()
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Delete stored responses past their TTL."""
+    return (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+        .delete(synchronize_session=False)
+    )
+
+
+def _token_subject(request: Request) -> Optional[str]:
+    from app.auth import decode_access_token
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token.strip()).get("sub")
+    except JWTError:
+        return None
+
+
+def _request_hash(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{request.url.query}\0".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _key_in_flight() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is already in progress",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _replay(stored: StoredResponse, request_hash: str) -> Response:
+    if stored.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    return stored.to_response()
+
+
+async def run_idempotent(request: Request, key: str, handler: Callable) -> Response:
+    """Run `handler` at most once per (user, key), replaying its stored response to retries."""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must have 1 to {MAX_KEY_LENGTH} characters",
+        )
+    user_id = _token_subject(request)
+    if user_id is None:
+        # Unauthenticated: let the endpoint reject it
+        return await handler(request)
+
+    request_hash = _request_hash(request, await request.body())
+    cache_key: CacheKey = (current_tenant.get(), user_id, key)
+
+    stored = idempotency_store.cached(cache_key)
+    if stored is not None:
+        return _replay(stored, request_hash)
+
+    async with idempotency_store.claim(cache_key):
+        # A request that held the key may have stored its response meanwhile
+        stored = await run_in_threadpool(idempotency_store.get, cache_key)
+        if stored is not None:
+            return _replay(stored, request_hash)
+
+        response = await handler(request)
+        # Only successes are stored: failed requests changed nothing and may be retried.
+        # Streaming responses have no body to store.
+        if 200 <= response.status_code < 300 and hasattr(response, "body"):
+            await run_in_threadpool(idempotency_store.save, cache_key, request_hash, response)
+        return response
+
+
+class IdempotentRoute(APIRoute):
+    """Route class honouring the Idempotency-Key header on mutating methods."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if (
+                key is None
+                or request.method not in MUTATING_METHODS
+                # Uploads are not buffered to be fingerprinted
+                or request.headers.get("content-type", "").startswith("multipart/")
+            ):
+                return await handler(request)
+            return await run_idempotent(request, key, handler)
+
+        return route_handler
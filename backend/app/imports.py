@@ -0,0 +1,415 @@
+"""
+Bulk import of legacy processes (CSV/JSON) for onboarding a new prefeitura.
+
+The input is streamed record by record and processed in chunks. For each chunk
+the companies are resolved by CNPJ with a single query, rows are validated
+against the activity catalog held in memory, and processes, documents and
+history are written with COPY into temporary staging tables followed by
+INSERT ... SELECT (COPY FROM is refused on tables with row-level security, and
+the INSERT keeps the tenant policies' checks); executemany is used on
+non-PostgreSQL databases. Each
+chunk is its own transaction, so an interrupted import can resume from the
+last checkpoint; rows that already exist are reported instead of failing the
+chunk.
+"""
+import csv
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from app.database import id_in_array
+from app.models.activity import Activity
+from app.models.company import Company
+from app.models.process import Process, ProcessDocument, ProcessHistory, ProcessStatus
+from app.tenancy import get_current_tenant_id
+
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_HISTORY_ACTION = "Importado de registro legado"
+INVALID_RECORD_KEY = "__invalid__"
+COPY_NULL = "\\N"  # NULL marker of the COPY ... CSV stream
+
+PROCESS_COLUMNS = [
+    "id",
+    "tenant_id",
+    "company_id",
+    "activity_id",
+    "applicant_name",
+    "status",
+    "deadline_agency",
+    "deadline_applicant",
+    "process_data",
+    "created_at",
+]
+DOCUMENT_COLUMNS = [
+    "id",
+    "process_id",
+    "document_type",
+    "document_name",
+    "is_required",
+    "is_uploaded",
+    "created_at",
+]
+HISTORY_COLUMNS = ["id", "process_id", "action", "user", "observation", "created_at"]
+
+
+@dataclass
+class ImportRowError:
+    """A rejected input row."""
+    row: int
+    process_id: Optional[str]
+    error: str
+
+
+@dataclass
+class ImportResult:
+    """Summary of an import run."""
+    rows_read: int = 0
+    imported: int = 0
+    failed: int = 0
+    next_row: int = 0  # First row not yet processed (use it to resume)
+    errors: List[ImportRowError] = field(default_factory=list)
+
+
+class FileCheckpoint:
+    """Stores import progress in a JSON file so the CLI can resume."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> int:
+        if not self.path.exists():
+            return 0
+        with open(self.path, "r") as f:
+            return int(json.load(f).get("next_row", 0))
+
+    def save(self, result: ImportResult) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {"next_row": result.next_row, "imported": result.imported, "failed": result.failed},
+                f,
+            )
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        if self.path.exists():
+            self.path.unlink()
+
+
+def detect_format(filename: str) -> str:
+    """Guess the input format from the file name."""
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".json", ".jsonl", ".ndjson"):
+        return "json"
+    return "csv"
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Dict]:
+    """
+    Yield input records one by one.
+
+    CSV uses the header as keys (the export format is accepted as-is). JSON may be
+    one object per line (streamed) or a single top-level array (loaded at once).
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == "[":
+        yield from json.loads(first + stream.read())
+        return
+
+    pending = first
+    for line in stream:
+        line = (pending + line).strip()
+        pending = ""
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            # Reported as a row error instead of aborting the import
+            yield {INVALID_RECORD_KEY: f"Invalid JSON: {e}"}
+
+
+def _record_cnpj(record: Dict) -> str:
+    """CNPJ digits of a record (`cnpj`, or `company_cnpj` as written by the export)."""
+    return "".join(filter(str.isdigit, str(record.get("cnpj") or record.get("company_cnpj") or "")))
+
+
+def _parse_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _parse_status(value) -> ProcessStatus:
+    if value in (None, ""):
+        return ProcessStatus.ABERTO
+    if isinstance(value, ProcessStatus):
+        return value
+    try:
+        return ProcessStatus(value)
+    except ValueError:
+        return ProcessStatus[str(value).upper()]
+
+
+def _parse_process_data(record: Dict) -> Optional[Dict]:
+    """Merge a `process_data` JSON field with flattened `data.<key>` columns."""
+    data = record.get("process_data")
+    if isinstance(data, str):
+        data = json.loads(data) if data.strip() else None
+    data = dict(data or {})
+    for key, value in record.items():
+        if key and key.startswith("data.") and value not in (None, ""):
+            data[key[5:]] = value
+    return data or None
+
+
+class ProcessImporter:
+    """Imports legacy process records in chunks."""
+
+    def __init__(
+        self,
+        db: Session,
+        imported_by: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        checkpoint: Optional[FileCheckpoint] = None,
+        error_sink: Optional[Callable[[ImportRowError], None]] = None,
+        max_errors_kept: Optional[int] = None,
+    ):
+        self.db = db
+        self.imported_by = imported_by
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.error_sink = error_sink
+        self.max_errors_kept = max_errors_kept
+        self._activities: Dict[str, Tuple[str, List[Dict]]] = {}
+        self._activity_ids_by_name: Dict[str, str] = {}
+        self._companies: Dict[str, Optional[Tuple[str, str, str]]] = {}
+
+    def load_catalog(self) -> None:
+        """Load the activity catalog once; every row is validated against it in memory."""
+        for activity_id, name, required_documents in self.db.query(
+            Activity.id, Activity.name, Activity.required_documents
+        ):
+            self._activities[activity_id] = (name, required_documents or [])
+            self._activity_ids_by_name[name.strip().lower()] = activity_id
+
+    def run(self, records: Iterable[Dict], start_row: int = 0) -> ImportResult:
+        """Import all records, skipping the first `start_row` (already imported)."""
+        if not self._activities:
+            self.load_catalog()
+
+        result = ImportResult(rows_read=start_row, next_row=start_row)
+        chunk: List[Tuple[int, Dict]] = []
+        for row_number, record in enumerate(records):
+            if row_number < start_row:
+                continue
+            chunk.append((row_number, record))
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk, result)
+        return result
+
+    def _report(self, result: ImportResult, error: ImportRowError) -> None:
+        result.failed += 1
+        if self.max_errors_kept is None or len(result.errors) < self.max_errors_kept:
+            result.errors.append(error)
+        if self.error_sink:
+            self.error_sink(error)
+
+    def _resolve_companies(self, cnpjs: List[str]) -> None:
+        """Resolve unknown CNPJs with one query per chunk; results are cached for the run."""
+        missing = [cnpj for cnpj in set(cnpjs) if cnpj not in self._companies]
+        if not missing:
+            return
+        for cnpj in missing:
+            self._companies[cnpj] = None
+        # CNPJs are unique per tenant: only the importing tenant's companies
+        rows = self.db.query(Company.cnpj, Company.id, Company.razao_social, Company.tenant_id).filter(
+            Company.tenant_id == get_current_tenant_id(), id_in_array(Company.cnpj, missing)
+        )
+        for cnpj, company_id, razao_social, tenant_id in rows:
+            self._companies[cnpj] = (company_id, razao_social, tenant_id)
+
+    def _existing_process_ids(self, process_ids: List[str]) -> set:
+        if not process_ids:
+            return set()
+        rows = self.db.query(Process.id).filter(id_in_array(Process.id, process_ids))
+        return {row[0] for row in rows}
+
+    def _process_chunk(self, chunk: List[Tuple[int, Dict]], result: ImportResult) -> None:
+        self._resolve_companies([_record_cnpj(record) for _, record in chunk])
+        existing = self._existing_process_ids(
+            [str(record["id"]) for _, record in chunk if record.get("id")]
+        )
+
+        now = datetime.now(timezone.utc)
+        processes, documents, history = [], [], []
+        seen_ids = set()
+        for row_number, record in chunk:
+            process_id = str(record.get("id") or "") or None
+            try:
+                if INVALID_RECORD_KEY in record:
+                    raise ValueError(record[INVALID_RECORD_KEY])
+                cnpj = _record_cnpj(record)
+                company = self._companies.get(cnpj)
+                if company is None:
+                    raise ValueError(f"Company not found for CNPJ '{cnpj}'")
+
+                activity_id = record.get("activity_id") or self._activity_ids_by_name.get(
+                    str(record.get("activity_name") or "").strip().lower()
+                )
+                if activity_id not in self._activities:
+                    raise ValueError(f"Activity not found: '{activity_id or record.get('activity_name')}'")
+                _, required_documents = self._activities[activity_id]
+
+                created_at = _parse_datetime(record.get("created_at")) or now
+                if process_id is None:
+                    process_id = f"PROC-{created_at.year}-{str(uuid.uuid4())[:8].upper()}"
+                if process_id in existing or process_id in seen_ids:
+                    raise ValueError("Process already exists")
+
+                process_row = {
+                    "id": process_id,
+                    "tenant_id": company[2],
+                    "company_id": company[0],
+                    "activity_id": activity_id,
+                    "applicant_name": record.get("applicant_name") or company[1],
+                    "status": _parse_status(record.get("status")),
+                    "deadline_agency": _parse_date(record.get("deadline_agency")),
+                    "deadline_applicant": _parse_date(record.get("deadline_applicant")),
+                    "process_data": _parse_process_data(record),
+                    "created_at": created_at,
+                }
+            except (ValueError, KeyError, TypeError) as e:
+                self._report(result, ImportRowError(row=row_number, process_id=process_id, error=str(e)))
+                continue
+
+            seen_ids.add(process_id)
+            processes.append(process_row)
+            for doc in required_documents:
+                documents.append({
+                    "id": str(uuid.uuid4()),
+                    "process_id": process_id,
+                    "document_type": doc.get("id", ""),
+                    "document_name": doc.get("label", ""),
+                    "is_required": doc.get("required", True),
+                    "is_uploaded": False,
+                    "created_at": created_at,
+                })
+            history.append({
+                "id": str(uuid.uuid4()),
+                "process_id": process_id,
+                "action": IMPORT_HISTORY_ACTION,
+                "user": self.imported_by,
+                "observation": None,
+                "created_at": created_at,
+            })
+
+        try:
+            if processes:
+                connection = self.db.connection()
+                _ensure_history_partitions(connection, history)
+                _bulk_write(connection, Process.__table__, PROCESS_COLUMNS, processes)
+                _bulk_write(connection, ProcessDocument.__table__, DOCUMENT_COLUMNS, documents)
+                _bulk_write(connection, ProcessHistory.__table__, HISTORY_COLUMNS, history)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        result.imported += len(processes)
+        result.rows_read += len(chunk)
+        result.next_row = chunk[-1][0] + 1
+        if self.checkpoint:
+            self.checkpoint.save(result)
+
+
+def _ensure_history_partitions(connection, history: List[Dict]) -> None:
+    """Create the monthly process_history partitions needed by legacy dates."""
+    if connection.dialect.name != "postgresql":
+        return
+    months = {row["created_at"].date().replace(day=1) for row in history}
+    for month in sorted(months):
+        connection.execute(text("SELECT process_history_ensure_partition(:month)"), {"month": month})
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, ProcessStatus):
+        return value.name  # Enum labels in the database are the member names
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _copy_field(value) -> str:
+    """
+    One COPY ... CSV field. Values are always quoted and NULL is the unquoted
+    marker, so "" stays an empty string (and a literal "\\N" stays text).
+    """
+    if value is None:
+        return COPY_NULL
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _bulk_write(connection, table, columns: List[str], rows: List[Dict]) -> None:
+    """
+    Write rows with COPY into a staging table and INSERT ... SELECT on
+    PostgreSQL, falling back to executemany elsewhere.
+    """
+    if not rows:
+        return
+    if connection.dialect.name != "postgresql":
+        connection.execute(insert(table), rows)
+        return
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(_copy_value(row[column])) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    staging = f"import_staging_{table.name}"
+    # Same column types, no constraints; dropped when the chunk commits
+    connection.execute(text(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {column_list} FROM {table.name} WITH NO DATA"
+    ))
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+        )
+    finally:
+        cursor.close()
+    connection.execute(text(f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging}"))
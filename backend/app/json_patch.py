@@ -0,0 +1,169 @@
+"""
+Server-side JSON Merge Patch (RFC 7396) and JSON Patch (RFC 6902) for JSON
+columns.
+
+The patch is compiled into one Postgres jsonb expression (`||`, `-`, `#-`,
+`jsonb_set`, `jsonb_insert`) so it is applied by the UPDATE itself, without
+reading the document first. JSON Patch preconditions (`test` operations and
+paths that must exist) become extra WHERE conditions: when one fails the
+UPDATE matches no row.
+
+Numeric path segments below the top level address array elements.
+"""
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from sqlalchemy import Text, case, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+MAX_OPERATIONS = 100
+# move/copy reference the document twice, doubling the expression each time
+MAX_MOVE_COPY_OPERATIONS = 5
+
+JSON_PATCH_OPERATIONS = {"add", "remove", "replace", "move", "copy", "test"}
+
+
+class PatchError(ValueError):
+    """A patch that is malformed or cannot be applied to a JSON object."""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """JSON Pointer ("/a/b~1c") to path segments (["a", "b/c"])."""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r}")
+    return [segment.replace("~1", "/").replace("~0", "~") for segment in pointer[1:].split("/")]
+
+
+def _jsonb(value: Any):
+    return literal(value, JSONB)
+
+
+def _path(segments: Sequence[str]):
+    return literal(list(segments), ARRAY(Text))
+
+
+def _get(document, segments: Sequence[str]):
+    return document.op("#>", return_type=JSONB)(_path(segments))
+
+
+def merge_patch_expression(document, patch: Dict[str, Any]):
+    """jsonb expression of `document` with the merge patch applied (RFC 7396, recursive)."""
+    if not isinstance(patch, dict):
+        raise PatchError("A merge patch must be a JSON object")
+    # A non-object target is replaced by an object before merging
+    result = case((func.jsonb_typeof(document) == "object", document), else_=_jsonb({}))
+
+    removed = [key for key, value in patch.items() if value is None]
+    if removed:
+        result = result.op("-", return_type=JSONB)(literal(removed, ARRAY(Text)))
+    replaced = {key: value for key, value in patch.items() if value is not None and not isinstance(value, dict)}
+    if replaced:
+        result = result.op("||", return_type=JSONB)(_jsonb(replaced))
+    merged = {key: value for key, value in patch.items() if isinstance(value, dict)}
+    if merged:
+        arguments = []
+        for key, value in merged.items():
+            child = document.op("->", return_type=JSONB)(cast(literal(key), Text))
+            arguments += [cast(literal(key), Text), merge_patch_expression(child, value)]
+        result = result.op("||", return_type=JSONB)(func.jsonb_build_object(*arguments, type_=JSONB))
+    return result
+
+
+def _add(document, segments: List[str], value):
+    parent, last = segments[:-1], segments[-1]
+    if not parent or not (last == "-" or last.isdigit()):
+        return func.jsonb_set(document, _path(segments), value, True, type_=JSONB)
+    # An index only inserts into an array; on an object "5" or "-" is a member
+    # name, set like any other. The document and value are bound once in a
+    # subquery so the CASE does not repeat (and double) their expressions.
+    bound = select(document.label("document"), value.label("value")).correlate_except(None).subquery()
+    current, value = bound.c.document, bound.c.value
+    if last == "-":
+        # Append: insert after the last element
+        into_array = func.jsonb_insert(current, _path(parent + ["-1"]), value, True, type_=JSONB)
+    else:
+        into_array = func.jsonb_insert(current, _path(segments), value, type_=JSONB)
+    return (
+        select(case(
+            (func.jsonb_typeof(_get(current, parent)) == "array", into_array),
+            else_=func.jsonb_set(current, _path(segments), value, True, type_=JSONB),
+        ))
+        .correlate_except(None)
+        .scalar_subquery()
+    )
+
+
+def json_patch_expression(document, operations: Sequence[Dict[str, Any]]) -> Tuple[Any, List[Any]]:
+    """
+    jsonb expression of `document` with the JSON Patch applied, plus the
+    conditions the current document must meet for the patch to apply.
+
+    Each operation is a dict with "op", "path" and, depending on the
+    operation, "value" or "from".
+    """
+    if len(operations) > MAX_OPERATIONS:
+        raise PatchError(f"A JSON Patch may have at most {MAX_OPERATIONS} operations")
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get("path"), str):
+            raise PatchError("Each JSON Patch operation must be an object with a path")
+    if sum(operation.get("op") in ("move", "copy") for operation in operations) > MAX_MOVE_COPY_OPERATIONS:
+        raise PatchError(f"A JSON Patch may have at most {MAX_MOVE_COPY_OPERATIONS} move/copy operations")
+    conditions = []
+    for operation in operations:
+        op = operation.get("op")
+        if op not in JSON_PATCH_OPERATIONS:
+            raise PatchError(f"Unsupported JSON Patch operation: {op!r}")
+        segments = parse_pointer(operation.get("path", ""))
+        if not segments:
+            raise PatchError("Operations on the whole document are not supported")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' operation without a value")
+
+        if op == "test":
+            conditions.append(_get(document, segments) == _jsonb(operation["value"]))
+        elif op == "remove":
+            conditions.append(_get(document, segments).is_not(None))
+            document = document.op("#-", return_type=JSONB)(_path(segments))
+        elif op == "replace":
+            conditions.append(_get(document, segments).is_not(None))
+            document = func.jsonb_set(document, _path(segments), _jsonb(operation["value"]), False, type_=JSONB)
+        elif op == "add":
+            if segments[:-1]:
+                conditions.append(_get(document, segments[:-1]).is_not(None))
+            document = _add(document, segments, _jsonb(operation["value"]))
+        else:
+            if not isinstance(operation.get("from"), str):
+                raise PatchError(f"'{op}' operation without from")
+            source = parse_pointer(operation["from"])
+            if not source:
+                raise PatchError("Operations on the whole document are not supported")
+            if op == "move" and len(segments) > len(source) and segments[:len(source)] == source:
+                raise PatchError("Cannot move a value into itself")
+            conditions.append(_get(document, source).is_not(None))
+            value = _get(document, source)
+            if op == "move":
+                document = document.op("#-", return_type=JSONB)(_path(source))
+            if segments[:-1]:
+                conditions.append(_get(document, segments[:-1]).is_not(None))
+            document = _add(document, segments, value)
+    return document, conditions
+
+
+def json_patch_keys(operations: Sequence[Dict[str, Any]]) -> Set[str]:
+    """Top-level keys read or written by a JSON Patch."""
+    keys = set()
+    for operation in operations:
+        for pointer in (operation.get("path"), operation.get("from")):
+            segments = parse_pointer(pointer) if isinstance(pointer, str) else []
+            if segments:
+                keys.add(segments[0])
+    return keys
+
+
+def json_patch_values(operations: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Values written whole to a top-level key by add/replace operations."""
+    return {
+        parse_pointer(operation["path"])[0]: operation["value"]
+        for operation in operations
+        if operation.get("op") in ("add", "replace") and len(parse_pointer(operation.get("path", ""))) == 1
+    }
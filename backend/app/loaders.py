@@ -0,0 +1,79 @@
+"""
+Per-request batch loading (DataLoader style).
+
+A loader collects the keys asked for, fetches all the missing ones with a
+single query and memoizes the results for the rest of the request, so
+building a list of N companies costs one query per relation instead of N.
+Loaders live as long as the request's session (see `get_loaders`).
+"""
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from app.database import get_db, id_in_array
+from app.models.company import Company, company_activities
+
+
+class BatchLoader:
+    """Memoizing loader whose misses are fetched in one call to `batch_fn`."""
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Dict], default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self._cache: Dict = {}
+
+    def load_many(self, keys: Iterable[Hashable]) -> List:
+        keys = list(keys)
+        missing = list(dict.fromkeys(key for key in keys if key not in self._cache))
+        if missing:
+            found = self.batch_fn(missing)
+            for key in missing:
+                self._cache[key] = found.get(key, self.default)
+        return [self._cache[key] for key in keys]
+
+    def load(self, key: Hashable):
+        return self.load_many([key])[0]
+
+    def prime(self, key: Hashable, value) -> None:
+        """Store a value already at hand (e.g. a row just loaded or created)."""
+        self._cache[key] = value
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+
+class RequestLoaders:
+    """The loaders of one request, all sharing its session."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.companies = BatchLoader(self._load_companies)
+        # company_id -> activity IDs linked through company_activities
+        self.company_activity_ids = BatchLoader(self._load_company_activity_ids, default=())
+
+    def _load_companies(self, ids: List[str]) -> Dict[str, Company]:
+        companies = self.db.query(Company).filter(id_in_array(Company.id, ids)).all()
+        return {company.id: company for company in companies}
+
+    def _load_company_activity_ids(self, company_ids: List[str]) -> Dict[str, tuple]:
+        rows = self.db.execute(
+            company_activities.select()
+            .with_only_columns(company_activities.c.company_id, company_activities.c.activity_id)
+            .where(id_in_array(company_activities.c.company_id, company_ids))
+        ).all()
+        grouped = defaultdict(list)
+        for company_id, activity_id in rows:
+            grouped[company_id].append(activity_id)
+        return {company_id: tuple(sorted(ids)) for company_id, ids in grouped.items()}
+
+    def prime_companies(self, companies: Iterable[Company]) -> None:
+        for company in companies:
+            self.companies.prime(company.id, company)
+
+
+def get_loaders(db: Session = Depends(get_db)) -> RequestLoaders:
+    """Dependency: FastAPI caches it per request, so every user of it shares the same loaders."""
+    return RequestLoaders(db)
@@ -5,58 +5,84 @@ import time
 import sys
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
-from app.routers import auth, users, processes, activities
+from app.routers import auth, users, companies, processes, activities, events
+from app.notifications import NotificationDispatcher
+from app.events import broker as event_broker
+from app.compression import CompressionMiddleware
+from app.revocation import RevocationSync
+from app.secrets import Secrets, SecretsWatcher
+from app.tenancy import TenantMiddleware
+from app.replication import ReadConsistencyMiddleware
+from app.database import DedicatedDatabaseWorkers, SessionLocal, check_rls_enforced
 
 # Note: Database tables are created via Alembic migrations
 # Run: alembic upgrade head
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware para logar todas as requisições HTTP."""
+class LoggingMiddleware:
+    """Middleware para logar todas as requisições HTTP (ASGI puro, não bufferiza streams)."""
     
-    async def dispatch(self, request: Request, call_next):
-        # Capturar tempo de início
-        start_time = time.time()
-        
-        # Processar requisição
-        response = await call_next(request)
-        
-        # Calcular tempo de resposta em milissegundos
-        process_time = (time.time() - start_time) * 1000
-        
-        # Obter informações da requisição
-        status_code = response.status_code
-        method = request.method
-        route = request.url.path
-        
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
         # Pular logging do endpoint de log para evitar duplicação
-        if route == "/dev/log":
-            return response
+        if scope["type"] != "http" or scope["path"] == "/dev/log":
+            await self.app(scope, receive, send)
+            return
         
-        # Determinar cor do status code (para melhor visualização)
-        if status_code >= 500:
-            status_color = "\033[91m"  # Vermelho para erros do servidor
-        elif status_code >= 400:
-            status_color = "\033[93m"  # Amarelo para erros do cliente
-        elif status_code >= 300:
-            status_color = "\033[96m"  # Ciano para redirecionamentos
-        elif status_code >= 200:
-            status_color = "\033[92m"  # Verde para sucesso
-        else:
-            status_color = "\033[0m"   # Reset
-        
-        reset_color = "\033[0m"
+        # Capturar tempo de início
+        start_time = time.time()
+        response = {"status_code": 500, "logged": False}
         
-        # Log no formato: [status] - Method - rota - tempo de resposta
-        log_message = f"{status_color}[{status_code}]{reset_color} - {method:6s} - {route:40s} - {process_time:7.2f}ms"
+        def log():
+            if response["logged"]:
+                return
+            response["logged"] = True
+            # Calcular tempo de resposta em milissegundos
+            process_time = (time.time() - start_time) * 1000
+            _write_log(response["status_code"], scope["method"], scope["path"], process_time)
         
-        # Usar sys.stderr para garantir que apareça no terminal (mesmo padrão do uvicorn)
-        sys.stderr.write(log_message + "\n")
-        sys.stderr.flush()
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                # Streams SSE ficam abertos: logar quando começam, não quando terminam
+                headers = dict(message.get("headers", []))
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    log()
+            await send(message)
         
-        return response
+        try:
+            # Processar requisição
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            log()
+
+
+def _write_log(status_code: int, method: str, route: str, process_time: float) -> None:
+    # Determinar cor do status code (para melhor visualização)
+    if status_code >= 500:
+        status_color = "\033[91m"  # Vermelho para erros do servidor
+    elif status_code >= 400:
+        status_color = "\033[93m"  # Amarelo para erros do cliente
+    elif status_code >= 300:
+        status_color = "\033[96m"  # Ciano para redirecionamentos
+    elif status_code >= 200:
+        status_color = "\033[92m"  # Verde para sucesso
+    else:
+        status_color = "\033[0m"   # Reset
+    
+    reset_color = "\033[0m"
+    
+    # Log no formato: [status] - Method - rota - tempo de resposta
+    log_message = f"{status_color}[{status_code}]{reset_color} - {method:6s} - {route:40s} - {process_time:7.2f}ms"
+    
+    # Usar sys.stderr para garantir que apareça no terminal (mesmo padrão do uvicorn)
+    sys.stderr.write(log_message + "\n")
+    sys.stderr.flush()
 
 
 # Create FastAPI app
@@ -64,8 +90,24 @@ app = FastAPI(
     title="Licenciamento Digital API",
     description="API backend para o sistema de Licenciamento Ambiental Digital",
     version="1.0.0",
+    # orjson for every route that returns plain data (see app.serialization)
+    default_response_class=ORJSONResponse,
 )
 
+# Compress responses (innermost, so logging and CORS see the final headers)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Send reads to the replica when it has the client's writes (db_lsn cookie)
+app.add_middleware(ReadConsistencyMiddleware)
+
+# Resolve the tenant (prefeitura) of each request from the host or token
+app.add_middleware(TenantMiddleware)
+
 # Add logging middleware (deve ser adicionado antes do CORS)
 app.add_middleware(LoggingMiddleware)
 
@@ -76,13 +118,112 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the SPA read pagination and caching headers
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "X-Latest-Cursor", "Idempotent-Replayed"],
+)
+
+
+@app.on_event("startup")
+async def check_tenant_isolation():
+    """Refuse to start when the database role bypasses row-level security."""
+    await run_in_threadpool(check_rls_enforced)
+
+
+def _tenant_session_factory(tenant_id: str):
+    return lambda: SessionLocal(info={"tenant_id": tenant_id})
+
+
+# Background dispatcher for the notification outbox of the default database
+# (all of its tenants, as the maintenance role), plus one per tenant with a
+# dedicated database (each outbox lives in its tenant's database)
+notification_dispatcher = NotificationDispatcher()
+tenant_notification_dispatchers = DedicatedDatabaseWorkers(
+    lambda tenant_id: NotificationDispatcher(session_factory=_tenant_session_factory(tenant_id))
 )
 
+
+@app.on_event("startup")
+async def start_notification_dispatcher():
+    """Start draining the notification outbox."""
+    if settings.NOTIFICATIONS_ENABLED:
+        notification_dispatcher.start()
+        tenant_notification_dispatchers.start()
+
+
+@app.on_event("shutdown")
+async def stop_notification_dispatcher():
+    """Stop the notification dispatcher."""
+    notification_dispatcher.stop()
+    tenant_notification_dispatchers.stop()
+
+
+# Reloads secrets/ on change or SIGHUP (key rotation without restart)
+secrets_watcher = SecretsWatcher(interval=settings.SECRETS_WATCH_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_secrets_watcher():
+    """Watch secrets/ for rotated values."""
+    if settings.SECRETS_WATCH_ENABLED:
+        secrets_watcher.install_sighup_handler()
+        secrets_watcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_secrets_watcher():
+    """Stop watching secrets/."""
+    secrets_watcher.stop()
+
+
+# Keeps the in-memory access token revocation list in sync with the default
+# database, plus one per tenant with a dedicated database (tokens of those
+# tenants are revoked in their own database)
+revocation_sync = RevocationSync()
+tenant_revocation_syncs = DedicatedDatabaseWorkers(
+    lambda tenant_id: RevocationSync(session_factory=_tenant_session_factory(tenant_id))
+)
+
+
+@app.on_event("startup")
+async def start_revocation_sync():
+    """Load revoked tokens and keep them in sync."""
+    revocation_sync.start()
+    tenant_revocation_syncs.start()
+
+
+@app.on_event("shutdown")
+async def stop_revocation_sync():
+    """Stop the revocation sync."""
+    revocation_sync.stop()
+    tenant_revocation_syncs.stop()
+
+
+# Dedicated databases added or removed by a secrets reload get (or lose) their
+# outbox dispatcher, revocation sync and LISTEN connection; these run after
+# tenant_engines.reload, registered when app.database was imported
+Secrets.on_reload(tenant_notification_dispatchers.sync)
+Secrets.on_reload(tenant_revocation_syncs.sync)
+Secrets.on_reload(event_broker.sync_databases)
+
+
+@app.on_event("startup")
+async def start_event_broker():
+    """Start the push event broker (LISTEN/NOTIFY when configured)."""
+    await event_broker.start()
+
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    """Stop the push event broker."""
+    await event_broker.stop()
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(users.router, prefix=settings.API_V1_PREFIX)
+app.include_router(companies.router, prefix=settings.API_V1_PREFIX)
 app.include_router(processes.router, prefix=settings.API_V1_PREFIX)
 app.include_router(activities.router, prefix=settings.API_V1_PREFIX)
+app.include_router(events.router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
@@ -7,6 +7,10 @@ from app.models.role import Role, Permission
 from app.models.company import Company
 from app.models.process import Process, ProcessDocument, ProcessHistory
 from app.models.activity import Activity
+from app.models.notification import NotificationOutbox
+from app.models.token import RefreshToken, RevokedToken
+from app.models.tenant import Tenant
+from app.models.idempotency import IdempotencyKey
 
 __all__ = [
     "User",
@@ -18,4 +22,9 @@ __all__ = [
     "ProcessDocument",
     "ProcessHistory",
     "Activity",
+    "NotificationOutbox",
+    "RefreshToken",
+    "RevokedToken",
+    "Tenant",
+    "IdempotencyKey",
 ]
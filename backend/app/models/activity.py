@@ -28,8 +28,9 @@ class Activity(Base):
     questions = Column(JSON, nullable=True)
     
     # Relationships
-    processes = relationship("Process", back_populates="activity", lazy="dynamic")
-    companies = relationship("Company", secondary="company_activities", back_populates="activities", lazy="dynamic")
+    # Unbounded: write-only, query them explicitly (activity.processes.select())
+    processes = relationship("Process", back_populates="activity", lazy="write_only", passive_deletes=True)
+    companies = relationship("Company", secondary="company_activities", back_populates="activities", lazy="write_only", passive_deletes=True)
     
     def __repr__(self):
         return f"<Activity(id={self.id}, name={self.name})>"
@@ -1,10 +1,11 @@
 """
 Company model for representing empresas (pessoa jurídica).
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Table
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Table, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.tenancy import get_current_tenant_id
 
 # Tabela intermediária para relacionamento N:N entre Company e Activity
 company_activities = Table(
@@ -19,14 +20,19 @@ class Company(Base):
     """Company model representing empresas (pessoa jurídica)."""
     
     __tablename__ = "companies"
+    # The same CNPJ may be registered with more than one prefeitura
+    __table_args__ = (UniqueConstraint("tenant_id", "cnpj", name="uq_companies_tenant_cnpj"),)
     
     id = Column(String, primary_key=True, index=True)
+    # Tenant (prefeitura); filled from the request's tenant
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete='RESTRICT'), nullable=False, index=True, default=get_current_tenant_id)
+    
     user_id = Column(String, ForeignKey("users.id", ondelete='CASCADE'), nullable=False, index=True)
     
     # Company data
     razao_social = Column(String, nullable=False, index=True)
     nome_fantasia = Column(String, nullable=True)
-    cnpj = Column(String(14), unique=True, nullable=False, index=True)
+    cnpj = Column(String(14), nullable=False, index=True)
     inscricao_estadual = Column(String, nullable=True)
     
     # Contact info
@@ -42,8 +48,9 @@ class Company(Base):
     
     # Relationships
     user = relationship("User", back_populates="companies")
-    activities = relationship("Activity", secondary=company_activities, back_populates="companies", lazy="dynamic")
-    processes = relationship("Process", back_populates="company", lazy="dynamic")
+    activities = relationship("Activity", secondary=company_activities, back_populates="companies")
+    # Unbounded: write-only, query it explicitly (company.processes.select())
+    processes = relationship("Process", back_populates="company", lazy="write_only", passive_deletes=True)
     
     def __repr__(self):
         return f"<Company(id={self.id}, razao_social={self.razao_social}, cnpj={self.cnpj})>"
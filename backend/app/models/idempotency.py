@@ -0,0 +1,35 @@
+"""
+Idempotency key model: stored responses of mutating requests.
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, JSON, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response of a request sent with an `Idempotency-Key` header.
+
+    Keys are scoped to the user that sent them. A retry with the same key
+    gets this response back instead of running the request again, as long
+    as the request is the same (same request_hash) and the row has not
+    expired.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of method, path and body
+
+    status_code = Column(Integer, nullable=False)
+    response_headers = Column(JSON, nullable=False, default=list)  # [[name, value], ...] as sent
+    response_body = Column(LargeBinary, nullable=False)
+
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key={self.key}, status={self.status_code})>"
@@ -0,0 +1,35 @@
+"""
+Notification outbox model for transactional notification delivery.
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Integer, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class NotificationOutbox(Base):
+    """Pending notification event, written in the same transaction as the change that caused it."""
+
+    __tablename__ = "notification_outbox"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    process_id = Column(String, ForeignKey("processes.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    event_type = Column(String, nullable=False)  # e.g., 'process_status_changed'
+    payload = Column(JSON, nullable=True)
+
+    # Delivery bookkeeping
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)  # Gave up after max attempts
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Relationships
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<NotificationOutbox(id={self.id}, user_id={self.user_id}, event={self.event_type})>"
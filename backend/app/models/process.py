@@ -1,11 +1,12 @@
 """
 Process models for licenciamento processes.
 """
-from sqlalchemy import Column, String, DateTime, Date, ForeignKey, Enum as SQLEnum, JSON, Text, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, Date, ForeignKey, Enum as SQLEnum, JSON, Text, Integer, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 from app.database import Base
+from app.tenancy import get_current_tenant_id
 
 
 class ProcessStatus(str, enum.Enum):
@@ -24,6 +25,9 @@ class Process(Base):
     __tablename__ = "processes"
     
     id = Column(String, primary_key=True, index=True)
+    # Tenant (prefeitura); filled from the request's tenant
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete='RESTRICT'), nullable=False, index=True, default=get_current_tenant_id)
+    
     company_id = Column(String, ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     activity_id = Column(String, ForeignKey("activities.id", ondelete='CASCADE'), nullable=False, index=True)
     
@@ -40,6 +44,9 @@ class Process(Base):
     # Process data (answers to activity-specific questions)
     process_data = Column(JSON, nullable=True)
     
+    # Optimistic concurrency: bumped by every update, exposed as the ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -83,12 +90,23 @@ class ProcessDocument(Base):
 
 
 class ProcessHistory(Base):
-    """History model for tracking process changes."""
+    """
+    History model for tracking process changes.
+    
+    The table is append-only and range-partitioned by month on created_at, which
+    is therefore part of the primary key. Queries should bound created_at (e.g. by
+    the process creation date) so PostgreSQL can prune partitions.
+    """
     
     __tablename__ = "process_history"
+    __table_args__ = (
+        Index("ix_process_history_created_at_brin", "created_at", postgresql_using="brin"),
+        Index("ix_process_history_process_id_created_at", "process_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
-    id = Column(String, primary_key=True, index=True)
-    process_id = Column(String, ForeignKey("processes.id"), nullable=False, index=True)
+    id = Column(String, primary_key=True)
+    process_id = Column(String, ForeignKey("processes.id"), nullable=False)
     
     action = Column(String, nullable=False)  # e.g., 'Protocolo Aberto', 'Mudança para Em Análise'
     user = Column(String, nullable=False)  # User who performed the action
@@ -97,8 +115,8 @@ class ProcessHistory(Base):
     # Additional data stored as JSON
     extra_data = Column(JSON, nullable=True)
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Timestamps (partition key)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     # Relationships
     process = relationship("Process", back_populates="history")
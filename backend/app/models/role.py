@@ -31,8 +31,10 @@ class Role(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    permissions = relationship("Permission", secondary=role_permissions, back_populates="roles", lazy="dynamic")
-    users = relationship("User", back_populates="role_obj", lazy="dynamic")
+    # A role has a handful of permissions: a plain collection, eager-loadable with selectinload
+    permissions = relationship("Permission", secondary=role_permissions, back_populates="roles")
+    # Can hold every user of the system: write-only, query it explicitly (Role.users.select())
+    users = relationship("User", back_populates="role_obj", lazy="write_only", passive_deletes=True)
     
     def __repr__(self):
         return f"<Role(id={self.id}, name={self.name})>"
@@ -54,7 +56,7 @@ class Permission(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    roles = relationship("Role", secondary=role_permissions, back_populates="permissions", lazy="dynamic")
+    roles = relationship("Role", secondary=role_permissions, back_populates="permissions")
     
     def __repr__(self):
         return f"<Permission(id={self.id}, name={self.name})>"
@@ -0,0 +1,23 @@
+"""
+Tenant model: one row per prefeitura served by the deployment.
+"""
+from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Tenant(Base):
+    """A prefeitura (tenant). Users, companies and processes belong to exactly one."""
+    
+    __tablename__ = "tenants"
+    
+    id = Column(String, primary_key=True, index=True)  # e.g. 'joao-pessoa'
+    name = Column(String, nullable=False)
+    hostname = Column(String, unique=True, nullable=True)  # Requests to this host run as the tenant
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Tenant(id={self.id}, hostname={self.hostname})>"
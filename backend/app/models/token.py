@@ -0,0 +1,54 @@
+"""
+Token models: refresh tokens and revoked access tokens.
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class RefreshToken(Base):
+    """
+    Long-lived token exchanged for new access tokens.
+
+    Only the SHA-256 of the token is stored. Each refresh rotates the token;
+    tokens issued from the same login share a family_id, so reuse of an old
+    token revokes the whole family.
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)
+
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by = Column(String, nullable=True)  # ID of the token issued by rotation
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, user_id={self.user_id}, family={self.family_id})>"
+
+
+class RevokedToken(Base):
+    """Access token revoked before its expiry (identified by its jti claim)."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    # Rows are only needed until the token would have expired anyway
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Timestamps
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<RevokedToken(jti={self.jti}, expires_at={self.expires_at})>"
@@ -1,23 +1,32 @@
 """
 User model for authentication and authorization.
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.tenancy import get_current_tenant_id
 
 
 class User(Base):
     """User model representing empreendedores and gestores."""
     
     __tablename__ = "users"
+    # Email and CNPJ are unique within a prefeitura (login is scoped to the tenant)
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "email", name="uq_users_tenant_email"),
+        UniqueConstraint("tenant_id", "cnpj", name="uq_users_tenant_cnpj"),
+    )
     
     id = Column(String, primary_key=True, index=True)
+    # Tenant (prefeitura); filled from the request's tenant
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete='RESTRICT'), nullable=False, index=True, default=get_current_tenant_id)
+    
     razao_social = Column(String, nullable=False, index=True)
     nome_fantasia = Column(String, nullable=True)
-    cnpj = Column(String(14), unique=True, nullable=False, index=True)
+    cnpj = Column(String(14), nullable=False, index=True)
     inscricao_estadual = Column(String, nullable=True)
-    email = Column(String, unique=True, nullable=False, index=True)
+    email = Column(String, nullable=False, index=True)
     telefone = Column(String, nullable=True)
     password_hash = Column(String, nullable=False)
     
@@ -33,7 +42,7 @@ class User(Base):
     
     # Relationships
     role_obj = relationship("Role", back_populates="users", lazy="joined")
-    companies = relationship("Company", back_populates="user", cascade="all, delete-orphan", lazy="dynamic")
+    companies = relationship("Company", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     preferences = relationship("UserPreferences", back_populates="user", uselist=False, cascade="all, delete-orphan")
     
     @property
@@ -0,0 +1,314 @@
+"""
+Notification delivery through a transactional outbox.
+
+Handlers only write `NotificationOutbox` rows in the same transaction as the
+change that triggered them. A background dispatcher drains the outbox in
+batches, groups pending events per user into a single digest, honors
+`UserPreferences.notifications` and hands the result to a pluggable transport.
+Events whose delivery failed NOTIFICATIONS_MAX_ATTEMPTS times are marked
+failed (`failed_at`) and reported instead of being retried forever.
+
+`execution/check_notifications.py` exercises the dispatcher against a local
+SMTP stand-in.
+"""
+import smtplib
+import sys
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+from app.config import settings
+from app.database import MaintenanceSessionLocal
+from app.models.company import Company
+from app.models.notification import NotificationOutbox
+from app.models.process import Process
+from app.models.user import User
+
+EVENT_PROCESS_STATUS_CHANGED = "process_status_changed"
+
+
+class NotificationTransport(ABC):
+    """Base class for notification transports."""
+
+    @abstractmethod
+    def send(self, to: str, subject: str, body: str) -> None:
+        """Deliver one message; raising marks the events for a retry."""
+
+
+class SMTPTransport(NotificationTransport):
+    """Deliver notifications by email through an SMTP server."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        user: str = "",
+        password: str = "",
+        use_tls: bool = False,
+        timeout: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, to: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+
+
+class LocalTransport(NotificationTransport):
+    """Local stand-in for SMTP: keeps delivered messages in memory and logs them."""
+
+    def __init__(self, echo: bool = True):
+        self.echo = echo
+        self.sent: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def send(self, to: str, subject: str, body: str) -> None:
+        with self._lock:
+            self.sent.append({"to": to, "subject": subject, "body": body})
+        if self.echo:
+            sys.stderr.write(f"\033[96m[MAIL]\033[0m - {to} - {subject}\n")
+            sys.stderr.flush()
+
+
+def get_transport() -> NotificationTransport:
+    """Build the transport configured in settings."""
+    if settings.NOTIFICATIONS_TRANSPORT == "smtp":
+        return SMTPTransport(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            sender=settings.SMTP_FROM,
+            user=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+        )
+    return LocalTransport()
+
+
+def enqueue_process_status_change(
+    db: Session,
+    process: Process,
+    old_status: str,
+    new_status: str,
+    changed_by: str,
+    owner_id: Optional[str] = None,
+) -> Optional[NotificationOutbox]:
+    """
+    Add an outbox row for the process owner. Does not commit: the row is
+    persisted by the caller's transaction together with the history entry.
+    """
+    if owner_id is None:
+        owner_id = db.query(Company.user_id).filter(Company.id == process.company_id).scalar()
+    if owner_id is None:
+        return None
+
+    entry = NotificationOutbox(
+        id=str(uuid.uuid4()),
+        user_id=owner_id,
+        process_id=process.id,
+        event_type=EVENT_PROCESS_STATUS_CHANGED,
+        payload={
+            "process_id": process.id,
+            "applicant_name": process.applicant_name,
+            "old_status": old_status,
+            "new_status": new_status,
+            "changed_by": changed_by,
+        },
+    )
+    db.add(entry)
+    return entry
+
+
+def enqueue_process_status_changes_bulk(db: Session, changes: List[Dict]) -> int:
+    """
+    Bulk variant of `enqueue_process_status_change` for bulk updates.
+
+    Each change is a dict with owner_id, process_id, applicant_name, old_status,
+    new_status and changed_by. Rows are inserted with a single executemany and
+    are not committed here.
+    """
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": change["owner_id"],
+            "process_id": change["process_id"],
+            "event_type": EVENT_PROCESS_STATUS_CHANGED,
+            "payload": {
+                "process_id": change["process_id"],
+                "applicant_name": change["applicant_name"],
+                "old_status": change["old_status"],
+                "new_status": change["new_status"],
+                "changed_by": change["changed_by"],
+            },
+            "attempts": 0,
+        }
+        for change in changes
+        if change.get("owner_id")
+    ]
+    if rows:
+        db.execute(insert(NotificationOutbox), rows)
+    return len(rows)
+
+
+def build_digest(user: User, events: List[NotificationOutbox]) -> Tuple[str, str]:
+    """Coalesce all pending events of a user into a single message."""
+    if len(events) == 1:
+        subject = "Atualização no seu processo de licenciamento"
+    else:
+        subject = f"{len(events)} atualizações nos seus processos de licenciamento"
+
+    lines = [f"Olá, {user.razao_social}.", ""]
+    for event in events:
+        payload = event.payload or {}
+        if event.event_type == EVENT_PROCESS_STATUS_CHANGED:
+            lines.append(
+                f"- Processo {payload.get('process_id')}: "
+                f"{payload.get('old_status')} → {payload.get('new_status')}"
+            )
+        else:
+            lines.append(f"- {event.event_type}: {payload}")
+    lines += ["", "Acesse o sistema para mais detalhes."]
+    return subject, "\n".join(lines)
+
+
+class NotificationDispatcher:
+    """Background worker that drains the notification outbox in batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = MaintenanceSessionLocal,
+        transport: Optional[NotificationTransport] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.transport = transport or get_transport()
+        self.batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+        self.poll_interval = poll_interval if poll_interval is not None else settings.NOTIFICATIONS_POLL_INTERVAL_SECONDS
+        self.max_attempts = max_attempts or settings.NOTIFICATIONS_MAX_ATTEMPTS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drain_once(self) -> int:
+        """Process one batch of pending events. Returns how many rows were claimed."""
+        db = self.session_factory()
+        try:
+            # SKIP LOCKED lets several workers drain the outbox concurrently
+            rows = (
+                db.query(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.processed_at.is_(None),
+                    NotificationOutbox.failed_at.is_(None),
+                )
+                .order_by(NotificationOutbox.created_at.asc())
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                return 0
+
+            events_by_user: Dict[str, List[NotificationOutbox]] = defaultdict(list)
+            for row in rows:
+                events_by_user[row.user_id].append(row)
+
+            users = {
+                user.id: user
+                for user in db.query(User)
+                .options(joinedload(User.preferences))
+                .filter(User.id.in_(list(events_by_user.keys())))
+                .all()
+            }
+
+            now = datetime.now(timezone.utc)
+            for user_id, events in events_by_user.items():
+                user = users.get(user_id)
+                # Users without preferences get the default (notifications on)
+                wants_notifications = user is not None and (
+                    user.preferences is None or user.preferences.notifications
+                )
+
+                if wants_notifications:
+                    subject, body = build_digest(user, events)
+                    try:
+                        self.transport.send(user.email, subject, body)
+                    except Exception as e:
+                        self._record_failure(user_id, events, str(e), now)
+                        continue
+
+                for event in events:
+                    event.attempts += 1
+                    event.processed_at = now
+
+            db.commit()
+            return len(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_failure(self, user_id: str, events: List[NotificationOutbox], error: str, now: datetime) -> None:
+        """Count a failed delivery; events out of attempts are marked failed and reported."""
+        failed = 0
+        for event in events:
+            event.attempts += 1
+            event.last_error = error
+            if event.attempts >= self.max_attempts:
+                event.failed_at = now
+                failed += 1
+        if failed:
+            sys.stderr.write(
+                f"\033[91m[NOTIFY]\033[0m - {failed} notification(s) for user {user_id} "
+                f"failed after {self.max_attempts} attempts: {error}\n"
+            )
+            sys.stderr.flush()
+
+    def run(self) -> None:
+        """Drain the outbox until stopped, sleeping only when it is empty."""
+        while not self._stop.is_set():
+            try:
+                claimed = self.drain_once()
+            except Exception as e:
+                sys.stderr.write(f"\033[91m[NOTIFY]\033[0m - dispatcher error: {e}\n")
+                sys.stderr.flush()
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        """Start the dispatcher in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the dispatcher to stop and wait for the current batch."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,59 @@
+"""
+Per-user company ownership cache.
+
+Ownership checks ("is this process's company one of mine?") run on most
+process requests of empreendedores. The IDs of each user's companies are
+cached for USER_COMPANIES_CACHE_SECONDS; a miss is confirmed against the
+database before denying access, so a company created moments ago (possibly
+by another worker) is never refused, and writes through the companies API
+invalidate the entry at once.
+"""
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.company import Company
+
+
+class UserCompanyCache:
+    """user_id -> (expires_at, frozenset of company IDs)."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.USER_COMPANIES_CACHE_SECONDS
+        self._entries: Dict[str, Tuple[float, FrozenSet[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: str, refresh: bool = False) -> FrozenSet[str]:
+        """Company IDs owned by `user_id` (from cache unless expired or `refresh`)."""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and not refresh and entry[0] > now:
+            return entry[1]
+        ids = frozenset(row[0] for row in db.query(Company.id).filter(Company.user_id == user_id).all())
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl_seconds, ids)
+        return ids
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+user_company_cache = UserCompanyCache()
+
+
+def get_user_company_ids(db: Session, user_id: str) -> FrozenSet[str]:
+    return user_company_cache.get(db, user_id)
+
+
+def user_owns_company(db: Session, user_id: str, company_id: Optional[str]) -> bool:
+    """Check ownership from the cache; only a negative answer goes back to the database."""
+    if company_id is None:
+        return False
+    if company_id in user_company_cache.get(db, user_id):
+        return True
+    return company_id in user_company_cache.get(db, user_id, refresh=True)
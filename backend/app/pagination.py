@@ -0,0 +1,29 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor identifies a row by its (created_at, id) pair and is handed to clients
+as an opaque URL-safe token.
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException, status
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encode a (created_at, id) position as an opaque token."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Decode a token produced by `encode_cursor`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -2,13 +2,21 @@
 Permission system for role-based access control (database-driven).
 All roles and permissions are stored in the database - no hardcoded values.
 """
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
 from fastapi import HTTPException, status, Depends
-from typing import List, Set, Optional, Optional
+from typing import Dict, FrozenSet, List, Set, Optional, Optional
+from sqlalchemy import and_, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
 from app.models.user import User
-from app.models.role import Role, Permission
+from app.models.role import Role, Permission as PermissionModel, role_permissions
 from app.auth import get_current_active_user
-from app.database import get_db
+from app.database import TENANT_INFO_KEY, get_db, tenant_engines
+from app.config import settings
 
 
 # Permission ID constants - These are just string constants for type safety
@@ -40,19 +48,127 @@ class Permission:
     MANAGE_ACTIVITIES = PERMISSION_IDS["MANAGE_ACTIVITIES"]
 
 
+@dataclass(frozen=True)
+class _LoadedMatrix:
+    roles: Dict[str, FrozenSet[str]]
+    role_names: Dict[str, str]
+    version: str
+    expires_at: float
+
+
+class PermissionMatrix:
+    """
+    Cached role -> active permission IDs map, loaded with a single query.
+
+    Roles and permissions are a catalog per database, so there is one map per
+    database (tenants with a dedicated database have their own). A map is
+    reloaded after PERMISSION_MATRIX_CACHE_SECONDS, when a role it does not
+    know is asked for, and right after a commit in this process that changed
+    roles, permissions or role_permissions in its database. The version
+    identifies the content, so it only changes when the permissions actually
+    change.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.PERMISSION_MATRIX_CACHE_SECONDS
+        self._matrices: Dict[Engine, _LoadedMatrix] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _engine(db: Session) -> Engine:
+        return tenant_engines.get(db.info.get(TENANT_INFO_KEY))
+
+    def _load(self, db: Session) -> _LoadedMatrix:
+        rows = (
+            db.query(Role.id, Role.name, Role.is_active, PermissionModel.id.label("permission_id"))
+            .outerjoin(role_permissions, role_permissions.c.role_id == Role.id)
+            .outerjoin(
+                PermissionModel,
+                and_(PermissionModel.id == role_permissions.c.permission_id, PermissionModel.is_active.is_(True)),
+            )
+            .all()
+        )
+        roles: Dict[str, Set[str]] = {}
+        names: Dict[str, str] = {}
+        for role_id, name, is_active, permission_id in rows:
+            permissions = roles.setdefault(role_id, set())
+            names[role_id] = name
+            # Inactive roles grant nothing
+            if is_active and permission_id is not None:
+                permissions.add(permission_id)
+        frozen = {role_id: frozenset(permissions) for role_id, permissions in roles.items()}
+        digest = hashlib.sha1(
+            repr(sorted((role_id, sorted(permissions)) for role_id, permissions in frozen.items())).encode("utf-8")
+        ).hexdigest()[:16]
+        matrix = _LoadedMatrix(frozen, names, digest, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._matrices[self._engine(db)] = matrix
+        return matrix
+
+    def _matrix(self, db: Session) -> _LoadedMatrix:
+        matrix = self._matrices.get(self._engine(db))
+        if matrix is None or time.monotonic() >= matrix.expires_at:
+            matrix = self._load(db)
+        return matrix
+
+    def permissions_for(self, role_id: Optional[str], db: Session) -> FrozenSet[str]:
+        """Active permissions of a role (empty for unknown or inactive roles)."""
+        permissions = self._matrix(db).roles.get(role_id)
+        if permissions is None and role_id is not None:
+            # Possibly a role created after the last load
+            permissions = self._load(db).roles.get(role_id)
+        return permissions or frozenset()
+
+    def role_name(self, role_id: Optional[str], db: Session) -> Optional[str]:
+        return self._matrix(db).role_names.get(role_id)
+
+    def current_version(self, db: Session) -> str:
+        return self._matrix(db).version
+
+    def invalidate(self, db: Optional[Session] = None) -> None:
+        """Drop the map of the session's database (all maps without a session)."""
+        with self._lock:
+            if db is None:
+                self._matrices.clear()
+            else:
+                self._matrices.pop(self._engine(db), None)
+
+
+permission_matrix = PermissionMatrix()
+
+_MATRIX_TABLES = {Role.__tablename__, PermissionModel.__tablename__, role_permissions.name}
+_MATRIX_CHANGED_KEY = "permission_matrix_changed"
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_matrix_changes(session: Session, flush_context) -> None:
+    # Role.permissions changes mark the role dirty, so the ORM side is covered here
+    if any(isinstance(obj, (Role, PermissionModel)) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_MATRIX_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_matrix_statements(orm_execute_state) -> None:
+    # INSERT/UPDATE/DELETE statements executed directly (e.g. on role_permissions)
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase) and getattr(statement.table, "name", None) in _MATRIX_TABLES:
+        orm_execute_state.session.info[_MATRIX_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_matrix_after_commit(session: Session) -> None:
+    if session.info.pop(_MATRIX_CHANGED_KEY, False):
+        permission_matrix.invalidate(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_matrix_flag(session: Session) -> None:
+    session.info.pop(_MATRIX_CHANGED_KEY, None)
+
+
 def get_user_permissions(user: User, db: Session) -> Set[str]:
-    """Get all permissions for a user based on their role from the database."""
-    # Load role
-    role = db.query(Role).filter(Role.id == user.role_id).first()
-    
-    if not role or not role.is_active:
-        return set()
-    
-    # Get all permission IDs for this role
-    # Access permissions through the relationship (lazy="dynamic" allows querying)
-    permissions = role.permissions.filter(Permission.is_active == True).all()
-    
-    return {perm.id for perm in permissions}
+    """Get all permissions for a user based on their role (from the cached matrix)."""
+    return set(permission_matrix.permissions_for(user.role_id, db))
 
 
 def has_permission(user: User, permission: str, db: Session) -> bool:
@@ -61,36 +177,54 @@ def has_permission(user: User, permission: str, db: Session) -> bool:
     return permission in user_permissions
 
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user with their role and permission set, resolved once per request."""
+    user: User
+    role_id: str
+    permissions: FrozenSet[str]
+
+    def has(self, permission: str) -> bool:
+        return permission in self.permissions
+
+
+def get_principal(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Dependency resolving the principal. FastAPI caches it per request, so every
+    permission dependency of an endpoint shares the single user load done by
+    get_current_active_user; permissions come from the cached matrix.
+    """
+    return Principal(
+        user=current_user,
+        role_id=current_user.role_id,
+        permissions=permission_matrix.permissions_for(current_user.role_id, db),
+    )
+
+
 def require_permission(permission: str):
     """Dependency to require a specific permission."""
-    def permission_checker(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
-    ) -> User:
-        if not has_permission(current_user, permission, db):
+    def permission_checker(principal: Principal = Depends(get_principal)) -> User:
+        if not principal.has(permission):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permission denied: {permission}"
             )
-        return current_user
+        return principal.user
     return permission_checker
 
 
 def require_role(required_role_ids: List[str]):
     """Dependency to require one of the specified roles (by ID from database)."""
-    def role_checker(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
-    ) -> User:
-        # Reload user with role to ensure we have the latest data
-        user = db.query(User).filter(User.id == current_user.id).first()
-        
-        if not user or user.role_id not in required_role_ids:
+    def role_checker(principal: Principal = Depends(get_principal)) -> User:
+        if principal.role_id not in required_role_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required roles: {required_role_ids}"
             )
-        return user
+        return principal.user
     return role_checker
 
 
@@ -105,8 +239,8 @@ def get_roles_by_permission(permission_id: str, db: Session) -> List[Role]:
     return db.query(Role).join(
         Role.permissions
     ).filter(
-        Permission.id == permission_id,
-        Permission.is_active == True,
+        PermissionModel.id == permission_id,
+        PermissionModel.is_active == True,
         Role.is_active == True
     ).all()
 
@@ -117,32 +251,24 @@ def user_has_role_with_permission(user: User, permission_id: str, db: Session) -
 
 
 # Convenience dependencies for common role checks - all based on permissions from database
-def require_licenciador_or_admin(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-) -> User:
-    """Require role that has VIEW_ADMIN permission (fetched from database)."""
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user or not user_has_role_with_permission(user, Permission.VIEW_ADMIN, db):
+def require_licenciador_or_admin(principal: Principal = Depends(get_principal)) -> User:
+    """Require role that has VIEW_ADMIN permission."""
+    if not principal.has(Permission.VIEW_ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. This endpoint requires a role with VIEW_ADMIN permission."
         )
-    return user
+    return principal.user
 
 
-def require_admin(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-) -> User:
-    """Require role that has MANAGE_USERS permission (fetched from database)."""
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user or not user_has_role_with_permission(user, Permission.MANAGE_USERS, db):
+def require_admin(principal: Principal = Depends(get_principal)) -> User:
+    """Require role that has MANAGE_USERS permission."""
+    if not principal.has(Permission.MANAGE_USERS):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. This endpoint requires a role with MANAGE_USERS permission."
         )
-    return user
+    return principal.user
 
 
 def can_access_admin(user: User, db: Session) -> bool:
@@ -0,0 +1,200 @@
+"""
+Sliding-window rate limiting (used by /auth/login).
+
+Counts are kept per key in fixed windows; the sliding count is the current
+window plus the previous one weighted by how much of it still overlaps the
+sliding window. An attempt is counted first and judged on the counts the
+increment returned, so concurrent attempts can never all pass a check made
+before any of them was counted. Keys are stored as SHA-256 hashes, so the
+counters hold no IPs or email addresses. Two stores are available:
+
+- "memory": per-process dictionary (single worker, or limits per worker).
+- "postgres": UNLOGGED `rate_limit_counters` table shared by all workers.
+"""
+import hashlib
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from app.config import settings
+
+
+class LocalRateLimitStore:
+    """In-process counters: key -> [window index, count, previous window count, expiry time]."""
+
+    # Expired keys are dropped every this many hits
+    PRUNE_EVERY = 10000
+
+    def __init__(self):
+        self._counters: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def _current(self, key: str, window_index: int) -> Tuple[int, int]:
+        entry = self._counters.get(key)
+        if entry is None or entry[0] < window_index - 1:
+            return 0, 0
+        if entry[0] == window_index - 1:
+            return 0, entry[1]
+        return entry[1], entry[2]
+
+    def hit(self, key: str, window_index: int, window_seconds: int) -> Tuple[int, int]:
+        """Count a hit; return (current window count including it, previous window count)."""
+        with self._lock:
+            current, previous = self._current(key, window_index)
+            current += 1
+            # Needed until the next window ends (as its previous window)
+            self._counters[key] = [window_index, current, previous, (window_index + 2) * window_seconds]
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                self._prune()
+            return current, previous
+
+    def hit_many(self, hits: Sequence[Tuple[str, int, int]]) -> List[Tuple[int, int]]:
+        return [self.hit(key, window_index, window_seconds) for key, window_index, window_seconds in hits]
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [key for key, entry in self._counters.items() if entry[3] <= now]
+        for key in expired:
+            del self._counters[key]
+
+
+class PostgresRateLimitStore:
+    """Counters in an UNLOGGED table, shared by every worker."""
+
+    # Probability that a hit also deletes every expired window
+    CLEANUP_PROBABILITY = 0.01
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from app.database import engine
+        self.engine = engine
+
+    def hit(self, key: str, window_index: int, window_seconds: int) -> Tuple[int, int]:
+        return self.hit_many([(key, window_index, window_seconds)])[0]
+
+    def hit_many(self, hits: Sequence[Tuple[str, int, int]]) -> List[Tuple[int, int]]:
+        """Count a hit on each (distinct) key in one statement on one connection."""
+        keys = [key for key, _, _ in hits]
+        with self.engine.begin() as connection:
+            rows = connection.execute(
+                text("""
+                    WITH hit AS (
+                        INSERT INTO rate_limit_counters (key, window_index, count, expires_at)
+                        SELECT key, window_index, 1, to_timestamp((window_index + 2) * window_seconds)
+                        FROM unnest(
+                            CAST(:keys AS varchar[]), CAST(:windows AS bigint[]), CAST(:window_seconds AS integer[])
+                        ) AS h(key, window_index, window_seconds)
+                        ON CONFLICT (key, window_index)
+                        DO UPDATE SET count = rate_limit_counters.count + 1
+                        RETURNING key, window_index, count
+                    )
+                    SELECT hit.key, hit.count AS current, COALESCE(previous.count, 0) AS previous
+                    FROM hit
+                    LEFT JOIN rate_limit_counters previous
+                        ON previous.key = hit.key AND previous.window_index = hit.window_index - 1
+                """),
+                {
+                    "keys": keys,
+                    "windows": [window_index for _, window_index, _ in hits],
+                    "window_seconds": [window_seconds for _, _, window_seconds in hits],
+                },
+            ).fetchall()
+            if random.random() < self.CLEANUP_PROBABILITY:
+                # Every key's, so counters of IPs/emails never seen again do not pile up
+                connection.execute(text("DELETE FROM rate_limit_counters WHERE expires_at < now()"))
+        counts = {row.key: (row.current, row.previous) for row in rows}
+        return [counts[key] for key in keys]
+
+    def reset(self, key: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM rate_limit_counters WHERE key = :key"), {"key": key})
+
+
+def get_store():
+    """Return the store configured in settings."""
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresRateLimitStore()
+    return LocalRateLimitStore()
+
+
+class SlidingWindowLimiter:
+    """Allows at most `limit` hits per key in any `window_seconds` interval (approximately)."""
+
+    def __init__(self, name: str, limit: int, window_seconds: int, store=None):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.store = store if store is not None else get_store()
+
+    def key(self, key: str) -> str:
+        return hashlib.sha256(f"{self.name}:{key}".encode("utf-8")).hexdigest()
+
+    def window_index(self, now: float) -> int:
+        return int(now // self.window_seconds)
+
+    def retry_after(self, current: int, previous: int, now: float) -> int:
+        """Seconds until the key may try again (0 if allowed), given counts that include this attempt."""
+        elapsed = (now % self.window_seconds) / self.window_seconds
+        # The attempt itself is counted: `limit` earlier ones are allowed in the window
+        if previous * (1 - elapsed) + current <= self.limit:
+            return 0
+        # Worst case: wait for the current window to end
+        return max(1, int((self.window_index(now) + 1) * self.window_seconds - now))
+
+    def hit(self, key: str, now: Optional[float] = None) -> int:
+        """Count an attempt for `key`; return its Retry-After (0 if allowed)."""
+        return hit_limiters([(self, key)], now)
+
+    def reset(self, key: str) -> None:
+        self.store.reset(self.key(key))
+
+
+def hit_limiters(hits: Sequence[Tuple[SlidingWindowLimiter, str]], now: Optional[float] = None) -> int:
+    """
+    Count an attempt on each (limiter, key) with a single store call and
+    return the longest Retry-After (0 if every limiter allows it). The
+    limiters must share a store.
+    """
+    now = time.time() if now is None else now
+    store = hits[0][0].store
+    counts = store.hit_many(
+        [(limiter.key(key), limiter.window_index(now), limiter.window_seconds) for limiter, key in hits]
+    )
+    return max(
+        limiter.retry_after(current, previous, now)
+        for (limiter, _), (current, previous) in zip(hits, counts)
+    )
+
+
+# Every attempt counts per IP. Per email the attempt is counted up front too,
+# but a successful login resets the email's counter, so only failures
+# accumulate and a user is never locked out by their own history
+login_store = get_store()
+login_ip_limiter = SlidingWindowLimiter(
+    "login-ip", settings.LOGIN_RATE_LIMIT_IP_ATTEMPTS, settings.LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS, store=login_store
+)
+login_email_limiter = SlidingWindowLimiter(
+    "login-email",
+    settings.LOGIN_RATE_LIMIT_EMAIL_ATTEMPTS,
+    settings.LOGIN_RATE_LIMIT_EMAIL_WINDOW_SECONDS,
+    store=login_store,
+)
+
+
+def check_login_rate_limit(ip: str, email: str) -> None:
+    """Count a login attempt and reject it, before any database lookup or password hashing, when over a limit."""
+    retry_after = hit_limiters([(login_ip_limiter, ip), (login_email_limiter, email)])
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,160 @@
+"""
+Read replica routing with read-your-writes consistency.
+
+Sessions opened for GET/HEAD requests read from the replica (see
+app.database.TenantSession.get_bind) while it is healthy, lags less than
+REPLICA_MAX_LAG_SECONDS and has replayed the client's last write. Writes
+always go to the primary.
+
+Read-your-writes: when a request commits a write, the primary's WAL
+position (LSN) after the commit is sent back in the `db_lsn` cookie. A later
+read carrying the cookie only uses the replica once its sampled replay LSN
+has reached that position, so a client never reads data older than its own
+writes.
+"""
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+
+LSN_COOKIE = "db_lsn"
+READ_METHODS = {"GET", "HEAD"}
+
+
+def parse_lsn(value: Optional[str]) -> Optional[int]:
+    """Postgres LSN text ("16/B374D848") to an integer, or None if malformed."""
+    if not value:
+        return None
+    high, sep, low = value.partition("/")
+    if not sep:
+        return None
+    try:
+        return (int(high, 16) << 32) | int(low, 16)
+    except ValueError:
+        return None
+
+
+def format_lsn(lsn: int) -> str:
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+@dataclass
+class ReadConsistency:
+    """Per-request routing state shared by the request's sessions."""
+
+    read_only: bool = False
+    min_lsn: Optional[int] = None  # From the db_lsn cookie
+    commit_lsn: Optional[int] = None  # Primary LSN after this request's last commit
+
+    def committed(self, lsn: int) -> None:
+        if self.commit_lsn is None or lsn > self.commit_lsn:
+            self.commit_lsn = lsn
+
+
+request_consistency: ContextVar[Optional[ReadConsistency]] = ContextVar("request_consistency", default=None)
+
+
+class ReplicaMonitor:
+    """Replay position and lag of the replica, sampled every REPLICA_CHECK_INTERVAL_SECONDS."""
+
+    def __init__(
+        self,
+        replica_engine: Engine,
+        max_lag_seconds: Optional[float] = None,
+        interval_seconds: Optional[float] = None,
+    ):
+        self.engine = replica_engine
+        self.max_lag_seconds = max_lag_seconds if max_lag_seconds is not None else settings.REPLICA_MAX_LAG_SECONDS
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else settings.REPLICA_CHECK_INTERVAL_SECONDS
+        )
+        self.replay_lsn: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def refresh(self) -> None:
+        with self._lock:
+            if not self.is_stale:
+                return
+            try:
+                with self.engine.connect() as connection:
+                    # No lag while everything received has been replayed (an
+                    # idle primary would otherwise look like a growing lag)
+                    replay_lsn, lag = connection.execute(text(
+                        "SELECT pg_last_wal_replay_lsn()::text, "
+                        "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                    )).one()
+                self.replay_lsn = parse_lsn(replay_lsn)
+                self.lag_seconds = float(lag) if lag is not None else None
+                self.healthy = self.replay_lsn is not None and self.lag_seconds is not None
+            except Exception as e:
+                self.healthy = False
+                sys.stderr.write(f"\033[91m[REPLICA]\033[0m - replica check failed: {e}\n")
+                sys.stderr.flush()
+            self._expires_at = time.monotonic() + self.interval_seconds
+
+    def can_serve(self, min_lsn: Optional[int] = None) -> bool:
+        """Whether a read that must see `min_lsn` can go to the replica."""
+        if not self.healthy or self.lag_seconds > self.max_lag_seconds:
+            return False
+        return min_lsn is None or self.replay_lsn >= min_lsn
+
+
+def _cookie_lsn(scope) -> Optional[int]:
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            cookie = SimpleCookie()
+            try:
+                cookie.load(value.decode("latin-1"))
+            except Exception:
+                continue
+            if LSN_COOKIE in cookie:
+                return parse_lsn(cookie[LSN_COOKIE].value)
+    return None
+
+
+class ReadConsistencyMiddleware:
+    """Mark read requests for the replica and return the db_lsn cookie after writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        from app.database import replica_monitor
+
+        if scope["type"] != "http" or replica_monitor is None:
+            await self.app(scope, receive, send)
+            return
+
+        consistency = ReadConsistency(read_only=scope["method"] in READ_METHODS, min_lsn=_cookie_lsn(scope))
+        if consistency.read_only and replica_monitor.is_stale:
+            await run_in_threadpool(replica_monitor.refresh)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and consistency.commit_lsn is not None:
+                cookie = (
+                    f"{LSN_COOKIE}={format_lsn(consistency.commit_lsn)}; "
+                    f"Max-Age={settings.READ_YOUR_WRITES_COOKIE_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        token = request_consistency.set(consistency)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_consistency.reset(token)
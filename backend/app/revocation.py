@@ -0,0 +1,161 @@
+"""
+Access token revocation list.
+
+Revoked tokens are stored in `revoked_tokens` and mirrored in memory, so the
+per-request check never touches the database: a bloom filter answers "surely
+not revoked" for almost every token, and only its (rare) positives are
+confirmed against the exact set.
+
+Every worker reloads the list from the database every
+REVOCATION_SYNC_SECONDS (one RevocationSync per database: the default one
+and each tenant's dedicated database); revocations made by this worker are
+visible at once.
+"""
+import hashlib
+import math
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.token import RevokedToken
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """In-memory view of the unexpired rows of `revoked_tokens`."""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.REVOCATION_BLOOM_CAPACITY
+        self._lock = threading.Lock()
+        self._expires: Dict[str, datetime] = {}
+        self._bloom = BloomFilter(self.capacity)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Check a token id without touching the database."""
+        if not jti or jti not in self._bloom:
+            return False
+        return jti in self._expires
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        """Record a revocation made by this worker (the row is written by the caller)."""
+        with self._lock:
+            self._expires[jti] = expires_at
+            self._bloom.add(jti)
+
+    def replace(self, entries: Iterable) -> None:
+        """Swap in a freshly loaded list of (jti, expires_at) pairs."""
+        expires = dict(entries)
+        bloom = BloomFilter(max(self.capacity, len(expires) * 2))
+        for jti in expires:
+            bloom.add(jti)
+        with self._lock:
+            # Keep local revocations newer than the snapshot, and those
+            # loaded from the other databases
+            for jti, expires_at in self._expires.items():
+                if jti not in expires and expires_at > datetime.now(timezone.utc):
+                    expires[jti] = expires_at
+                    bloom.add(jti)
+            self._expires, self._bloom = expires, bloom
+
+    def sync(self, db: Session) -> int:
+        """Reload the unexpired revocations from the database."""
+        rows = (
+            db.query(RevokedToken.jti, RevokedToken.expires_at)
+            .filter(RevokedToken.expires_at > datetime.now(timezone.utc))
+            .all()
+        )
+        self.replace((row.jti, row.expires_at) for row in rows)
+        return len(rows)
+
+
+revocation_list = RevocationList()
+
+
+def revoke_access_token(db: Session, jti: str, user_id: Optional[str], expires_at: datetime) -> None:
+    """Persist a revocation (committed by the caller) and apply it locally at once."""
+    db.merge(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    revocation_list.add(jti, expires_at)
+
+
+def purge_expired_revocations(db: Session) -> int:
+    """Delete revocations of tokens that have expired anyway."""
+    return (
+        db.query(RevokedToken)
+        .filter(RevokedToken.expires_at <= datetime.now(timezone.utc))
+        .delete(synchronize_session=False)
+    )
+
+
+class RevocationSync:
+    """Background thread that keeps `revocation_list` in sync with the database."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else settings.REVOCATION_SYNC_SECONDS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync_once(self) -> int:
+        db = self.session_factory()
+        try:
+            purge_expired_revocations(db)
+            db.commit()
+            return revocation_list.sync(db)
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                sys.stderr.write(f"\033[91m[AUTH]\033[0m - revocation sync error: {e}\n")
+                sys.stderr.flush()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Start syncing in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="revocation-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
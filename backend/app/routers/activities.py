@@ -1,19 +1,53 @@
 """
 Activity management routes.
 """
-from fastapi import APIRouter, Depends
+import time
+import orjson
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy import nullslast
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import Dict, List, Tuple
+from app.database import TENANT_INFO_KEY, get_db, tenant_engines
 from app.models.activity import Activity
 from app.schemas.activity import ActivityResponse
+from app.compression import PrecompressedPayload
+from app.http_cache import make_etag, is_not_modified
+from app.serialization import json_response
+from app.config import settings
 
 router = APIRouter(prefix="/activities", tags=["activities"])
 
+# The catalog changes only through migrations/seeds, so it is serialized and
+# compressed once and served from memory for ACTIVITY_CATALOG_CACHE_SECONDS.
+# One per database: tenants with a dedicated database have their own catalog
+_catalogs: Dict[Engine, Tuple[PrecompressedPayload, float]] = {}
+
+
+def get_activity_catalog(db: Session) -> PrecompressedPayload:
+    """Return the active activities of the session's database, serialized and pre-compressed."""
+    engine = tenant_engines.get(db.info.get(TENANT_INFO_KEY))
+    cached = _catalogs.get(engine)
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
+
+    activities = (
+        db.query(Activity)
+        .filter(Activity.is_active.is_(True))
+        .order_by(nullslast(Activity.sort_order.asc()), Activity.name.asc())
+        .all()
+    )
+    body = orjson.dumps(
+        [ActivityResponse.model_validate(activity).model_dump(mode="json") for activity in activities]
+    )
+    catalog = PrecompressedPayload(body, etag=make_etag(body))
+    _catalogs[engine] = (catalog, time.monotonic() + settings.ACTIVITY_CATALOG_CACHE_SECONDS)
+    return catalog
+
 
 @router.get("/", response_model=List[ActivityResponse])
 async def get_activities(
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """Get list of available activities.
@@ -21,13 +55,10 @@ async def get_activities(
     This endpoint is intentionally public so the "Novo Processo" form can
     populate the activities dropdown without requiring authentication.
     """
-    activities = (
-        db.query(Activity)
-        .filter(Activity.is_active.is_(True))
-        .order_by(nullslast(Activity.sort_order.asc()), Activity.name.asc())
-        .all()
-    )
-    return [ActivityResponse.model_validate(activity) for activity in activities]
+    catalog = get_activity_catalog(db)
+    if is_not_modified(request, catalog.etag, None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": catalog.etag})
+    return catalog.response(request)
 
 
 @router.get("/{activity_id}", response_model=ActivityResponse)
@@ -47,4 +78,4 @@ async def get_activity(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Activity not found"
         )
-    return ActivityResponse.model_validate(activity)
+    return json_response(ActivityResponse.model_validate(activity))
@@ -1,7 +1,7 @@
 """
 Authentication routes (login, register).
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_
 import uuid
@@ -9,16 +9,40 @@ from app.database import get_db
 from app.models.user import User
 from app.models.user_preferences import UserPreferences
 from app.models.role import Role
-from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
-from app.permissions import get_default_role
+from app.schemas.user import (
+    UserCreate,
+    UserLogin,
+    UserResponse,
+    UserPermissionsResponse,
+    Token,
+    RefreshTokenRequest,
+    LogoutRequest,
+)
+from app.permissions import get_default_role, permission_matrix
+from app.http_cache import make_etag, is_not_modified
 from app.auth import (
     verify_password,
+    verify_dummy_password,
+    password_needs_rehash,
+    rehash_password,
     get_password_hash,
     create_access_token,
+    create_refresh_token,
+    decode_access_token,
+    rotate_refresh_token,
+    revoke_refresh_token_family,
+    hash_token,
     get_current_active_user,
+    get_token_config,
+    oauth2_scheme,
 )
-from datetime import timedelta
+from app.models.token import RefreshToken
+from app.revocation import revoke_access_token
+from app.rate_limit import check_login_rate_limit, login_email_limiter
+from datetime import datetime, timedelta, timezone
 from app.config import settings
+from app.serialization import json_response
+from app.tenancy import get_current_tenant_id
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -26,8 +50,9 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
-    # Check if user with email or CNPJ already exists
+    # Check if user with email or CNPJ already exists in this tenant
     existing_user = db.query(User).filter(
+        User.tenant_id == get_current_tenant_id(),
         or_(
             User.email == user_data.email.lower(),
             User.cnpj == user_data.cnpj
@@ -106,31 +131,58 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": new_user.id},
+        data={"sub": new_user.id, "tid": new_user.tenant_id},
         expires_delta=access_token_expires
     )
+    user_response = UserResponse.model_validate(new_user)
+    _, refresh_token = create_refresh_token(db, new_user.id)
+    db.commit()
     
-    return Token(
+    return json_response(Token(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse.model_validate(new_user)
-    )
+        refresh_token=refresh_token,
+        user=user_response
+    ), status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    """Login and get access token."""
+async def login(
+    credentials: UserLogin,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Login and get access token.
+
+    Every attempt counts against the client IP and the email; a successful
+    login resets the email's counter, so only failures accumulate there.
+    Over a limit the request gets 429 before any query or password hashing.
+    Hashes with an outdated scheme or cost are replaced after the response.
+    """
+    email = credentials.email.lower()
+    client_ip = request.client.host if request.client else "unknown"
+    check_login_rate_limit(client_ip, email)
+    
     user = db.query(User).options(
         joinedload(User.preferences),
         joinedload(User.role_obj)
-    ).filter(User.email == credentials.email.lower()).first()
+    ).filter(User.tenant_id == get_current_tenant_id(), User.email == email).first()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if user is None:
+        verify_dummy_password(credentials.password)
+    if user is None or not verify_password(credentials.password, user.password_hash):
+        # Already counted against the email by check_login_rate_limit
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_email_limiter.reset(email)
+    
+    if password_needs_rehash(user.password_hash):
+        background_tasks.add_task(rehash_password, user.id, credentials.password, user.password_hash)
     
     # Create default preferences if user doesn't have any
     if user.preferences is None:
@@ -141,32 +193,132 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             notifications=True
         )
         db.add(user_prefs)
-        db.commit()
-        db.refresh(user, ['preferences'])
+        user.preferences = user_prefs
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id},
+        data={"sub": user.id, "tid": user.tenant_id},
         expires_delta=access_token_expires
     )
+    _, refresh_token = create_refresh_token(db, user.id)
+    
+    # Built before committing, while the loaded attributes are still current
+    user_response = UserResponse.model_validate(user)
+    db.commit()
     
-    return Token(
+    return json_response(Token(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse.model_validate(user)
+        refresh_token=refresh_token,
+        user=user_response
+    ))
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token.
+
+    No password check (and no bcrypt): the refresh token is looked up by its
+    hash and rotated, so each refresh token works only once.
+    """
+    user, refresh_token = rotate_refresh_token(db, request.refresh_token)
+    access_token = create_access_token(
+        data={"sub": user.id, "tid": user.tenant_id},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+    user_response = UserResponse.model_validate(user)
+    db.commit()
+    
+    return json_response(Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token,
+        user=user_response
+    ))
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: LogoutRequest,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Revoke the current access token and, if given, the refresh token (with its rotations)."""
+    payload = decode_access_token(token)
+    # Tokens issued before revocation support have no jti and simply expire
+    if payload.get("jti"):
+        revoke_access_token(
+            db,
+            payload["jti"],
+            current_user.id,
+            datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+        )
+    
+    if request.refresh_token:
+        family_id = (
+            db.query(RefreshToken.family_id)
+            .filter(
+                RefreshToken.token_hash == hash_token(request.refresh_token),
+                RefreshToken.user_id == current_user.id,
+            )
+            .scalar()
+        )
+        if family_id:
+            revoke_refresh_token_family(db, family_id)
+    
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get current user information (preferences and role come with the user load)."""
+    return json_response(UserResponse.model_validate(current_user))
+
+
+@router.get("/me/permissions", response_model=UserPermissionsResponse)
+async def get_current_user_permissions(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get current user information."""
-    # Reload with preferences and role
-    user = db.query(User).options(
-        joinedload(User.preferences),
-        joinedload(User.role_obj)
-    ).filter(User.id == current_user.id).first()
-    return UserResponse.model_validate(user)
+    """
+    Permissions of the current user's role, from the cached role/permission
+    matrix. The ETag changes only when the matrix or the user's role changes,
+    so clients can keep the list and revalidate with If-None-Match (304).
+    """
+    permissions = permission_matrix.permissions_for(current_user.role_id, db)
+    version = permission_matrix.current_version(db)
+    headers = {
+        "ETag": make_etag(version, current_user.role_id),
+        "Cache-Control": "private, no-cache",
+    }
+    if is_not_modified(request, headers["ETag"], None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return json_response(
+        UserPermissionsResponse(
+            role=current_user.role_id,
+            role_name=permission_matrix.role_name(current_user.role_id, db),
+            permissions=sorted(permissions),
+            version=version,
+        ),
+        headers=headers,
+    )
+
+
+@router.get("/jwks")
+async def get_jwks():
+    """
+    Public signing keys (JWK set) for services that verify access tokens
+    locally. Only RS256/ES256 keys are published; HMAC keys stay private.
+    """
+    return json_response(
+        get_token_config().key_ring.public_jwks(),
+        headers={"Cache-Control": "public, max-age=300"},
+    )
@@ -0,0 +1,244 @@
+"""
+Company management routes.
+"""
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db, id_in_array
+from app.models.user import User
+from app.models.company import Company, company_activities
+from app.models.activity import Activity
+from app.models.process import Process
+from app.schemas.company import CompanyCreate, CompanyResponse, CompanyUpdate, CompanyActivityAssociation
+from app.auth import get_current_active_user
+from app.permissions import Permission, can_view_all_processes, has_permission
+from app.loaders import RequestLoaders, get_loaders
+from app.ownership import user_company_cache
+from app.serialization import json_response
+from app.idempotency import IdempotentRoute
+from app.tenancy import get_current_tenant_id
+
+router = APIRouter(prefix="/companies", tags=["companies"], route_class=IdempotentRoute)
+
+
+def company_response(company: Company, loaders: RequestLoaders) -> CompanyResponse:
+    """Build the response with the activity IDs from the request's batch loader."""
+    return CompanyResponse.model_validate({
+        **company.__dict__,
+        "activity_ids": list(loaders.company_activity_ids.load(company.id)),
+    })
+
+
+def get_company_or_404(company_id: str, loaders: RequestLoaders) -> Company:
+    company = loaders.companies.load(company_id)
+    if company is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Company not found"
+        )
+    return company
+
+
+def check_can_view(company: Company, current_user: User, db: Session) -> None:
+    """Owners see their companies; roles with VIEW_ALL_PROCESSES see every company."""
+    if company.user_id != current_user.id and not can_view_all_processes(current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this company"
+        )
+
+
+def check_can_edit(company: Company, current_user: User, db: Session) -> None:
+    """Owners edit their companies; roles with MANAGE_USERS edit any company."""
+    if company.user_id != current_user.id and not has_permission(current_user, Permission.MANAGE_USERS, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this company"
+        )
+
+
+def validate_activity_ids(activity_ids: List[str], db: Session) -> List[str]:
+    """Return the de-duplicated IDs, or 400 if any activity does not exist."""
+    activity_ids = list(dict.fromkeys(activity_ids))
+    if not activity_ids:
+        return activity_ids
+    found = {row[0] for row in db.query(Activity.id).filter(id_in_array(Activity.id, activity_ids)).all()}
+    missing = [activity_id for activity_id in activity_ids if activity_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid activities: {', '.join(missing)}"
+        )
+    return activity_ids
+
+
+@router.get("/", response_model=List[CompanyResponse])
+async def get_companies(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    List companies: the user's own, or all of them for roles with
+    VIEW_ALL_PROCESSES. Activity links are loaded in one batched query.
+    """
+    query = db.query(Company)
+    if not can_view_all_processes(current_user, db):
+        query = query.filter(Company.user_id == current_user.id)
+    companies = query.order_by(Company.razao_social.asc(), Company.id.asc()).offset(skip).limit(limit).all()
+
+    loaders.prime_companies(companies)
+    loaders.company_activity_ids.load_many(company.id for company in companies)
+    return json_response([company_response(company, loaders) for company in companies])
+
+
+@router.post("/", response_model=CompanyResponse, status_code=status.HTTP_201_CREATED)
+async def create_company(
+    company_data: CompanyCreate,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create a company owned by the current user."""
+    if db.query(Company.id).filter(
+        Company.tenant_id == get_current_tenant_id(), Company.cnpj == company_data.cnpj
+    ).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CNPJ already registered"
+        )
+    activity_ids = validate_activity_ids(company_data.activity_ids or [], db)
+
+    values = company_data.model_dump(exclude={"activity_ids"})
+    if values.get("endereco") is not None:
+        values["endereco"] = company_data.endereco.model_dump()
+    company = Company(id=str(uuid.uuid4()), user_id=current_user.id, **values)
+    db.add(company)
+    db.flush()
+    if activity_ids:
+        db.execute(
+            insert(company_activities),
+            [{"company_id": company.id, "activity_id": activity_id} for activity_id in activity_ids],
+        )
+    db.commit()
+    user_company_cache.invalidate(current_user.id)
+
+    db.refresh(company)
+    loaders.company_activity_ids.prime(company.id, tuple(sorted(activity_ids)))
+    return json_response(company_response(company, loaders), status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/{company_id}", response_model=CompanyResponse)
+async def get_company(
+    company_id: str,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a specific company."""
+    company = get_company_or_404(company_id, loaders)
+    check_can_view(company, current_user, db)
+    return json_response(company_response(company, loaders))
+
+
+@router.patch("/{company_id}", response_model=CompanyResponse)
+async def update_company(
+    company_id: str,
+    company_update: CompanyUpdate,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Update company data (CNPJ and owner cannot change)."""
+    company = get_company_or_404(company_id, loaders)
+    check_can_edit(company, current_user, db)
+
+    update_data = company_update.model_dump(exclude_unset=True)
+    if update_data.get("endereco") is not None:
+        update_data["endereco"] = company_update.endereco.model_dump()
+    for field, value in update_data.items():
+        setattr(company, field, value)
+
+    db.commit()
+    db.refresh(company)
+    return json_response(company_response(company, loaders))
+
+
+@router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_company(
+    company_id: str,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Delete a company that has no processes."""
+    company = get_company_or_404(company_id, loaders)
+    check_can_edit(company, current_user, db)
+
+    # Processes cascade with the company; never drop them implicitly
+    if db.query(Process.id).filter(Process.company_id == company_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Company has processes and cannot be deleted"
+        )
+
+    owner_id = company.user_id
+    db.delete(company)
+    db.commit()
+    user_company_cache.invalidate(owner_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/{company_id}/activities", response_model=CompanyResponse)
+async def link_company_activities(
+    company_id: str,
+    association: CompanyActivityAssociation,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Link activities to a company (already linked ones are ignored)."""
+    company = get_company_or_404(company_id, loaders)
+    check_can_edit(company, current_user, db)
+
+    activity_ids = validate_activity_ids(association.activity_ids, db)
+    linked = set(loaders.company_activity_ids.load(company_id))
+    new_ids = [activity_id for activity_id in activity_ids if activity_id not in linked]
+    if new_ids:
+        db.execute(
+            insert(company_activities),
+            [{"company_id": company_id, "activity_id": activity_id} for activity_id in new_ids],
+        )
+
+    response = CompanyResponse.model_validate({
+        **company.__dict__,
+        "activity_ids": sorted(linked | set(new_ids)),
+    })
+    db.commit()
+    return json_response(response)
+
+
+@router.delete("/{company_id}/activities/{activity_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def unlink_company_activity(
+    company_id: str,
+    activity_id: str,
+    db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Remove an activity from a company."""
+    company = get_company_or_404(company_id, loaders)
+    check_can_edit(company, current_user, db)
+
+    db.execute(
+        delete(company_activities).where(
+            company_activities.c.company_id == company_id,
+            company_activities.c.activity_id == activity_id,
+        )
+    )
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
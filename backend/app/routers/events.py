@@ -0,0 +1,91 @@
+"""
+Push routes (Server-Sent Events) for process status changes.
+"""
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models.user import User
+from app.models.process import Process
+from app.models.company import Company
+from app.auth import get_current_user_from_header_or_query
+from app.permissions import can_view_all_processes
+from app.events import Subscription, broker, format_sse
+from app.config import settings
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+}
+
+
+def event_stream(subscription: Subscription):
+    """Stream events of a subscription, with heartbeats to keep proxies from timing out."""
+    async def stream():
+        broker.subscribe(subscription)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(payload)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/processes")
+async def stream_process_events(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_header_or_query)
+):
+    """
+    Stream status changes of every process the user can see.
+
+    Roles with VIEW_ALL_PROCESSES receive all events; empreendedores only the
+    events of their own companies' processes. Pass the token as `?access_token=`
+    when using EventSource.
+    """
+    if can_view_all_processes(current_user, db):
+        subscription = Subscription(everything=True, tenant_id=current_user.tenant_id)
+    else:
+        subscription = Subscription(owner_id=current_user.id)
+    return event_stream(subscription)
+
+
+@router.get("/processes/{process_id}")
+async def stream_single_process_events(
+    process_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_header_or_query)
+):
+    """Stream status changes of a single process."""
+    owner_id = (
+        db.query(Company.user_id)
+        .join(Process, Process.company_id == Company.id)
+        .filter(Process.id == process_id)
+        .scalar()
+    )
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Process not found"
+        )
+
+    # Check permissions - empreendedores can only follow their own company's processes
+    if owner_id != current_user.id and not can_view_all_processes(current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this process"
+        )
+
+    return event_stream(Subscription(process_id=process_id))
@@ -1,19 +1,32 @@
 """
 Process management routes.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import cast, func, insert, literal, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import DataError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 from datetime import date, timedelta
+from dataclasses import asdict
+import enum
+import io
 import uuid
-from app.database import get_db
+from app.database import get_db, SessionLocal, id_in_array
 from app.models.user import User
 from app.models.process import Process, ProcessStatus, ProcessDocument, ProcessHistory
 from app.models.activity import Activity
+from app.models.company import Company
 from app.schemas.process import (
     ProcessCreate,
     ProcessResponse,
     ProcessUpdate,
+    ProcessDataResponse,
+    ProcessBulkUpdate,
+    ProcessBulkUpdateResponse,
+    ProcessBulkUpdateResult,
+    ProcessImportResponse,
     ProcessDocumentResponse,
     ProcessHistoryResponse,
 )
@@ -23,9 +36,91 @@ from app.permissions import (
     can_manage_processes,
     require_licenciador_or_admin,
 )
-from app.database import get_db
+from app.notifications import enqueue_process_status_change, enqueue_process_status_changes_bulk
+from app.exports import (
+    build_export_select,
+    export_header,
+    get_process_data_keys,
+    iter_export_rows,
+    stream_csv,
+    stream_xlsx,
+)
+from app.imports import ProcessImporter, detect_format, iter_records
+from app.json_patch import (
+    PatchError,
+    json_patch_expression,
+    json_patch_keys,
+    json_patch_values,
+    merge_patch_expression,
+)
+from app.pagination import encode_cursor, decode_cursor
+from app.events import process_status_event, publish_events
+from app.config import settings
+from app.http_cache import http_date, if_match_tags, is_not_modified, make_etag
+from app.serialization import json_response
+from app.fieldsets import parse_fields
+from app.loaders import RequestLoaders, get_loaders
+from app.ownership import user_owns_company
+from app.idempotency import IdempotentRoute
+
+router = APIRouter(prefix="/processes", tags=["processes"], route_class=IdempotentRoute)
+
+
+# Columns that can be requested through `fields=` on the list endpoint
+PROCESS_FIELD_COLUMNS = {
+    "id": Process.id,
+    "company_id": Process.company_id,
+    "activity_id": Process.activity_id,
+    "applicant_name": Process.applicant_name,
+    "company_name": Company.razao_social,
+    "activity_name": Activity.name,
+    "status": Process.status,
+    "deadline_agency": Process.deadline_agency,
+    "deadline_applicant": Process.deadline_applicant,
+    "process_data": Process.process_data,
+    "version": Process.version,
+    "created_at": Process.created_at,
+    "updated_at": Process.updated_at,
+}
+
 
-router = APIRouter(prefix="/processes", tags=["processes"])
+class ExportFormat(str, enum.Enum):
+    """File formats supported by the process export."""
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
+# Attempts of update_process without If-Match before reporting a conflict
+UPDATE_PROCESS_ATTEMPTS = 3
+
+MERGE_PATCH_MEDIA_TYPE = "application/merge-patch+json"
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json"
+
+
+def process_etag(version: int) -> str:
+    """Strong ETag of a process: its version, bumped by every update."""
+    return f'"{version}"'
+
+
+def get_if_match(request: Request) -> Optional[List[str]]:
+    """If-Match tags of a process update (428 if required and missing)."""
+    expected_tags = if_match_tags(request)
+    if expected_tags is None and settings.PROCESS_REQUIRE_IF_MATCH:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="If-Match header with the process ETag is required"
+        )
+    return expected_tags
+
+
+def check_if_match(expected_tags: Optional[List[str]], version: int) -> None:
+    """Raise 412 when If-Match was sent and does not name `version`."""
+    if expected_tags is not None and "*" not in expected_tags and process_etag(version) not in expected_tags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Process was modified by someone else; reload it and try again",
+            headers={"ETag": process_etag(version)},
+        )
 
 
 def generate_process_id() -> str:
@@ -41,6 +136,7 @@ def generate_process_id() -> str:
 async def create_process(
     process_data: ProcessCreate,
     db: Session = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new licenciamento process."""
@@ -53,8 +149,7 @@ async def create_process(
         )
     
     # Verify company exists and belongs to user (for empreendedores)
-    from app.models.company import Company
-    company = db.query(Company).filter(Company.id == process_data.company_id).first()
+    company = loaders.companies.load(process_data.company_id)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,7 +214,36 @@ async def create_process(
         **new_process.__dict__,
         "activity_name": new_process.activity.name if new_process.activity else activity.name
     }
-    return ProcessResponse.model_validate(process_dict)
+    return json_response(ProcessResponse.model_validate(process_dict), status_code=status.HTTP_201_CREATED)
+
+
+def scope_processes(query, current_user: User, db: Session):
+    """Restrict a process query/select to what the user is allowed to see."""
+    # Filter by user role - empreendedores only see their own processes
+    if not can_view_all_processes(current_user, db):
+        # For empreendedores, filter by their companies
+        user_companies = db.query(Company.id).filter(Company.user_id == current_user.id).subquery()
+        query = query.filter(Process.company_id.in_(user_companies))
+    return query
+
+
+def filter_processes(
+    query,
+    status_filter: Optional[ProcessStatus] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+):
+    """Apply the status and creation date filters shared by list and export."""
+    # Filter by status if provided
+    if status_filter:
+        query = query.filter(Process.status == status_filter)
+    
+    # Creation date range (both ends inclusive)
+    if created_from:
+        query = query.filter(Process.created_at >= created_from)
+    if created_to:
+        query = query.filter(Process.created_at < created_to + timedelta(days=1))
+    return query
 
 
 @router.get("/", response_model=List[ProcessResponse])
@@ -127,22 +251,32 @@ async def get_processes(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[ProcessStatus] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,status,applicant_name"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get list of processes."""
-    query = db.query(Process)
-    
-    # Filter by user role - empreendedores only see their own processes
-    if not can_view_all_processes(current_user, db):
-        # For empreendedores, filter by their companies
-        from app.models.company import Company
-        user_companies = db.query(Company.id).filter(Company.user_id == current_user.id).subquery()
-        query = query.filter(Process.company_id.in_(user_companies))
+    """
+    Get list of processes.
+
+    With `fields`, only those columns are selected and returned (`id` is always
+    included), which keeps `process_data` out of table views.
+    """
+    selected = parse_fields(fields, PROCESS_FIELD_COLUMNS)
+    if selected is not None:
+        query = db.query(*(PROCESS_FIELD_COLUMNS[f].label(f) for f in selected)).select_from(Process)
+        if "activity_name" in selected:
+            query = query.outerjoin(Activity, Activity.id == Process.activity_id)
+        if "company_name" in selected:
+            query = query.outerjoin(Company, Company.id == Process.company_id)
+        query = scope_processes(query, current_user, db)
+        query = filter_processes(query, status_filter, created_from, created_to)
+        rows = query.order_by(Process.created_at.desc()).offset(skip).limit(limit).all()
+        return json_response([row._asdict() for row in rows])
     
-    # Filter by status if provided
-    if status_filter:
-        query = query.filter(Process.status == status_filter)
+    query = scope_processes(db.query(Process), current_user, db)
+    query = filter_processes(query, status_filter, created_from, created_to)
     
     # Eager load relationships
     from sqlalchemy.orm import joinedload
@@ -155,12 +289,60 @@ async def get_processes(
             "activity_name": p.activity.name if p.activity else None
         }
         result.append(ProcessResponse.model_validate(process_dict))
-    return result
+    return json_response(result)
+
+
+@router.get("/export")
+async def export_processes(
+    format: ExportFormat = ExportFormat.CSV,
+    status_filter: Optional[ProcessStatus] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export processes as CSV or XLSX for the municipal reports.
+
+    Uses the same permission scoping and filters as the list endpoint. Rows are
+    streamed from a server-side cursor, so memory does not grow with the result.
+    """
+    # The stream outlives the request-scoped session, so it owns its own session
+    db = SessionLocal()
+    try:
+        data_keys = get_process_data_keys(db)
+        statement = scope_processes(build_export_select(), current_user, db)
+        statement = filter_processes(statement, status_filter, created_from, created_to)
+        statement = statement.order_by(Process.created_at.desc())
+    except Exception:
+        db.close()
+        raise
+    
+    def rows():
+        try:
+            yield from iter_export_rows(db, statement, data_keys)
+        finally:
+            db.close()
+    
+    header = export_header(data_keys)
+    filename = f"processos_{date.today().isoformat()}.{format.value}"
+    if format == ExportFormat.XLSX:
+        body = stream_xlsx(header, rows())
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = stream_csv(header, rows())
+        media_type = "text/csv; charset=utf-8"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/{process_id}", response_model=ProcessResponse)
 async def get_process(
     process_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -176,40 +358,40 @@ async def get_process(
     
     # Check permissions - empreendedores can only see their own company's processes
     if not can_view_all_processes(current_user, db):
-        from app.models.company import Company
-        user_companies = db.query(Company.id).filter(Company.user_id == current_user.id).all()
-        user_company_ids = [c[0] for c in user_companies]
-        
-        if process.company_id not in user_company_ids:
+        if not user_owns_company(db, current_user.id, process.company_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to access this process"
             )
     
+    etag = process_etag(process.version)
+    if is_not_modified(request, etag, None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
     # Include activity name in response
     process_dict = {
         **process.__dict__,
         "activity_name": process.activity.name if process.activity else None
     }
-    return ProcessResponse.model_validate(process_dict)
+    return json_response(ProcessResponse.model_validate(process_dict), headers={"ETag": etag})
 
 
 @router.patch("/{process_id}", response_model=ProcessResponse)
 async def update_process(
     process_id: str,
     process_update: ProcessUpdate,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Update a process (status, deadlines, etc.)."""
-    process = db.query(Process).filter(Process.id == process_id).first()
-    
-    if not process:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Process not found"
-        )
+    """
+    Update a process (status, deadlines, etc.).
     
+    Send the ETag of the process as If-Match to update only the version you
+    read: if someone else updated it meanwhile the response is 412 and
+    nothing is changed. The write is a single `UPDATE ... WHERE version = :v`,
+    so concurrent updates never overwrite each other or interleave history.
+    """
     # Check permissions - only licenciadores and admins can update processes
     if not can_manage_processes(current_user, db):
         raise HTTPException(
@@ -217,10 +399,57 @@ async def update_process(
             detail="Not authorized to update processes. Only roles with MANAGE_PROCESSES permission can update processes."
         )
     
-    # Update fields
+    expected_tags = get_if_match(request)
+    
+    values = {}
+    if process_update.status:
+        values["status"] = process_update.status
+    if process_update.deadline_agency is not None:
+        values["deadline_agency"] = process_update.deadline_agency
+    if process_update.deadline_applicant is not None:
+        values["deadline_applicant"] = process_update.deadline_applicant
+    if process_update.process_data is not None:
+        values["process_data"] = process_update.process_data
+    
+    # Without If-Match, the version read here guards against concurrent
+    # writers between this read and the update; retried on conflict
+    for _ in range(UPDATE_PROCESS_ATTEMPTS):
+        process = db.query(Process).populate_existing().filter(Process.id == process_id).first()
+        if not process:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Process not found"
+            )
+        
+        check_if_match(expected_tags, process.version)
+        if not values:
+            # Nothing to change: keep the version, so other editors' ETags stay valid
+            break
+        
+        new_version = db.execute(
+            update(Process)
+            .where(Process.id == process_id, Process.version == process.version)
+            .values(**values, version=Process.version + 1)
+            .returning(Process.version)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if new_version is not None:
+            break
+        db.rollback()
+        if expected_tags is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Process was modified by someone else; reload it and try again",
+            )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Process is being updated concurrently; try again"
+        )
+    
+    # The version matched, so `process` still holds the values this update replaced
     if process_update.status:
         old_status = process.status.value
-        process.status = process_update.status
         
         # Add history entry for status change
         history_entry = ProcessHistory(
@@ -230,38 +459,352 @@ async def update_process(
             user=current_user.razao_social,
         )
         db.add(history_entry)
-    
-    if process_update.deadline_agency is not None:
-        process.deadline_agency = process_update.deadline_agency
-    
-    if process_update.deadline_applicant is not None:
-        process.deadline_applicant = process_update.deadline_applicant
-    
-    if process_update.process_data is not None:
-        process.process_data = process_update.process_data
+        
+        # Notify the process owner (delivered asynchronously by the outbox dispatcher)
+        owner_id = db.query(Company.user_id).filter(Company.id == process.company_id).scalar()
+        enqueue_process_status_change(
+            db,
+            process,
+            old_status=old_status,
+            new_status=process_update.status.value,
+            changed_by=current_user.razao_social,
+            owner_id=owner_id,
+        )
+        
+        # Push to connected clients once the transaction commits
+        publish_events(db, [process_status_event(
+            process_id,
+            process.company_id,
+            owner_id,
+            old_status,
+            process_update.status.value,
+        )])
     
     db.commit()
-    db.refresh(process)
     
     # Reload with relationships
     from sqlalchemy.orm import joinedload
-    process = db.query(Process).options(joinedload(Process.activity)).filter(Process.id == process_id).first()
+    process = (
+        db.query(Process)
+        .options(joinedload(Process.activity))
+        .populate_existing()
+        .filter(Process.id == process_id)
+        .first()
+    )
     
     # Include activity name in response
     process_dict = {
         **process.__dict__,
         "activity_name": process.activity.name if process.activity else None
     }
-    return ProcessResponse.model_validate(process_dict)
+    return json_response(
+        ProcessResponse.model_validate(process_dict),
+        headers={"ETag": process_etag(process.version)},
+    )
+
+
+def validate_process_data_patch(questions: Optional[List[Dict]], keys: Set[str], values: Dict[str, Any]) -> None:
+    """Check the patched process_data keys (and select answers) against the activity's questions."""
+    if not questions:
+        # Activities without a questionnaire accept free-form data
+        return
+    by_id = {question.get("id"): question for question in questions if isinstance(question, dict)}
+    unknown = sorted(key for key in keys if key not in by_id)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown questions for this activity: {', '.join(unknown)}"
+        )
+    for key, value in values.items():
+        question = by_id[key]
+        options = question.get("options")
+        if question.get("type") == "select" and options and value is not None and value not in options:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid answer for {key}: expected one of {', '.join(map(str, options))}"
+            )
+
+
+@router.patch("/{process_id}/data", response_model=ProcessDataResponse)
+async def patch_process_data(
+    process_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Change part of `process_data` without sending the whole document.
+    
+    - `Content-Type: application/merge-patch+json`: a JSON Merge Patch
+      (RFC 7396), e.g. `{"num_animais": 1200, "obs": null}`.
+    - `Content-Type: application/json-patch+json`: a JSON Patch (RFC 6902),
+      e.g. `[{"op": "replace", "path": "/num_animais", "value": 1200}]`.
+    
+    The patch is applied by the database in a single UPDATE. Top-level keys
+    must be questions of the process activity. Supports If-Match like
+    `PATCH /processes/{process_id}`; a failed `test` operation or a missing
+    path returns 409.
+    """
+    if not can_manage_processes(current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update processes. Only roles with MANAGE_PROCESSES permission can update processes."
+        )
+    
+    media_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if media_type not in (MERGE_PATCH_MEDIA_TYPE, JSON_PATCH_MEDIA_TYPE):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Use {MERGE_PATCH_MEDIA_TYPE} or {JSON_PATCH_MEDIA_TYPE}",
+            headers={"Accept-Patch": f"{MERGE_PATCH_MEDIA_TYPE}, {JSON_PATCH_MEDIA_TYPE}"},
+        )
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+    
+    expected_tags = get_if_match(request)
+    
+    document = func.coalesce(cast(Process.process_data, JSONB), literal({}, JSONB))
+    try:
+        if media_type == MERGE_PATCH_MEDIA_TYPE:
+            patched = merge_patch_expression(document, patch)
+            conditions = []
+            keys = set(patch)
+            values = {key: value for key, value in patch.items() if not isinstance(value, dict)}
+        else:
+            if not isinstance(patch, list):
+                raise PatchError("A JSON Patch must be an array of operations")
+            patched, conditions = json_patch_expression(document, patch)
+            keys = json_patch_keys(patch)
+            values = json_patch_values(patch)
+    except PatchError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    
+    questions = None
+    for _ in range(UPDATE_PROCESS_ATTEMPTS):
+        current = db.query(Process.version, Process.activity_id).filter(Process.id == process_id).first()
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Process not found"
+            )
+        if questions is None:
+            questions = db.query(Activity.questions).filter(Activity.id == current.activity_id).scalar() or []
+            validate_process_data_patch(questions, keys, values)
+        check_if_match(expected_tags, current.version)
+        
+        try:
+            result = db.execute(
+                update(Process)
+                .where(Process.id == process_id, Process.version == current.version, *conditions)
+                .values(process_data=cast(patched, Process.process_data.type), version=Process.version + 1)
+                .returning(Process.version, Process.process_data)
+                .execution_options(synchronize_session=False)
+            ).first()
+        except DataError:
+            # e.g. a path that goes through a scalar value
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Patch cannot be applied to the current process data"
+            )
+        if result is not None:
+            break
+        db.rollback()
+        
+        # No row matched: either the version moved or a patch condition failed
+        version = db.query(Process.version).filter(Process.id == process_id).scalar()
+        if version == current.version:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Patch test failed or path not found in the process data"
+            )
+        if expected_tags is not None:
+            check_if_match(expected_tags, version)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Process is being updated concurrently; try again"
+        )
+    
+    db.commit()
+    return json_response(
+        ProcessDataResponse(id=process_id, version=result.version, process_data=result.process_data),
+        headers={"ETag": process_etag(result.version)},
+    )
+
+
+@router.post("/bulk-update", response_model=ProcessBulkUpdateResponse)
+async def bulk_update_processes(
+    bulk_update: ProcessBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Move several processes to a new status in a single transaction."""
+    # Check permissions once for the whole batch
+    if not can_manage_processes(current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update processes. Only roles with MANAGE_PROCESSES permission can update processes."
+        )
+    
+    # Preserve request order while ignoring duplicated IDs
+    process_ids = list(dict.fromkeys(bulk_update.process_ids))
+    new_status = bulk_update.status
+    
+    # Load current status and owner of every requested process in one query
+    rows = (
+        db.query(Process.id, Process.status, Process.applicant_name, Process.company_id, Company.user_id)
+        .join(Company, Company.id == Process.company_id)
+        .filter(id_in_array(Process.id, process_ids))
+        .with_for_update(of=Process)
+        .all()
+    )
+    current = {row.id: row for row in rows}
+    
+    results = []
+    to_update = []
+    for process_id in process_ids:
+        row = current.get(process_id)
+        if row is None:
+            results.append(ProcessBulkUpdateResult(id=process_id, success=False, error="Process not found"))
+        elif row.status == new_status:
+            results.append(ProcessBulkUpdateResult(
+                id=process_id,
+                success=False,
+                old_status=row.status,
+                new_status=new_status,
+                error=f"Process already in status {new_status.value}",
+            ))
+        else:
+            to_update.append(row)
+            results.append(ProcessBulkUpdateResult(
+                id=process_id,
+                success=True,
+                old_status=row.status,
+                new_status=new_status,
+            ))
+    
+    if to_update:
+        updated_ids = [row.id for row in to_update]
+        db.execute(
+            update(Process)
+            .where(id_in_array(Process.id, updated_ids))
+            .values(status=new_status, version=Process.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        
+        # One executemany for all history entries
+        db.execute(
+            insert(ProcessHistory),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "process_id": row.id,
+                    "action": f"Mudança para {new_status.value}",
+                    "user": current_user.razao_social,
+                    "observation": bulk_update.observation,
+                }
+                for row in to_update
+            ],
+        )
+        
+        enqueue_process_status_changes_bulk(
+            db,
+            [
+                {
+                    "owner_id": row.user_id,
+                    "process_id": row.id,
+                    "applicant_name": row.applicant_name,
+                    "old_status": row.status.value,
+                    "new_status": new_status.value,
+                    "changed_by": current_user.razao_social,
+                }
+                for row in to_update
+            ],
+        )
+        
+        publish_events(db, [
+            process_status_event(row.id, row.company_id, row.user_id, row.status.value, new_status.value)
+            for row in to_update
+        ])
+    
+    db.commit()
+    
+    return json_response(ProcessBulkUpdateResponse(updated=len(to_update), results=results))
+
+
+# Errors returned inline by the import endpoint (the CLI writes a full report)
+IMPORT_MAX_ERRORS_RETURNED = 1000
+
+
+@router.post("/import", response_model=ProcessImportResponse)
+def import_processes(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    start_row: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Import legacy processes from a CSV or JSON (one object per line) file.
+
+    Rows are processed in chunks, each committed on its own. If the import is
+    interrupted, send the same file again with `start_row` set to the returned
+    `next_row`; already imported IDs are reported instead of duplicated.
+    """
+    if not can_manage_processes(current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to import processes. Only roles with MANAGE_PROCESSES permission can import processes."
+        )
+    
+    fmt = format or detect_format(file.filename)
+    if fmt not in ("csv", "json"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported import format: {fmt}"
+        )
+    
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    importer = ProcessImporter(
+        db,
+        imported_by=current_user.razao_social,
+        max_errors_kept=IMPORT_MAX_ERRORS_RETURNED,
+    )
+    result = importer.run(iter_records(stream, fmt), start_row=start_row)
+    return json_response(ProcessImportResponse.model_validate(asdict(result)))
 
 
 @router.get("/{process_id}/history", response_model=List[ProcessHistoryResponse])
 async def get_process_history(
     process_id: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get history for a specific process."""
+    """
+    Get history for a specific process.
+
+    - Default: newest first, `limit` entries per page. When there are more,
+      `X-Next-Cursor` holds the `cursor` for the next (older) page.
+    - `since=<cursor>`: only entries newer than that position, oldest first.
+      `X-Next-Cursor` holds the value to send as `since` on the next poll.
+
+    `X-Latest-Cursor` always points at the newest entry. ETag/Last-Modified are
+    derived from it, so polling with If-None-Match returns 304 until something
+    new is appended.
+    """
+    if cursor and since:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either cursor or since, not both"
+        )
+    
     process = db.query(Process).filter(Process.id == process_id).first()
     
     if not process:
@@ -272,18 +815,53 @@ async def get_process_history(
     
     # Check permissions - empreendedores can only see their own company's processes
     if not can_view_all_processes(current_user, db):
-        from app.models.company import Company
-        user_companies = db.query(Company.id).filter(Company.user_id == current_user.id).all()
-        user_company_ids = [c[0] for c in user_companies]
-        
-        if process.company_id not in user_company_ids:
+        if not user_owns_company(db, current_user.id, process.company_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to access this process"
             )
     
-    history = db.query(ProcessHistory).filter(
-        ProcessHistory.process_id == process_id
-    ).order_by(ProcessHistory.created_at.desc()).all()
+    base_query = db.query(ProcessHistory).filter(ProcessHistory.process_id == process_id)
+    # History never predates the process: bounding created_at lets PostgreSQL prune older partitions
+    if process.created_at is not None:
+        base_query = base_query.filter(ProcessHistory.created_at >= process.created_at)
+    
+    # The history is append-only, so the newest entry identifies the current state
+    latest = (
+        base_query.with_entities(ProcessHistory.created_at, ProcessHistory.id)
+        .order_by(ProcessHistory.created_at.desc(), ProcessHistory.id.desc())
+        .first()
+    )
+    cache_headers = {"Cache-Control": "private, no-cache"}
+    if latest is not None:
+        cache_headers["ETag"] = make_etag(latest.created_at.isoformat(), latest.id, limit, cursor, since)
+        cache_headers["Last-Modified"] = http_date(latest.created_at)
+        cache_headers["X-Latest-Cursor"] = encode_cursor(latest.created_at, latest.id)
+    
+    if is_not_modified(request, cache_headers.get("ETag"), latest.created_at if latest else None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    position = tuple_(ProcessHistory.created_at, ProcessHistory.id)
+    if since:
+        query = base_query.filter(position > tuple_(*decode_cursor(since)))
+        query = query.order_by(ProcessHistory.created_at.asc(), ProcessHistory.id.asc())
+    else:
+        query = base_query
+        if cursor:
+            query = query.filter(position < tuple_(*decode_cursor(cursor)))
+        query = query.order_by(ProcessHistory.created_at.desc(), ProcessHistory.id.desc())
+    
+    # Fetch one extra row to know whether another page exists
+    history = query.limit(limit + 1).all()
+    has_more = len(history) > limit
+    history = history[:limit]
+    
+    headers = dict(cache_headers)
+    if since:
+        # Next poll continues after the newest entry returned (or keeps the same position)
+        last = history[-1] if history else None
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id) if last else since
+    elif has_more:
+        headers["X-Next-Cursor"] = encode_cursor(history[-1].created_at, history[-1].id)
     
-    return [ProcessHistoryResponse.model_validate(h) for h in history]
+    return json_response([ProcessHistoryResponse.model_validate(h) for h in history], headers=headers)
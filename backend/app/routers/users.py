@@ -2,32 +2,85 @@
 User management routes.
 """
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.models.user import User
 from app.models.user_preferences import UserPreferences
+from app.models.role import Role
 from app.schemas.user import UserResponse, UserUpdate, UserPreferencesUpdate
 from app.auth import get_current_active_user
 from app.permissions import require_admin
+from app.serialization import json_response
+from app.fieldsets import parse_fields
+from app.idempotency import IdempotentRoute
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=IdempotentRoute)
+
+# Columns that can be requested through `fields=` on the list endpoint
+# ("preferences" is assembled from the preferences row, see get_users)
+USER_FIELD_COLUMNS = {
+    "id": User.id,
+    "razao_social": User.razao_social,
+    "nome_fantasia": User.nome_fantasia,
+    "cnpj": User.cnpj,
+    "inscricao_estadual": User.inscricao_estadual,
+    "email": User.email,
+    "telefone": User.telefone,
+    "endereco": User.endereco,
+    "role": User.role_id,
+    "role_name": Role.name,
+    "created_at": User.created_at,
+}
+USER_FIELDS = [*USER_FIELD_COLUMNS, "preferences"]
 
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,razao_social,email"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
-    """Get list of users (requires ADMIN role)."""
+    """
+    Get list of users (requires ADMIN role).
+
+    With `fields`, only those columns are selected and returned (`id` is always
+    included).
+    """
+    selected = parse_fields(fields, USER_FIELDS)
+    if selected is not None:
+        columns = [USER_FIELD_COLUMNS[f].label(f) for f in selected if f != "preferences"]
+        query = db.query(*columns).select_from(User)
+        if "role_name" in selected:
+            query = query.outerjoin(Role, Role.id == User.role_id)
+        if "preferences" in selected:
+            query = query.outerjoin(UserPreferences, UserPreferences.user_id == User.id).add_columns(
+                UserPreferences.dark_mode.label("dark_mode"), UserPreferences.notifications.label("notifications")
+            )
+        rows = query.offset(skip).limit(limit).all()
+        
+        result = []
+        for row in rows:
+            data = row._asdict()
+            if "preferences" in selected:
+                dark_mode = data.pop("dark_mode")
+                notifications = data.pop("notifications")
+                data["preferences"] = {
+                    "darkMode": dark_mode if dark_mode is not None else False,
+                    "notifications": notifications if notifications is not None else True,
+                }
+            result.append({f: data[f] for f in selected})
+        return json_response(result)
+    
     users = db.query(User).options(
         joinedload(User.preferences),
         joinedload(User.role_obj)
     ).offset(skip).limit(limit).all()
-    return [UserResponse.model_validate(user) for user in users]
+    return json_response([UserResponse.model_validate(user) for user in users])
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -46,7 +99,7 @@ async def get_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserResponse.model_validate(user)
+    return json_response(UserResponse.model_validate(user))
 
 
 @router.put("/me", response_model=UserResponse)
@@ -61,14 +114,19 @@ async def update_current_user(
     if "endereco" in update_data and update_data["endereco"]:
         update_data["endereco"] = update_data["endereco"].model_dump() if hasattr(update_data["endereco"], "model_dump") else update_data["endereco"]
     
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
+    if update_data:
+        # UPDATE ... RETURNING refreshes the already loaded user in the same statement
+        current_user = db.execute(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(**update_data)
+            .returning(User)
+        ).scalar_one()
     
+    # Built before committing, while the loaded attributes are still current
+    response = UserResponse.model_validate(current_user)
     db.commit()
-    db.refresh(current_user)
-    # Reload preferences relationship
-    db.refresh(current_user, ['preferences'])
-    return UserResponse.model_validate(current_user)
+    return json_response(response)
 
 
 @router.put("/me/preferences", response_model=UserResponse)
@@ -78,47 +136,45 @@ async def update_user_preferences(
     current_user: User = Depends(get_current_active_user)
 ):
     """Update current user's preferences."""
-    # Get or create UserPreferences
+    prefs_data = preferences.model_dump(exclude_unset=True)
+    
+    # Map camelCase to snake_case
+    values = {}
+    if prefs_data.get("darkMode") is not None:
+        values["dark_mode"] = prefs_data["darkMode"]
+    if prefs_data.get("notifications") is not None:
+        values["notifications"] = prefs_data["notifications"]
+    
     if current_user.preferences is None:
+        # Garantir que darkMode sempre tenha um valor (padrão: False - modo claro)
         user_prefs = UserPreferences(
             id=str(uuid.uuid4()),
             user_id=current_user.id,
-            dark_mode=False,
-            notifications=True
+            dark_mode=values.get("dark_mode", False),
+            notifications=values.get("notifications", True)
         )
         db.add(user_prefs)
         current_user.preferences = user_prefs
-    else:
-        user_prefs = current_user.preferences
-    
-    # Update preferences
-    prefs_data = preferences.model_dump(exclude_unset=True)
-    
-    # Map camelCase to snake_case
-    if "darkMode" in prefs_data:
-        user_prefs.dark_mode = prefs_data["darkMode"]
-    if "notifications" in prefs_data:
-        user_prefs.notifications = prefs_data["notifications"]
-    
-    # Garantir que darkMode sempre tenha um valor (padrão: False - modo claro)
-    if user_prefs.dark_mode is None:
-        user_prefs.dark_mode = False
+    elif values:
+        # UPDATE ... RETURNING refreshes the loaded preferences in the same statement
+        db.execute(
+            update(UserPreferences)
+            .where(UserPreferences.user_id == current_user.id)
+            .values(**values)
+            .returning(UserPreferences)
+        ).scalar_one()
     
+    # Built before committing, while the loaded attributes are still current
+    response = UserResponse.model_validate(current_user)
     db.commit()
-    db.refresh(current_user)
-    db.refresh(user_prefs)
-    return UserResponse.model_validate(current_user)
+    return json_response(response)
 
 
 @router.get("/me/preferences", response_model=dict)
 async def get_user_preferences(
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get current user's preferences."""
-    # Reload preferences relationship
-    db.refresh(current_user, ['preferences'])
-    
+    """Get current user's preferences (loaded with the user)."""
     if current_user.preferences is None:
         return {"darkMode": False, "notifications": True}
     
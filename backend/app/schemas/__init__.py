@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
+from app.schemas.user import UserCreate, UserResponse, UserLogin, Token, RefreshTokenRequest, LogoutRequest, UserPermissionsResponse
 from app.schemas.company import (
     CompanyCreate,
     CompanyResponse,
@@ -12,6 +12,10 @@ from app.schemas.process import (
     ProcessCreate,
     ProcessResponse,
     ProcessUpdate,
+    ProcessDataResponse,
+    ProcessBulkUpdate,
+    ProcessBulkUpdateResponse,
+    ProcessImportResponse,
     ProcessDocumentCreate,
     ProcessDocumentResponse,
     ProcessHistoryResponse,
@@ -23,6 +27,9 @@ __all__ = [
     "UserResponse",
     "UserLogin",
     "Token",
+    "RefreshTokenRequest",
+    "LogoutRequest",
+    "UserPermissionsResponse",
     "CompanyCreate",
     "CompanyResponse",
     "CompanyUpdate",
@@ -30,6 +37,10 @@ __all__ = [
     "ProcessCreate",
     "ProcessResponse",
     "ProcessUpdate",
+    "ProcessDataResponse",
+    "ProcessBulkUpdate",
+    "ProcessBulkUpdateResponse",
+    "ProcessImportResponse",
     "ProcessDocumentCreate",
     "ProcessDocumentResponse",
     "ProcessHistoryResponse",
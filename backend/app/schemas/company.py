@@ -75,15 +75,9 @@ class CompanyResponse(BaseModel):
         """Override to include activity IDs from relationship."""
         if hasattr(obj, '__dict__'):
             data = obj.__dict__.copy()
-            # Extract activity IDs from relationship
+            # Extract activity IDs from relationship (eager-load it with selectinload)
             if hasattr(obj, 'activities') and obj.activities:
-                if hasattr(obj.activities, 'all'):
-                    # If it's a dynamic relationship
-                    activities = obj.activities.all()
-                    data['activity_ids'] = [act.id for act in activities]
-                else:
-                    # If it's a list
-                    data['activity_ids'] = [act.id for act in obj.activities]
+                data['activity_ids'] = [act.id for act in obj.activities]
             else:
                 data['activity_ids'] = []
             return super().model_validate(data, **kwargs)
@@ -60,6 +60,51 @@ class ProcessUpdate(BaseModel):
     process_data: Optional[Dict] = None
 
 
+class ProcessDataResponse(BaseModel):
+    """Schema for the process data after a partial (patch) update."""
+    id: str
+    version: int
+    process_data: Optional[Dict] = None
+
+
+class ProcessBulkUpdate(BaseModel):
+    """Schema for moving several processes to a new status at once."""
+    process_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    status: ProcessStatus
+    observation: Optional[str] = None
+
+
+class ProcessBulkUpdateResult(BaseModel):
+    """Per-process outcome of a bulk update."""
+    id: str
+    success: bool
+    old_status: Optional[ProcessStatus] = None
+    new_status: Optional[ProcessStatus] = None
+    error: Optional[str] = None
+
+
+class ProcessBulkUpdateResponse(BaseModel):
+    """Schema for bulk update response."""
+    updated: int
+    results: List[ProcessBulkUpdateResult]
+
+
+class ProcessImportError(BaseModel):
+    """A row rejected by the bulk import."""
+    row: int
+    process_id: Optional[str] = None
+    error: str
+
+
+class ProcessImportResponse(BaseModel):
+    """Schema for bulk import response."""
+    rows_read: int
+    imported: int
+    failed: int
+    next_row: int  # Pass as start_row to resume an interrupted import
+    errors: List[ProcessImportError] = []
+
+
 class ProcessResponse(BaseModel):
     """Schema for process response."""
     id: str
@@ -72,6 +117,7 @@ class ProcessResponse(BaseModel):
     deadline_agency: Optional[date] = None
     deadline_applicant: Optional[date] = None
     process_data: Optional[Dict] = None
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
     documents: List[ProcessDocumentResponse] = []
@@ -2,7 +2,7 @@
 Pydantic schemas for user-related operations.
 """
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 # UserRole enum removed - now using database roles
 # Keeping for backward compatibility in schemas if needed
@@ -124,8 +124,27 @@ class UserPreferencesUpdate(BaseModel):
     notifications: Optional[bool] = None
 
 
+class UserPermissionsResponse(BaseModel):
+    """Schema for the current user's permissions (used by the SPA to render menus)."""
+    role: str
+    role_name: Optional[str] = None
+    permissions: List[str]
+    version: str  # Changes whenever the role/permission matrix changes
+
+
 class Token(BaseModel):
     """Schema for authentication token."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
     user: UserResponse
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for exchanging a refresh token."""
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    """Schema for logout (the refresh token is revoked together with the access token)."""
+    refresh_token: Optional[str] = None
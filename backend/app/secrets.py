@@ -2,10 +2,18 @@
 Secrets management for the application.
 Loads sensitive data from individual files in secrets/ directory.
 Each secret is stored in its own file named after the secret key.
+
+Resolved values are cached after the first read. `Secrets.reload()` re-reads
+everything (triggered by `SecretsWatcher` when a file changes, or by SIGHUP)
+and notifies the callbacks registered with `Secrets.on_reload`, so values
+derived from secrets (e.g. JWT keys) can be rotated without a restart.
 """
 import os
+import signal
+import sys
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 
 class Secrets:
@@ -14,6 +22,11 @@ class Secrets:
     _secrets: dict = {}
     _loaded: bool = False
     _secrets_dir: Optional[Path] = None
+    # key -> value after applying the environment/file precedence
+    _resolved: dict = {}
+    _reload_lock = threading.Lock()
+    _listeners: List[Callable[[List[str]], None]] = []
+    version: int = 0
     
     @classmethod
     def _get_secrets_dir(cls) -> Path:
@@ -54,26 +67,33 @@ class Secrets:
         cls._loaded = True
     
     @classmethod
-    def get(cls, key: str, default: Optional[str] = None) -> Optional[str]:
-        """Get a secret value by key."""
+    def _resolve(cls, key: str) -> Optional[str]:
+        """Resolve a secret once; later reads are a dictionary lookup."""
+        try:
+            return cls._resolved[key]
+        except KeyError:
+            pass
+        
         # Prefer environment variables (Azure App Service Application Settings / Key Vault references)
         env_value = os.getenv(key)
         if env_value is not None and env_value.strip() != "":
-            return env_value.strip()
-
-        cls._load_secrets()
-        return cls._secrets.get(key, default)
+            value = env_value.strip()
+        else:
+            cls._load_secrets()
+            value = cls._secrets.get(key)
+        cls._resolved[key] = value
+        return value
+    
+    @classmethod
+    def get(cls, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a secret value by key."""
+        value = cls._resolve(key)
+        return default if value is None else value
     
     @classmethod
     def get_required(cls, key: str) -> str:
         """Get a required secret value, raising error if not found."""
-        # Prefer environment variables (Azure App Service Application Settings / Key Vault references)
-        env_value = os.getenv(key)
-        if env_value is not None and env_value.strip() != "":
-            return env_value.strip()
-
-        cls._load_secrets()
-        value = cls._secrets.get(key)
+        value = cls._resolve(key)
         if value is None:
             secrets_dir = cls._get_secrets_dir()
             raise ValueError(
@@ -93,3 +113,123 @@ class Secrets:
         """List all available secret keys."""
         cls._load_secrets()
         return list(cls._secrets.keys())
+    
+    @classmethod
+    def with_prefix(cls, prefix: str) -> dict:
+        """All secrets whose name starts with `prefix` (environment variables win over files)."""
+        cls._load_secrets()
+        values = {key: value for key, value in cls._secrets.items() if key.startswith(prefix)}
+        for key, value in os.environ.items():
+            if key.startswith(prefix) and value.strip() != "":
+                values[key] = value.strip()
+        return values
+    
+    @classmethod
+    def on_reload(cls, callback: Callable[[List[str]], None]) -> None:
+        """Register a callback called with the changed keys after each reload."""
+        cls._listeners.append(callback)
+    
+    @classmethod
+    def reload(cls) -> List[str]:
+        """Re-read secrets/ and the environment. Returns the keys whose value changed."""
+        with cls._reload_lock:
+            previous = dict(cls._secrets)
+            previous_resolved = dict(cls._resolved)
+            cls._secrets = {}
+            cls._loaded = False
+            cls._load_secrets()
+            cls._resolved = {}
+            for key in previous_resolved:
+                cls._resolve(key)
+            changed = {
+                key for key in set(previous) | set(cls._secrets)
+                if previous.get(key) != cls._secrets.get(key)
+            }
+            changed |= {key for key, value in previous_resolved.items() if cls._resolved.get(key) != value}
+            changed = sorted(changed)
+            cls.version += 1
+        
+        for callback in list(cls._listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                sys.stderr.write(f"\033[91m[SECRETS]\033[0m - reload callback failed: {e}\n")
+        return changed
+
+
+class SecretsWatcher:
+    """
+    Reloads secrets when a file in secrets/ is added, changed or removed
+    (polling modification times), or immediately on SIGHUP.
+    """
+    
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fingerprint: Tuple = ()
+    
+    def _current_fingerprint(self) -> Tuple:
+        secrets_dir = Secrets._get_secrets_dir()
+        if not secrets_dir.is_dir():
+            return ()
+        entries = []
+        for secret_file in secrets_dir.iterdir():
+            if secret_file.is_file() and not secret_file.name.startswith('.'):
+                stat = secret_file.stat()
+                entries.append((secret_file.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+    
+    def check(self, force: bool = False) -> List[str]:
+        """Reload if the directory changed (or when forced). Returns the changed keys."""
+        fingerprint = self._current_fingerprint()
+        if not force and fingerprint == self._fingerprint:
+            return []
+        self._fingerprint = fingerprint
+        changed = Secrets.reload()
+        if changed:
+            sys.stderr.write(f"\033[96m[SECRETS]\033[0m - reloaded: {', '.join(changed)}\n")
+            sys.stderr.flush()
+        return changed
+    
+    def run(self) -> None:
+        self._fingerprint = self._current_fingerprint()
+        while not self._stop.is_set():
+            forced = self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.check(force=forced)
+            except Exception as e:
+                sys.stderr.write(f"\033[91m[SECRETS]\033[0m - reload failed: {e}\n")
+    
+    def request_reload(self) -> None:
+        """Ask the watcher thread to reload now (safe to call from a signal handler)."""
+        self._wake.set()
+    
+    def install_sighup_handler(self) -> bool:
+        """Reload on SIGHUP. Only possible from the main thread on POSIX systems."""
+        if not hasattr(signal, "SIGHUP"):
+            return False
+        try:
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+        except ValueError:
+            return False
+        return True
+    
+    def start(self) -> None:
+        """Start watching in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="secrets-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
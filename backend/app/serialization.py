@@ -0,0 +1,26 @@
+"""
+Fast JSON responses.
+
+Handlers validate their response models once (from the ORM objects) and return
+them through `json_response`, which dumps them with model_dump(mode="json") and
+encodes with orjson. Returning a Response makes FastAPI skip the second
+validation/serialization pass of `response_model`; the response_model stays on
+the route so the OpenAPI schema is unchanged.
+"""
+from typing import Any, Dict, Optional
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def to_jsonable(value: Any) -> Any:
+    """Dump pydantic models (or lists of them) to JSON-compatible data."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def json_response(value: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Serialize already validated models straight to an orjson response."""
+    return ORJSONResponse(content=to_jsonable(value), status_code=status_code, headers=headers)
@@ -0,0 +1,179 @@
+"""
+Tenant (prefeitura) resolution.
+
+Every request runs for one tenant, taken from the request host
+(`tenants.hostname`) or, on a shared host, from the `tid` claim of the
+access token or the `X-Tenant-ID` header (requests without a token: login,
+register, refresh), falling back to DEFAULT_TENANT_ID. The tenant is kept in a
+context variable: database sessions created during the request are routed
+and scoped with it (see app.database), and new rows get it as tenant_id.
+
+Code running outside a request (CLI scripts, background workers) has no
+tenant unless it sets one with `use_tenant`; such sessions use the default
+database and the row-level security policies show them no tenant rows.
+Jobs that work across tenants use app.database.MaintenanceSessionLocal.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from app.config import settings
+
+TENANT_HEADER = b"x-tenant-id"
+
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+def get_current_tenant_id() -> Optional[str]:
+    """Tenant of the running request (or `use_tenant` block), else the default tenant."""
+    return current_tenant.get() or settings.DEFAULT_TENANT_ID or None
+
+
+@contextmanager
+def use_tenant(tenant_id: Optional[str]):
+    """Run a block (e.g. a CLI import) as `tenant_id`."""
+    token = current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+class TenantRegistry:
+    """Active tenants and their hostnames, loaded from `tenants` (default database)."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.TENANT_REGISTRY_CACHE_SECONDS
+        self._by_host: Dict[str, str] = {}
+        self._active: Set[str] = set()
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def load(self) -> None:
+        from sqlalchemy import select
+        from app.database import engine
+        from app.models.tenant import Tenant
+
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(Tenant.id, Tenant.hostname).where(Tenant.is_active.is_(True))
+            ).all()
+        with self._lock:
+            self._by_host = {hostname.lower(): tenant_id for tenant_id, hostname in rows if hostname}
+            self._active = {tenant_id for tenant_id, _ in rows}
+            self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def tenant_for_host(self, host: str) -> Optional[str]:
+        return self._by_host.get(host.split(":", 1)[0].lower())
+
+    def is_active(self, tenant_id: str) -> bool:
+        return tenant_id in self._active
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._active)
+
+    def retry_in(self, seconds: float) -> None:
+        self._expires_at = time.monotonic() + seconds
+
+    def invalidate(self) -> None:
+        self._expires_at = 0.0
+
+
+tenant_registry = TenantRegistry()
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token.strip()
+    # EventSource sends the token as ?access_token= (see get_current_user_from_header_or_query)
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("access_token")
+    return values[0] if values else None
+
+
+def _tenant_from_token(scope) -> Optional[str]:
+    """`tid` claim of a valid access token (invalid tokens are left for the auth dependency to reject)."""
+    token = _bearer_token(scope)
+    if token is None:
+        return None
+    from jose import JWTError
+    from app.auth import decode_access_token
+
+    try:
+        return decode_access_token(token).get("tid")
+    except JWTError:
+        return None
+
+
+def _header(scope, header: bytes) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == header:
+            return value.decode("latin-1").strip()
+    return None
+
+
+class TenantMiddleware:
+    """Resolve the tenant of each HTTP request and expose it through `current_tenant`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if tenant_registry.is_stale:
+            try:
+                await run_in_threadpool(tenant_registry.load)
+            except Exception as e:
+                if not tenant_registry.loaded:
+                    raise
+                # Keep serving with the last known tenants and retry shortly
+                tenant_registry.retry_in(5.0)
+                sys.stderr.write(f"\033[91m[TENANT]\033[0m - registry reload failed: {e}\n")
+                sys.stderr.flush()
+
+        tenant_id = (
+            tenant_registry.tenant_for_host(_header(scope, b"host") or "")
+            or _tenant_from_token(scope)
+            # Explicit hint for requests that carry no token yet
+            or _header(scope, TENANT_HEADER)
+            or settings.DEFAULT_TENANT_ID
+        )
+        if not tenant_id or not tenant_registry.is_active(tenant_id):
+            response = JSONResponse({"detail": "Unknown tenant"}, status_code=status.HTTP_400_BAD_REQUEST)
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["tenant_id"] = tenant_id
+        token = current_tenant.set(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def check_token_tenant(payload: dict) -> None:
+    """Reject a token issued for another tenant than the one serving the request."""
+    token_tenant = payload.get("tid")
+    request_tenant = current_tenant.get()
+    if token_tenant and request_tenant and token_tenant != request_tenant:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,4 @@
+#!/bin/sh
+# Allow streaming replication connections (runs only when the primary's data volume is created)
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark of API responses: bytes on the wire per Accept-Encoding and latency.
+
+Runs against a live server, so the numbers include middleware and
+serialization. Log in first (or pass a token) to measure authenticated routes.
+
+Usage:
+    python execution/benchmark_http.py --email admin@exemplo.com --password senha
+    python execution/benchmark_http.py --token <jwt> --requests 50 --path /processes/?limit=100
+"""
+import json
+import statistics
+import sys
+import time
+import urllib.request
+
+DEFAULT_PATHS = ["/processes/?limit=100", "/users/", "/activities/"]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    request = urllib.request.Request(
+        f"{base_url}/auth/login",
+        data=json.dumps({"email": email, "password": password}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["access_token"]
+
+
+def fetch(url: str, token: str, encoding: str):
+    """Return (status, body size as sent, Content-Encoding, seconds)."""
+    headers = {"Accept-Encoding": encoding}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            # urllib does not decode Content-Encoding, so this is the wire size
+            body = response.read()
+            return response.status, len(body), response.headers.get("Content-Encoding", "-"), time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, 0, "-", time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure response sizes and latency")
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--token", help="Bearer token (otherwise --email/--password)")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--path", action="append", help=f"Path to measure (default: {', '.join(DEFAULT_PATHS)})")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per path and encoding")
+    args = parser.parse_args()
+
+    token = args.token
+    if not token and args.email:
+        token = login(args.base_url, args.email, args.password)
+
+    print(f"{'path':32s} {'encoding':9s} {'status':>6s} {'bytes':>10s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for path in args.path or DEFAULT_PATHS:
+        for encoding in ENCODINGS:
+            results = [fetch(args.base_url + path, token, encoding) for _ in range(args.requests)]
+            timings = sorted(r[3] * 1000 for r in results)
+            status, size, served_encoding, _ = results[-1]
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{path:32s} {served_encoding:9s} {status:6d} {size:10,d} "
+                f"{statistics.median(timings):8.2f} {p95:8.2f}"
+            )
+    sys.exit(0)
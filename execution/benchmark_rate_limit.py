@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the login rate limiter overhead (check_login_rate_limit per request).
+
+Runs the real check with the configured limits and store; with
+RATE_LIMIT_BACKEND=memory (the default) this is the in-process work done on
+every login attempt. Target: under 20 µs per request.
+
+Usage:
+    python execution/benchmark_rate_limit.py --requests 200000 --keys 10000
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+TARGET_MICROSECONDS = 20
+
+
+if __name__ == "__main__":
+    import argparse
+    from fastapi import HTTPException
+    from app.rate_limit import check_login_rate_limit
+
+    parser = argparse.ArgumentParser(description="Benchmark the login rate limiter")
+    parser.add_argument("--requests", type=int, default=200000, help="Simulated login attempts")
+    parser.add_argument("--keys", type=int, default=10000, help="Distinct IPs/emails")
+    args = parser.parse_args()
+
+    keys = [(f"10.0.{i // 256 % 256}.{i % 256}", f"user{i}@example.com") for i in range(args.keys)]
+
+    rejected = 0
+    start = time.perf_counter()
+    for n in range(args.requests):
+        ip, email = keys[n % args.keys]
+        try:
+            check_login_rate_limit(ip, email)
+        except HTTPException:
+            rejected += 1
+    elapsed = time.perf_counter() - start
+
+    per_request = elapsed / args.requests * 1_000_000
+    status = "OK" if per_request < TARGET_MICROSECONDS else "ABOVE TARGET"
+    print(f"{args.requests:,d} attempts over {args.keys:,d} keys: {per_request:.2f} µs/attempt "
+          f"({rejected:,d} rejected) [{status}, target {TARGET_MICROSECONDS} µs]")
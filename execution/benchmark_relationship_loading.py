@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Count the SQL statements needed to list users with their role permissions
+and companies with their activities, loading the collections lazily (one
+query per parent, as the old lazy="dynamic" relationships always did) versus
+eagerly with selectinload.
+
+Runs read-only against the configured database.
+
+Usage:
+    python execution/benchmark_relationship_loading.py --limit 100
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+
+def run(label, session_factory, counter, fn):
+    db = session_factory()
+    try:
+        counter.clear()
+        start = time.perf_counter()
+        rows = fn(db)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        db.close()
+    print(f"{label:<45s} {rows:>6d} rows  {len(counter):>5d} queries  {elapsed:8.1f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import event
+    from sqlalchemy.orm import joinedload, lazyload, selectinload
+    from app.config import settings
+    from app.database import SessionLocal, engine
+    from app.models import User, Role, Company, Activity
+
+    parser = argparse.ArgumentParser(description="Compare lazy and selectinload collection loading")
+    parser.add_argument("--limit", type=int, default=100, help="Parents to list")
+    parser.add_argument("--tenant", default=settings.DEFAULT_TENANT_ID, help="Tenant (prefeitura) to read")
+    args = parser.parse_args()
+
+    def session_factory():
+        # Row-level security shows no rows to sessions without a tenant
+        return SessionLocal(info={"tenant_id": args.tenant})
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def users_lazy(db):
+        users = db.query(User).options(lazyload(User.role_obj)).limit(args.limit).all()
+        for user in users:
+            [permission.id for permission in user.role_obj.permissions]
+        return len(users)
+
+    def users_eager(db):
+        users = (
+            db.query(User)
+            .options(joinedload(User.role_obj).selectinload(Role.permissions))
+            .limit(args.limit)
+            .all()
+        )
+        for user in users:
+            [permission.id for permission in user.role_obj.permissions]
+        return len(users)
+
+    def companies_lazy(db):
+        companies = db.query(Company).limit(args.limit).all()
+        for company in companies:
+            [activity.id for activity in company.activities]
+        return len(companies)
+
+    def companies_eager(db):
+        companies = (
+            db.query(Company)
+            .options(selectinload(Company.activities).load_only(Activity.id))
+            .limit(args.limit)
+            .all()
+        )
+        for company in companies:
+            [activity.id for activity in company.activities]
+        return len(companies)
+
+    print(f"Listing up to {args.limit} parents\n")
+    run("users + role permissions (lazy)", session_factory, statements, users_lazy)
+    run("users + role permissions (selectinload)", session_factory, statements, users_eager)
+    run("companies + activities (lazy)", session_factory, statements, companies_lazy)
+    run("companies + activities (selectinload)", session_factory, statements, companies_eager)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Calibrate password hashing cost for this machine.
+
+Measures verification latency for several bcrypt costs and argon2id
+parameter sets, then recommends the strongest setting that keeps the p99
+login latency under the target while sustaining the expected login rate
+with the available CPU cores.
+
+Usage:
+    python execution/calibrate_password_hash.py --target-p99-ms 250 --logins-per-second 20
+    python execution/calibrate_password_hash.py --scheme argon2 --workers 4
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+BCRYPT_CANDIDATES = [10, 11, 12, 13, 14]
+# (time_cost, memory_cost KiB, parallelism), weakest to strongest
+ARGON2_CANDIDATES = [
+    (2, 19456, 1),
+    (2, 65536, 4),
+    (3, 65536, 4),
+    (4, 131072, 4),
+    (6, 262144, 4),
+]
+
+
+def measure(context, samples: int):
+    """Return (mean, p99) verification time in milliseconds."""
+    hashed = context.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def fits(mean_ms: float, p99_ms: float, target_p99_ms: float, logins_per_second: float, cores: int) -> bool:
+    # Each verification keeps one core busy for ~mean_ms
+    utilization = logins_per_second * mean_ms / 1000 / cores
+    # Queueing inflates the tail as utilization grows; keep headroom
+    return utilization < 0.7 and p99_ms / max(1 - utilization, 0.01) <= target_p99_ms
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.auth import build_password_context
+
+    parser = argparse.ArgumentParser(description="Recommend password hashing parameters")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2", "both"], default="both")
+    parser.add_argument("--target-p99-ms", type=float, default=250, help="Target p99 login latency (ms)")
+    parser.add_argument("--logins-per-second", type=float, default=10, help="Expected peak login rate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CPU cores available for hashing")
+    parser.add_argument("--samples", type=int, default=20, help="Verifications per candidate")
+    args = parser.parse_args()
+
+    print(f"Target p99 {args.target_p99_ms:.0f} ms at {args.logins_per_second:g} logins/s on {args.workers} cores\n")
+    recommendations = []
+
+    if args.scheme in ("bcrypt", "both"):
+        best = None
+        for rounds in BCRYPT_CANDIDATES:
+            mean_ms, p99_ms = measure(build_password_context("bcrypt", bcrypt_rounds=rounds), args.samples)
+            ok = fits(mean_ms, p99_ms, args.target_p99_ms, args.logins_per_second, args.workers)
+            print(f"bcrypt rounds={rounds:<2d}                      mean {mean_ms:8.1f} ms  p99 {p99_ms:8.1f} ms  {'✓' if ok else '✗'}")
+            if ok:
+                best = rounds
+        if best is not None:
+            recommendations.append(f"PASSWORD_HASH_SCHEME=bcrypt\nBCRYPT_ROUNDS={best}")
+
+    if args.scheme in ("argon2", "both"):
+        best = None
+        for time_cost, memory_cost, parallelism in ARGON2_CANDIDATES:
+            context = build_password_context(
+                "argon2",
+                argon2_time_cost=time_cost,
+                argon2_memory_cost=memory_cost,
+                argon2_parallelism=parallelism,
+            )
+            mean_ms, p99_ms = measure(context, args.samples)
+            ok = fits(mean_ms, p99_ms, args.target_p99_ms, args.logins_per_second, args.workers)
+            print(
+                f"argon2id t={time_cost} m={memory_cost:<6d} p={parallelism}      "
+                f"mean {mean_ms:8.1f} ms  p99 {p99_ms:8.1f} ms  {'✓' if ok else '✗'}"
+            )
+            if ok:
+                best = (time_cost, memory_cost, parallelism)
+        if best is not None:
+            recommendations.append(
+                "PASSWORD_HASH_SCHEME=argon2\n"
+                f"ARGON2_TIME_COST={best[0]}\nARGON2_MEMORY_COST={best[1]}\nARGON2_PARALLELISM={best[2]}"
+            )
+
+    print()
+    if not recommendations:
+        print("No candidate meets the target; lower the login rate or add cores.")
+    for recommendation in recommendations:
+        print("Recommended (.env):")
+        print(recommendation)
+        print()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of the notification dispatcher against a local SMTP
+stand-in: events are grouped into one digest per user, users who turned
+notifications off get no email, and events whose delivery keeps failing are
+marked failed after NOTIFICATIONS_MAX_ATTEMPTS.
+
+Runs on a throwaway in-memory SQLite database and a local SMTP server bound
+to 127.0.0.1, so it touches neither the configured database nor a real
+mail server.
+
+Usage:
+    python execution/check_notifications.py
+"""
+import email
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.reply("220 localhost SMTP stand-in")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self.server.messages.append((recipients, email.message_from_bytes(b"".join(data))))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Local SMTP server that keeps the received messages in `messages`."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.messages = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+def unused_port() -> int:
+    """A local port nothing listens on (deliveries to it fail)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models import User, UserPreferences
+    from app.models.notification import NotificationOutbox
+    from app.notifications import NotificationDispatcher, SMTPTransport, enqueue_process_status_changes_bulk
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, name="smtp-stand-in", daemon=True).start()
+
+    failures = 0
+
+    def check(label: str, ok: bool) -> None:
+        global failures
+        print(f"{'✓' if ok else '✗'} {label}")
+        failures += 0 if ok else 1
+
+    def change(owner_id: str, process_id: str) -> dict:
+        return {
+            "owner_id": owner_id,
+            "process_id": process_id,
+            "applicant_name": "Requerente",
+            "old_status": "EM_ANALISE",
+            "new_status": "APROVADO",
+            "changed_by": "Licenciador",
+        }
+
+    db = Session()
+    users = (("u-digest", None), ("u-single", True), ("u-opted-out", False))
+    for n, (user_id, notifications) in enumerate(users, start=1):
+        db.add(User(
+            id=user_id,
+            razao_social=user_id,
+            cnpj=str(n).zfill(14),
+            email=f"{user_id}@exemplo.com",
+            password_hash="x",
+            role_id="empreendedor",
+        ))
+        if notifications is not None:
+            db.add(UserPreferences(id=f"p-{user_id}", user_id=user_id, dark_mode=False, notifications=notifications))
+    enqueue_process_status_changes_bulk(db, [
+        change("u-digest", "p1"), change("u-digest", "p2"), change("u-digest", "p3"),
+        change("u-single", "p4"),
+        change("u-opted-out", "p5"), change("u-opted-out", "p6"),
+    ])
+    db.commit()
+    db.close()
+
+    transport = SMTPTransport(host="127.0.0.1", port=server.port, sender="noreply@licenciamento.local")
+    dispatcher = NotificationDispatcher(session_factory=Session, transport=transport, max_attempts=2)
+    claimed = dispatcher.drain_once()
+
+    recipients = sorted(to for to_list, _ in server.messages for to in to_list)
+    check(f"claimed all 6 pending events (got {claimed})", claimed == 6)
+    check(
+        "one email per user that wants notifications",
+        recipients == ["u-digest@exemplo.com", "u-single@exemplo.com"],
+    )
+    digest = next((message for to_list, message in server.messages if "u-digest@exemplo.com" in to_list), None)
+    check("3 events of one user grouped into one digest", digest is not None and digest["Subject"].startswith("3 "))
+    db = Session()
+    check(
+        "every event marked processed, including the opted-out user's",
+        db.query(NotificationOutbox).filter(NotificationOutbox.processed_at.is_(None)).count() == 0,
+    )
+    db.close()
+
+    # Deliveries to a port nobody listens on fail until the events are given up
+    db = Session()
+    enqueue_process_status_changes_bulk(db, [change("u-single", "p7")])
+    db.commit()
+    db.close()
+    failing = NotificationDispatcher(
+        session_factory=Session,
+        transport=SMTPTransport(host="127.0.0.1", port=unused_port(), sender="noreply@licenciamento.local", timeout=2),
+        max_attempts=2,
+    )
+    failing.drain_once()
+    failing.drain_once()
+    db = Session()
+    event = db.query(NotificationOutbox).filter(NotificationOutbox.process_id == "p7").one()
+    check(
+        f"failing event marked failed after 2 attempts (attempts={event.attempts})",
+        event.failed_at is not None and event.processed_at is None and event.attempts == 2,
+    )
+    db.close()
+    check("failed events are no longer claimed", failing.drain_once() == 0)
+
+    server.shutdown()
+    print("All checks passed" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
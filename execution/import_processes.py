@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script to bulk import legacy processes from CSV or JSON (one object per line).
+
+Progress is checkpointed after every chunk, so running the same command again
+resumes where the previous run stopped. Rejected rows are written to an error
+report (CSV) next to the input file.
+
+Usage:
+    python execution/import_processes.py legado.csv --user "Prefeitura de Exemplo"
+    python execution/import_processes.py legado.csv --tenant joao-pessoa
+"""
+import csv
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+if __name__ == "__main__":
+    import argparse
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.imports import (
+        IMPORT_CHUNK_SIZE,
+        FileCheckpoint,
+        ProcessImporter,
+        detect_format,
+        iter_records,
+    )
+
+    parser = argparse.ArgumentParser(description="Bulk import legacy processes")
+    parser.add_argument("input", help="CSV or JSON lines file to import")
+    parser.add_argument("--format", choices=["csv", "json"], help="Input format (default: from file extension)")
+    parser.add_argument("--user", default="Importação", help="Name recorded in the process history")
+    parser.add_argument("--tenant", default=settings.DEFAULT_TENANT_ID, help="Tenant (prefeitura) to import into")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <input>.checkpoint.json)")
+    parser.add_argument("--errors", help="Error report file (default: <input>.errors.csv)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"✗ File not found: {input_path}")
+        sys.exit(1)
+
+    checkpoint = FileCheckpoint(Path(args.checkpoint or f"{input_path}.checkpoint.json"))
+    if args.restart:
+        checkpoint.clear()
+    start_row = checkpoint.load()
+    if start_row:
+        print(f"Resuming from row {start_row} (checkpoint: {checkpoint.path})")
+
+    errors_path = Path(args.errors or f"{input_path}.errors.csv")
+    fmt = args.format or detect_format(input_path.name)
+
+    # Scoped (and routed) to the tenant, like a request from that prefeitura
+    db = SessionLocal(info={"tenant_id": args.tenant})
+    started = time.perf_counter()
+    try:
+        with open(input_path, "r", encoding="utf-8-sig", newline="") as stream, \
+                open(errors_path, "a" if start_row else "w", newline="") as errors_file:
+            error_writer = csv.writer(errors_file)
+            if not start_row:
+                error_writer.writerow(["row", "process_id", "error"])
+
+            importer = ProcessImporter(
+                db,
+                imported_by=args.user,
+                chunk_size=args.chunk_size,
+                checkpoint=checkpoint,
+                error_sink=lambda e: error_writer.writerow([e.row, e.process_id or "", e.error]),
+                max_errors_kept=0,
+            )
+            result = importer.run(iter_records(stream, fmt), start_row=start_row)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    processed = result.rows_read - start_row
+    rate = processed / elapsed if elapsed > 0 else 0
+    print(f"✓ Import completed: {result.imported} imported, {result.failed} rejected "
+          f"({processed} rows in {elapsed:.1f}s, {rate:,.0f} rows/s)")
+    if result.failed:
+        print(f"  Error report: {errors_path}")
+    checkpoint.clear()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Maintenance script for the monthly partitions of process_history.
+
+Commands:
+    ensure   Create partitions for the current month and the next N months
+    list     Show partitions with their bounds, size and estimated rows
+    archive  Export partitions older than N months to gzip-compressed CSV
+             files, then detach and drop them
+
+Run `ensure` periodically (e.g. daily via cron) so new rows never fall into the
+default partition.
+"""
+import gzip
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+PARTITION_NAME = re.compile(r"^process_history_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    """Return the first day of the month `months` after `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def list_partitions(connection):
+    """Return (name, month, size, estimated rows) for each monthly partition."""
+    from sqlalchemy import text
+
+    rows = connection.execute(text("""
+        SELECT c.relname, pg_total_relation_size(c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'process_history'::regclass
+        ORDER BY c.relname
+    """)).fetchall()
+
+    partitions = []
+    for name, size, estimated_rows in rows:
+        match = PARTITION_NAME.match(name)
+        month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+        partitions.append((name, month, size, max(estimated_rows, 0)))
+    return partitions
+
+
+def ensure_partitions(engine, months_ahead: int) -> None:
+    from sqlalchemy import text
+
+    current = date.today().replace(day=1)
+    with engine.begin() as connection:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = connection.execute(
+                text("SELECT process_history_ensure_partition(:month)"), {"month": month}
+            ).scalar()
+            print(f"✓ {name}")
+
+
+def archive_partitions(engine, older_than_months: int, output_dir: Path, dry_run: bool) -> None:
+    from sqlalchemy import text
+
+    cutoff = add_months(date.today().replace(day=1), -older_than_months)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with engine.connect() as connection:
+        candidates = [
+            (name, month) for name, month, _, _ in list_partitions(connection)
+            if month is not None and month < cutoff
+        ]
+
+    if not candidates:
+        print(f"No partitions older than {cutoff.isoformat()}")
+        return
+
+    for name, month in candidates:
+        archive_path = output_dir / f"{name}.csv.gz"
+        if dry_run:
+            print(f"Would archive {name} → {archive_path}")
+            continue
+
+        # Export and drop in one transaction: the partition is only dropped
+        # if the compressed copy was fully written
+        with engine.begin() as connection:
+            cursor = connection.connection.cursor()
+            try:
+                with gzip.open(archive_path, "wt", encoding="utf-8") as f:
+                    cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', f)
+            finally:
+                cursor.close()
+            connection.execute(text(f'ALTER TABLE process_history DETACH PARTITION "{name}"'))
+            connection.execute(text(f'DROP TABLE "{name}"'))
+        print(f"✓ {name} archived to {archive_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Manage process_history partitions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ensure_parser = subparsers.add_parser("ensure", help="Create upcoming monthly partitions")
+    ensure_parser.add_argument("--months-ahead", type=int, default=3, help="Months to create ahead (default: 3)")
+
+    subparsers.add_parser("list", help="List partitions")
+
+    archive_parser = subparsers.add_parser("archive", help="Archive and drop old partitions")
+    archive_parser.add_argument("--older-than-months", type=int, required=True, help="Archive partitions older than this")
+    archive_parser.add_argument("--output-dir", default="archive/process_history", help="Where to write the .csv.gz files")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only show what would be archived")
+
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_MAINTENANCE_URL)
+
+    if args.command == "ensure":
+        ensure_partitions(engine, args.months_ahead)
+    elif args.command == "list":
+        with engine.connect() as connection:
+            for name, month, size, estimated_rows in list_partitions(connection):
+                print(f"{name:32s} {size / 1024 / 1024:10.1f} MB {estimated_rows:12,d} rows")
+    elif args.command == "archive":
+        archive_partitions(engine, args.older_than_months, Path(args.output_dir), args.dry_run)